@@ -2,7 +2,7 @@ import copy
 
 from troposphere import (
     Ref, FindInMap, Not, Equals, And, Condition, Join, ec2, autoscaling,
-    If, GetAtt, Output
+    If, GetAtt, Output, AWSProperty
 )
 from troposphere import elasticloadbalancing as elb
 from troposphere.autoscaling import Tag as ASTag
@@ -23,6 +23,45 @@ from stacker.blueprints.variables.types import (
 CLUSTER_SG_NAME = "%sSG"
 ELB_SG_NAME = "%sElbSG"
 ELB_NAME = "%sLoadBalancer"
+QUEUE_SCALING_POLICY = "QueueBacklogScalingPolicy"
+
+# Guards against dividing by zero, so the group can scale out from 0
+# instances.
+BACKLOG_PER_INSTANCE_EXPRESSION = "visible / IF(in_service > 0, in_service, 1)"
+
+
+# Target tracking on metric math isn't available in every troposphere
+# release, so the CloudFormation properties are modelled here.
+class TargetTrackingMetric(AWSProperty):
+    props = {
+        'Dimensions': ([autoscaling.MetricDimension], False),
+        'MetricName': (basestring, True),
+        'Namespace': (basestring, True),
+    }
+
+
+class TargetTrackingMetricStat(AWSProperty):
+    props = {
+        'Metric': (TargetTrackingMetric, True),
+        'Stat': (basestring, True),
+        'Unit': (basestring, False),
+    }
+
+
+class TargetTrackingMetricDataQuery(AWSProperty):
+    props = {
+        'Expression': (basestring, False),
+        'Id': (basestring, True),
+        'Label': (basestring, False),
+        'MetricStat': (TargetTrackingMetricStat, False),
+        'ReturnData': (bool, False),
+    }
+
+
+class MetricMathSpecification(autoscaling.CustomizedMetricSpecification):
+    props = {
+        'Metrics': ([TargetTrackingMetricDataQuery], True),
+    }
 
 
 class AutoscalingGroup(Blueprint):
@@ -282,3 +321,154 @@ class FlexibleAutoScalingGroup(Blueprint):
     def create_template(self):
         self.create_launch_configuration()
         self.create_autoscaling_group()
+
+
+class QueueBacklogScalingPolicy(Blueprint):
+    """ Scales an AutoScalingGroup on the backlog of an SQS queue.
+
+    Uses target tracking on the backlog per instance, calculated with metric
+    math as ApproximateNumberOfMessagesVisible / GroupInServiceInstances, so
+    the number of workers follows the depth of the queue rather than their
+    CPU usage.
+
+    The AutoScalingGroup must have group metrics collection enabled for
+    GroupInServiceInstances to be published.
+    """
+    VARIABLES = {
+        "AutoScalingGroupName": {
+            "type": str,
+            "description": "The name of the AutoScalingGroup to scale, ie: "
+                           "the AutoScalingGroup output of "
+                           "FlexibleAutoScalingGroup.",
+        },
+        "QueueArn": {
+            "type": str,
+            "description": "The ARN of the queue the group consumes from, "
+                           "ie: the <title>Arn output of sqs.Queues.",
+        },
+        "TargetBacklogPerInstance": {
+            "type": float,
+            "description": "The number of messages each instance can have "
+                           "in its backlog. If not given, it's calculated "
+                           "from AcceptableLatency & MessageProcessingTime.",
+            "default": 0.0,
+        },
+        "AcceptableLatency": {
+            "type": int,
+            "description": "The longest time, in seconds, a message should "
+                           "wait in the queue before being processed.",
+            "default": 0,
+        },
+        "MessageProcessingTime": {
+            "type": float,
+            "description": "The average time, in seconds, an instance takes "
+                           "to process a message.",
+            "default": 0.0,
+        },
+        "EstimatedInstanceWarmup": {
+            "type": int,
+            "description": "The number of seconds until a new instance "
+                           "starts consuming from the queue.",
+            "default": 300,
+        },
+        "DisableScaleIn": {
+            "type": bool,
+            "description": "Set to 'true' to only scale out on the backlog.",
+            "default": False,
+        },
+    }
+
+    def get_target_backlog_per_instance(self):
+        variables = self.get_variables()
+        target = variables["TargetBacklogPerInstance"]
+        if target:
+            return target
+
+        latency = variables["AcceptableLatency"]
+        processing_time = variables["MessageProcessingTime"]
+        if not (latency and processing_time):
+            raise ValueError("Either TargetBacklogPerInstance or both "
+                             "AcceptableLatency & MessageProcessingTime "
+                             "must be given.")
+        return latency / processing_time
+
+    def get_queue_name(self):
+        queue_arn = self.get_variables()["QueueArn"]
+        # arn:aws:sqs:<region>:<account>:<name>
+        if queue_arn.count(":") != 5:
+            raise ValueError("%s is not the ARN of an SQS queue." %
+                             queue_arn)
+        return queue_arn.split(":")[-1]
+
+    def get_backlog_per_instance_metric(self):
+        variables = self.get_variables()
+        return MetricMathSpecification(
+            Metrics=[
+                TargetTrackingMetricDataQuery(
+                    Id="visible",
+                    MetricStat=TargetTrackingMetricStat(
+                        Metric=TargetTrackingMetric(
+                            Namespace="AWS/SQS",
+                            MetricName="ApproximateNumberOfMessagesVisible",
+                            Dimensions=[
+                                autoscaling.MetricDimension(
+                                    Name="QueueName",
+                                    Value=self.get_queue_name(),
+                                ),
+                            ],
+                        ),
+                        Stat="Sum",
+                    ),
+                    ReturnData=False,
+                ),
+                TargetTrackingMetricDataQuery(
+                    Id="in_service",
+                    MetricStat=TargetTrackingMetricStat(
+                        Metric=TargetTrackingMetric(
+                            Namespace="AWS/AutoScaling",
+                            MetricName="GroupInServiceInstances",
+                            Dimensions=[
+                                autoscaling.MetricDimension(
+                                    Name="AutoScalingGroupName",
+                                    Value=variables["AutoScalingGroupName"],
+                                ),
+                            ],
+                        ),
+                        Stat="Average",
+                    ),
+                    ReturnData=False,
+                ),
+                TargetTrackingMetricDataQuery(
+                    Id="backlog_per_instance",
+                    Expression=BACKLOG_PER_INSTANCE_EXPRESSION,
+                    Label="Backlog per instance",
+                    ReturnData=True,
+                ),
+            ]
+        )
+
+    def create_scaling_policy(self):
+        t = self.template
+        variables = self.get_variables()
+
+        policy = t.add_resource(
+            autoscaling.ScalingPolicy(
+                QUEUE_SCALING_POLICY,
+                AutoScalingGroupName=variables["AutoScalingGroupName"],
+                PolicyType="TargetTrackingScaling",
+                EstimatedInstanceWarmup=variables["EstimatedInstanceWarmup"],
+                TargetTrackingConfiguration=(
+                    autoscaling.TargetTrackingConfiguration(
+                        CustomizedMetricSpecification=(
+                            self.get_backlog_per_instance_metric()
+                        ),
+                        DisableScaleIn=variables["DisableScaleIn"],
+                        TargetValue=self.get_target_backlog_per_instance(),
+                    )
+                ),
+            )
+        )
+        t.add_output(Output("ScalingPolicyArn", Value=policy.Ref()))
+
+    def create_template(self):
+        self.create_scaling_policy()
@@ -1,4 +1,5 @@
 import logging
+import re
 
 from stacker.blueprints.base import Blueprint
 
@@ -7,6 +8,7 @@ from stacker.blueprints.variables.types import TroposphereType
 from stacker.util import cf_safe_name
 
 from troposphere import (
+    AWSProperty,
     NoValue,
     Output,
     Ref,
@@ -18,11 +20,13 @@ from troposphere import awslambda
 
 from troposphere import events
 
+from troposphere.validators import integer
+
 import awacs.logs
 import awacs.kinesis
 import awacs.dynamodb
 
-from awacs.aws import Statement, Allow, Policy
+from awacs.aws import Action, Statement, Allow, Policy
 from awacs.helpers.trust import get_lambda_assumerole_policy
 
 from .policies import (
@@ -33,6 +37,230 @@ from .policies import (
 
 logger = logging.getLogger(name=__name__)
 
+# reference:
+#   https://docs.aws.amazon.com/lambda/latest/dg/gettingstarted-limits.html
+MAX_LAYERS = 5
+ARCHITECTURES = ["x86_64", "arm64"]
+DEFAULT_ARCHITECTURE = "x86_64"
+MEMORY_SIZE_RANGE = (128, 10240)
+EPHEMERAL_STORAGE_RANGE = (512, 10240)
+MAX_RETRY_ATTEMPTS = 2
+EVENT_AGE_RANGE = (60, 21600)
+
+# reference:
+#   https://docs.aws.amazon.com/eventbridge/latest/userguide/eb-quota.html
+MAX_TARGETS_PER_RULE = 5
+TARGET_INPUTS = ["Input", "InputPath", "InputTransformer"]
+
+# The action Lambda needs to send invocation records to each type of
+# destination.
+DESTINATION_ACTIONS = {
+    "sqs": Action("sqs", "SendMessage"),
+    "sns": Action("sns", "Publish"),
+    "lambda": Action("lambda", "InvokeFunction"),
+    "events": Action("events", "PutEvents"),
+}
+
+
+class EphemeralStorage(AWSProperty):
+    props = {
+        "Size": (integer, True),
+    }
+
+
+class LambdaFunction(awslambda.Function):
+    # Not available in troposphere 2.7.1.
+    props = dict(
+        awslambda.Function.props,
+        Architectures=([basestring], False),
+        EphemeralStorage=(EphemeralStorage, False),
+    )
+
+
+class LayerVersion(awslambda.LayerVersion):
+    props = dict(
+        awslambda.LayerVersion.props,
+        CompatibleArchitectures=([basestring], False),
+    )
+
+
+def validate_layers(layers):
+    if len(layers) > MAX_LAYERS:
+        raise ValueError("A function can use at most %d layers." %
+                         MAX_LAYERS)
+    for layer in layers:
+        if isinstance(layer, dict) and "Arn" not in layer:
+            raise ValueError("Layers given as a dictionary require an Arn.")
+    return layers
+
+
+def validate_memory_size(memory_size):
+    if not (MEMORY_SIZE_RANGE[0] <= memory_size <= MEMORY_SIZE_RANGE[1]):
+        raise ValueError("MemorySize must be between %d and %d MB." %
+                         MEMORY_SIZE_RANGE)
+    return memory_size
+
+
+def validate_ephemeral_storage(size):
+    if not (EPHEMERAL_STORAGE_RANGE[0] <= size <=
+            EPHEMERAL_STORAGE_RANGE[1]):
+        raise ValueError("EphemeralStorage must be between %d and %d MB." %
+                         EPHEMERAL_STORAGE_RANGE)
+    return size
+
+
+def validate_function_architectures(architectures):
+    if len(architectures) > 1:
+        raise ValueError("A function can only have one architecture.")
+    return validate_architectures(architectures)
+
+
+def validate_event_invoke_config(config):
+    allowed = ["MaximumRetryAttempts", "MaximumEventAgeInSeconds",
+               "OnSuccess", "OnFailure", "Qualifier"]
+    for key in config:
+        if key not in allowed:
+            raise ValueError("%s is not a valid EventInvokeConfig key. "
+                             "Valid keys are: %s" % (key, ", ".join(allowed)))
+
+    retries = config.get("MaximumRetryAttempts")
+    if retries is not None and not (0 <= retries <= MAX_RETRY_ATTEMPTS):
+        raise ValueError("MaximumRetryAttempts must be between 0 and %d." %
+                         MAX_RETRY_ATTEMPTS)
+
+    event_age = config.get("MaximumEventAgeInSeconds")
+    if event_age is not None and \
+            not (EVENT_AGE_RANGE[0] <= event_age <= EVENT_AGE_RANGE[1]):
+        raise ValueError("MaximumEventAgeInSeconds must be between %d and "
+                         "%d." % EVENT_AGE_RANGE)
+
+    for key in ["OnSuccess", "OnFailure"]:
+        if key in config:
+            get_destination_action(config[key])
+
+    return config
+
+
+def get_destination_action(destination_arn):
+    """Returns the awacs Action needed to send to an async destination.
+
+    Args:
+        destination_arn (str): The Arn of an SQS queue, SNS topic, Lambda
+            function or EventBridge event bus.
+
+    Raises:
+        ValueError: If the destination isn't one of the supported types.
+    """
+    destination_type = destination_arn.split(":")[2]
+    try:
+        return DESTINATION_ACTIONS[destination_type]
+    except KeyError:
+        raise ValueError(
+            "Invalid destination type '%s' in arn '%s'" % (
+                destination_type, destination_arn)
+        )
+
+
+def destination_statements(destination_arns):
+    """Returns statements to allow Lambda to send to async destinations.
+
+    Args:
+        destination_arns (list): A list of destination Arns.
+
+    Returns:
+        list: A list of statements.
+    """
+    return [
+        Statement(
+            Effect=Allow,
+            Resource=[arn],
+            Action=[get_destination_action(arn)],
+        )
+        for arn in destination_arns
+    ]
+
+
+def validate_target_input(target):
+    """Validates the input of a cloudwatch events rule target.
+
+    Raises:
+        ValueError: If more than one of Input, InputPath & InputTransformer
+            are given, or if the InputTemplate of an InputTransformer uses a
+            placeholder that isn't defined in its InputPathsMap.
+    """
+    inputs = [key for key in TARGET_INPUTS if key in target.properties]
+    if len(inputs) > 1:
+        raise ValueError("Target %s can only have one of: %s" % (
+            target.Id, ", ".join(TARGET_INPUTS)))
+
+    transformer = target.properties.get("InputTransformer")
+    if transformer:
+        paths = transformer.properties.get("InputPathsMap", {})
+        for placeholder in re.findall(r"<([\w.-]+)>",
+                                      transformer.InputTemplate):
+            if placeholder.startswith("aws.events."):
+                continue
+            if placeholder not in paths:
+                raise ValueError(
+                    "Target %s uses the placeholder <%s>, which is not in "
+                    "its InputPathsMap." % (target.Id, placeholder))
+
+
+def pack_rule_targets(rule):
+    """Splits a rule into rules with at most 5 targets each.
+
+    The first rule keeps the original title, while the following rules are
+    suffixed with their number (as are their names, if given).
+
+    Returns:
+        list: A list of :class:`troposphere.events.Rule` objects.
+    """
+    targets = rule.properties.get("Targets", [])
+    if len(targets) <= MAX_TARGETS_PER_RULE:
+        return [rule]
+
+    rules = []
+    for i in range(0, len(targets), MAX_TARGETS_PER_RULE):
+        number = i // MAX_TARGETS_PER_RULE + 1
+        properties = dict(rule.properties)
+        properties["Targets"] = targets[i:i + MAX_TARGETS_PER_RULE]
+        title = rule.title
+        if number > 1:
+            title = "%s%d" % (rule.title, number)
+            if "Name" in properties:
+                properties["Name"] = "%s-%d" % (properties["Name"], number)
+        rules.append(events.Rule(title, **properties))
+    return rules
+
+
+def layer_compatible_architectures(layer):
+    """Returns the architectures a layer is compatible with.
+
+    Args:
+        layer (str or dict): Either a layer version Arn, or a dictionary
+            with Arn & CompatibleArchitectures (a list, or a comma
+            separated string such as the CompatibleArchitectures output of
+            the Layer blueprint).
+
+    Returns:
+        list: The compatible architectures, or an empty list if they aren't
+            known.
+    """
+    if not isinstance(layer, dict):
+        return []
+    architectures = layer.get("CompatibleArchitectures", [])
+    if isinstance(architectures, str):
+        architectures = [a for a in architectures.split(",") if a]
+    return architectures
+
+
+def validate_architectures(architectures):
+    for architecture in architectures:
+        if architecture not in ARCHITECTURES:
+            raise ValueError("Architectures must be one of: %s" %
+                             ", ".join(ARCHITECTURES))
+    return architectures
+
 
 def get_stream_action_type(stream_arn):
     """Returns the awacs Action for a stream type given an arn
@@ -142,8 +370,26 @@ class Function(Blueprint):
         "MemorySize": {
             "type": int,
             "description": "The amount of memory, in MB, that is allocated "
-                           "to your Lambda function. Default: 128",
+                           "to your Lambda function, between 128 and 10240 "
+                           "in 1 MB increments. CPU is allocated in "
+                           "proportion to memory. Default: 128",
             "default": 128,
+            "validator": validate_memory_size,
+        },
+        "Architectures": {
+            "type": list,
+            "description": "The instruction set architecture of the "
+                           "function, either [x86_64] or [arm64] (Graviton, "
+                           "for better price-performance). Default: x86_64",
+            "default": [],
+            "validator": validate_function_architectures,
+        },
+        "EphemeralStorage": {
+            "type": int,
+            "description": "The size, in MB, of the function's /tmp "
+                           "directory, between 512 and 10240. Default: 512",
+            "default": 512,
+            "validator": validate_ephemeral_storage,
         },
         "Runtime": {
             "type": str,
@@ -190,6 +436,33 @@ class Function(Blueprint):
             "description": "An optional event source mapping config.",
             "default": {},
         },
+        "EventInvokeConfig": {
+            "type": dict,
+            "description": "An optional config for asynchronous "
+                           "invocations. Valid keys are: "
+                           "MaximumRetryAttempts (0-2, default 2), "
+                           "MaximumEventAgeInSeconds (60-21600, default "
+                           "21600), OnSuccess & OnFailure (the Arn of an "
+                           "SQS queue, SNS topic, Lambda function or "
+                           "EventBridge event bus to send invocation "
+                           "records to) and Qualifier (the version or alias "
+                           "to configure, default $LATEST). Unlike the "
+                           "DeadLetterArn, destinations also receive the "
+                           "response or error of the invocation.",
+            "default": {},
+            "validator": validate_event_invoke_config,
+        },
+        "Layers": {
+            "type": list,
+            "description": "A list of up to 5 layer version Arns to add to "
+                           "the function's execution environment, ie: the "
+                           "LayerVersionArn output of the Layer blueprint. "
+                           "A layer can also be given as a dictionary with "
+                           "Arn & CompatibleArchitectures, which are "
+                           "checked against the function's Architectures.",
+            "default": [],
+            "validator": validate_layers,
+        },
     }
 
     def code(self):
@@ -218,6 +491,31 @@ class Function(Blueprint):
             config = awslambda.VPCConfig(**vpc_config)
         return config
 
+    def architecture(self):
+        architectures = self.get_variables()["Architectures"]
+        return architectures[0] if architectures else DEFAULT_ARCHITECTURE
+
+    def layers(self):
+        """Returns the layer version Arns for the function.
+
+        Raises:
+            ValueError: If a layer isn't compatible with the function's
+                architecture.
+        """
+        architecture = self.architecture()
+        arns = []
+        for layer in self.get_variables()["Layers"]:
+            compatible_architectures = layer_compatible_architectures(layer)
+            if isinstance(layer, dict):
+                layer = layer["Arn"]
+            if compatible_architectures and \
+                    architecture not in compatible_architectures:
+                raise ValueError(
+                    "Layer %s is not compatible with the %s architecture." %
+                    (layer, architecture))
+            arns.append(layer)
+        return arns
+
     def add_policy_statements(self, statements):
         """Adds statements to the policy.
 
@@ -313,22 +611,29 @@ class Function(Blueprint):
         t = self.template
         variables = self.get_variables()
 
-        self.function = t.add_resource(
-            awslambda.Function(
-                "Function",
-                Code=self.code(),
-                DeadLetterConfig=self.dead_letter_config(),
-                Description=variables["Description"] or NoValue,
-                Environment=self.environment(),
-                Handler=variables["Handler"],
-                KmsKeyArn=variables["KmsKeyArn"] or NoValue,
-                MemorySize=variables["MemorySize"],
-                Role=self.role_arn,
-                Runtime=variables["Runtime"],
-                Timeout=variables["Timeout"],
-                VpcConfig=self.vpc_config(),
-            )
+        function = LambdaFunction(
+            "Function",
+            Code=self.code(),
+            DeadLetterConfig=self.dead_letter_config(),
+            Description=variables["Description"] or NoValue,
+            Environment=self.environment(),
+            Handler=variables["Handler"],
+            KmsKeyArn=variables["KmsKeyArn"] or NoValue,
+            MemorySize=variables["MemorySize"],
+            Role=self.role_arn,
+            Runtime=variables["Runtime"],
+            Timeout=variables["Timeout"],
+            VpcConfig=self.vpc_config(),
         )
+        if variables["Layers"]:
+            function.Layers = self.layers()
+        if self.architecture() != DEFAULT_ARCHITECTURE:
+            function.Architectures = [self.architecture()]
+        if variables["EphemeralStorage"] != EPHEMERAL_STORAGE_RANGE[0]:
+            function.EphemeralStorage = EphemeralStorage(
+                Size=variables["EphemeralStorage"],
+            )
+        self.function = t.add_resource(function)
 
         t.add_output(
             Output("FunctionName", Value=self.function.Ref())
@@ -394,6 +699,45 @@ class Function(Blueprint):
                 Output("EventSourceMappingId", Value=resource.Ref())
             )
 
+    def create_event_invoke_config(self):
+        t = self.template
+        variables = self.get_variables()
+        config = variables["EventInvokeConfig"]
+        if not config:
+            return
+
+        destinations = {}
+        for key in ["OnSuccess", "OnFailure"]:
+            if config.get(key):
+                destinations[key] = {"Destination": config[key]}
+
+        resource = t.add_resource(
+            awslambda.EventInvokeConfig(
+                "EventInvokeConfig",
+                DestinationConfig=(
+                    awslambda.DestinationConfig.from_dict(
+                        None, destinations
+                    ) if destinations else NoValue
+                ),
+                FunctionName=self.function.Ref(),
+                MaximumEventAgeInSeconds=config.get(
+                    "MaximumEventAgeInSeconds", NoValue),
+                MaximumRetryAttempts=config.get(
+                    "MaximumRetryAttempts", NoValue),
+                Qualifier=config.get("Qualifier", "$LATEST"),
+            )
+        )
+
+        if destinations and not variables["Role"]:
+            self.add_policy_statements(
+                destination_statements(
+                    [destinations[key]["Destination"]
+                     for key in sorted(destinations)]
+                )
+            )
+
+        t.add_output(Output("EventInvokeConfigId", Value=resource.Ref()))
+
     def create_template(self):
         variables = self.get_variables()
         self._policy_statements = []
@@ -407,46 +751,210 @@ class Function(Blueprint):
             self.create_role()
         self.create_function()
         self.create_event_source_mapping()
+        self.create_event_invoke_config()
         # We don't use self.role_arn here because it is set internally if a
         # role is created
         if not role_arn:
             self.create_policy()
 
 
+class Layer(Blueprint):
+    """Publishes a Lambda layer version.
+
+    Layers let functions share their dependencies, which are then published
+    once rather than being included in the Code of every function.
+    """
+
+    VARIABLES = {
+        "Code": {
+            "type": awslambda.Code,
+            "description": "The troposphere.awslambda.Code object "
+                           "returned by the aws lambda hook, used as the "
+                           "content of the layer.",
+        },
+        "LayerName": {
+            "type": str,
+            "description": "The name of the layer.",
+            "default": "",
+        },
+        "Description": {
+            "type": str,
+            "description": "Description of the layer version.",
+            "default": "",
+        },
+        "CompatibleRuntimes": {
+            "type": list,
+            "description": "A list of runtimes the layer is compatible "
+                           "with.",
+            "default": [],
+        },
+        "CompatibleArchitectures": {
+            "type": list,
+            "description": "A list of instruction set architectures the "
+                           "layer is compatible with (x86_64, arm64).",
+            "default": [],
+            "validator": validate_architectures,
+        },
+        "LicenseInfo": {
+            "type": str,
+            "description": "The layer's software license.",
+            "default": "",
+        },
+        "Principals": {
+            "type": list,
+            "description": "A list of account Ids (or * for all accounts) "
+                           "allowed to use the layer version.",
+            "default": [],
+        },
+        "OrganizationId": {
+            "type": str,
+            "description": "An organization Id, which restricts a * "
+                           "principal to the accounts in the organization.",
+            "default": "",
+        },
+        "RetainVersions": {
+            "type": bool,
+            "description": "Set to 'true' to keep old layer versions when "
+                           "the layer is updated, so functions that use "
+                           "them keep working.",
+            "default": True,
+        },
+    }
+
+    def content(self):
+        code = self.get_variables()["Code"]
+        return awslambda.Content(
+            S3Bucket=code.S3Bucket,
+            S3Key=code.S3Key,
+            S3ObjectVersion=code.properties.get("S3ObjectVersion", NoValue),
+        )
+
+    def create_layer_version(self):
+        t = self.template
+        variables = self.get_variables()
+
+        self.layer_version = LayerVersion(
+            "LayerVersion",
+            CompatibleRuntimes=variables["CompatibleRuntimes"] or NoValue,
+            Content=self.content(),
+            Description=variables["Description"] or NoValue,
+            LayerName=variables["LayerName"] or NoValue,
+            LicenseInfo=variables["LicenseInfo"] or NoValue,
+        )
+        if variables["CompatibleArchitectures"]:
+            self.layer_version.CompatibleArchitectures = \
+                variables["CompatibleArchitectures"]
+        if variables["RetainVersions"]:
+            self.layer_version.DeletionPolicy = "Retain"
+            self.layer_version.UpdateReplacePolicy = "Retain"
+        t.add_resource(self.layer_version)
+
+        t.add_output(
+            Output("LayerVersionArn", Value=self.layer_version.Ref())
+        )
+        if variables["CompatibleArchitectures"]:
+            t.add_output(
+                Output(
+                    "CompatibleArchitectures",
+                    Value=",".join(variables["CompatibleArchitectures"])
+                )
+            )
+
+    def create_layer_version_permissions(self):
+        t = self.template
+        variables = self.get_variables()
+
+        for principal in variables["Principals"]:
+            title = "LayerVersionPermission"
+            if principal != "*":
+                title += cf_safe_name(principal)
+            t.add_resource(
+                awslambda.LayerVersionPermission(
+                    title,
+                    Action="lambda:GetLayerVersion",
+                    LayerVersionArn=self.layer_version.Ref(),
+                    OrganizationId=variables["OrganizationId"] or NoValue,
+                    Principal=principal,
+                )
+            )
+
+    def create_template(self):
+        self.create_layer_version()
+        self.create_layer_version_permissions()
+
+
 class FunctionScheduler(Blueprint):
 
     VARIABLES = {
         "CloudwatchEventsRule": {
-            "type": TroposphereType(events.Rule),
+            "type": TroposphereType(events.Rule, optional=True),
             "description": "The troposphere.events.Rule object params.",
+            "default": None,
+        },
+        "CloudwatchEventsRules": {
+            "type": TroposphereType(events.Rule, many=True, optional=True),
+            "description": "A dictionary of titles to "
+                           "troposphere.events.Rule object params, to "
+                           "create many schedules in a single stack.",
+            "default": None,
         },
     }
 
-    def create_scheduler(self):
-        variables = self.get_variables()
-        troposphere_events_rule = variables["CloudwatchEventsRule"]
-        aws_lambda_arns = {}
-
-        # iterate over targets in the event Rule & gather aws_lambda_arns.
-        for target in getattr(troposphere_events_rule, "Targets", []):
-            if target.Arn.startswith("arn:aws:lambda:"):
-                safe_id = cf_safe_name(target.Id)
-                aws_lambda_arns[safe_id] = target.Arn
+    def get_rules(self):
+        """Returns the configured rules, along with their permission prefix.
 
-        # schedule a Cloudwatch event rule to invoke the Targets.
-        rule = self.template.add_resource(troposphere_events_rule)
+        Permissions for the CloudwatchEventsRule keep their original
+        titles, while those for CloudwatchEventsRules are prefixed by the
+        title of their rule.
+        """
+        variables = self.get_variables()
+        rules = []
+        if variables["CloudwatchEventsRule"]:
+            rules.append(("", variables["CloudwatchEventsRule"]))
+        for rule in variables["CloudwatchEventsRules"] or []:
+            rules.append((rule.title, rule))
+
+        if not rules:
+            raise ValueError("Either CloudwatchEventsRule or "
+                             "CloudwatchEventsRules must be provided.")
+        return rules
+
+    def create_rule_permissions(self, rule, prefix):
+        """Allows cloudwatch to invoke any of the lambda targets of a rule.
+
+        Only one permission is created per function, even if the function
+        is the target of the rule more than once.
+        """
+        function_arns = []
+        for target in rule.properties.get("Targets", []):
+            if not target.Arn.startswith("arn:aws:lambda:"):
+                continue
+            if target.Arn in function_arns:
+                continue
+            function_arns.append(target.Arn)
 
-        # allow cloudwatch to invoke on any of the given lambda targets.
-        for event_rule_target_id, aws_lambda_arn in aws_lambda_arns.items():
             self.template.add_resource(
                 awslambda.Permission(
-                    "PermToInvokeFunctionFor{}".format(event_rule_target_id),
+                    "{}PermToInvokeFunctionFor{}".format(
+                        prefix, cf_safe_name(target.Id)
+                    ),
                     Principal="events.amazonaws.com",
                     Action="lambda:InvokeFunction",
-                    FunctionName=aws_lambda_arn,
+                    FunctionName=target.Arn,
                     SourceArn=rule.GetAtt("Arn")
                 )
             )
 
+    def create_scheduler(self):
+        for prefix, troposphere_events_rule in self.get_rules():
+            for target in troposphere_events_rule.properties.get("Targets",
+                                                                 []):
+                validate_target_input(target)
+
+            # schedule Cloudwatch event rules to invoke the Targets.
+            for rule in pack_rule_targets(troposphere_events_rule):
+                self.template.add_resource(rule)
+                self.create_rule_permissions(rule, prefix)
+
     def create_template(self):
         self.create_scheduler()
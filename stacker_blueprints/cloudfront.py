@@ -0,0 +1,372 @@
+from stacker.blueprints.base import Blueprint
+
+from troposphere import (
+    GetAtt,
+    Join,
+    Output,
+    Ref,
+    Sub,
+    cloudfront,
+    route53,
+    s3,
+)
+
+from .policies import cloudfront_origin_access_bucket_policy
+from .route53 import CLOUDFRONT_ZONE_ID
+
+# Resource name constants
+ORIGIN_ACCESS_IDENTITY = "OriginAccessIdentity"
+BUCKET_POLICY = "BucketPolicy"
+CACHE_POLICY = "CachePolicy"
+DISTRIBUTION = "Distribution"
+ALIAS_RECORDS = "AliasRecords"
+
+ORIGIN_ID = "S3Origin"
+HTTP_VERSIONS = ["http1.1", "http2", "http3", "http2and3"]
+PRICE_CLASSES = ["PriceClass_100", "PriceClass_200", "PriceClass_All"]
+
+
+class StaticWebsite(Blueprint):
+    """Serves an s3.Buckets bucket through a CloudFront Distribution.
+
+    By default the bucket is accessed through its REST endpoint
+    (BucketDomainName) using an origin access identity, and a bucket policy
+    granting the identity read access is created. In that case the bucket
+    should not also be given a WebsiteConfiguration, since it would get a
+    second, public, bucket policy.
+
+    If WebsiteEndpoint is given instead, the S3 website endpoint is used as a
+    custom origin, which keeps website features (index documents in
+    sub-directories, redirects) at the cost of the bucket being public.
+    """
+
+    VARIABLES = {
+        "BucketName": {
+            "type": str,
+            "description": "The name of the bucket to serve, ie: the "
+                           "<title>BucketId output of s3.Buckets.",
+        },
+        "BucketDomainName": {
+            "type": str,
+            "description": "The REST endpoint of the bucket, ie: the "
+                           "<title>BucketDomainName output of s3.Buckets. "
+                           "Required unless WebsiteEndpoint is given.",
+            "default": "",
+        },
+        "WebsiteEndpoint": {
+            "type": str,
+            "description": "The S3 website endpoint of the bucket's region, "
+                           "ie: the <title>WebsiteEndpoint output of "
+                           "s3.Buckets. If given, the website endpoint is "
+                           "used as the origin instead of an origin access "
+                           "identity.",
+            "default": "",
+        },
+        "OriginPath": {
+            "type": str,
+            "description": "A directory in the bucket to serve content "
+                           "from, ie: /production",
+            "default": "",
+        },
+        "Aliases": {
+            "type": list,
+            "description": "A list of domain names to serve the "
+                           "distribution on. Requires AcmCertificateArn.",
+            "default": [],
+        },
+        "AcmCertificateArn": {
+            "type": str,
+            "description": "The ARN of an ACM certificate in us-east-1 "
+                           "covering the Aliases.",
+            "default": "",
+        },
+        "MinimumProtocolVersion": {
+            "type": str,
+            "description": "The minimum TLS version viewers can use when "
+                           "AcmCertificateArn is given.",
+            "default": "TLSv1.2_2021",
+        },
+        "HostedZoneId": {
+            "type": str,
+            "description": "If given, alias records for the Aliases are "
+                           "created in this hosted zone.",
+            "default": "",
+        },
+        "DefaultRootObject": {
+            "type": str,
+            "description": "The object to return for requests to the root "
+                           "url.",
+            "default": "index.html",
+        },
+        "DefaultTTL": {
+            "type": int,
+            "description": "The number of seconds objects are cached for "
+                           "when the origin doesn't send Cache-Control or "
+                           "Expires headers.",
+            "default": 86400,
+        },
+        "MinTTL": {
+            "type": int,
+            "description": "The minimum number of seconds objects are "
+                           "cached for.",
+            "default": 0,
+        },
+        "MaxTTL": {
+            "type": int,
+            "description": "The maximum number of seconds objects are "
+                           "cached for.",
+            "default": 31536000,
+        },
+        "Compress": {
+            "type": bool,
+            "description": "Set to 'true' to serve gzip & brotli "
+                           "compressed objects to viewers that accept "
+                           "them.",
+            "default": True,
+        },
+        "HttpVersion": {
+            "type": str,
+            "description": "The maximum HTTP version viewers can use.",
+            "default": "http2and3",
+            "allowed_values": HTTP_VERSIONS,
+        },
+        "IPV6Enabled": {
+            "type": bool,
+            "description": "Set to 'true' to serve the distribution over "
+                           "IPv6. Also creates AAAA alias records.",
+            "default": True,
+        },
+        "PriceClass": {
+            "type": str,
+            "description": "The price class of the distribution, which "
+                           "limits the edge locations used.",
+            "default": "PriceClass_100",
+            "allowed_values": PRICE_CLASSES,
+        },
+        "CustomErrorResponses": {
+            "type": list,
+            "description": "A list of dictionaries representing the "
+                           "attributes of a "
+                           "troposphere.cloudfront.CustomErrorResponse "
+                           "object.",
+            "default": [],
+        },
+        "WebACLId": {
+            "type": str,
+            "description": "The ARN of a WAF web ACL to associate with the "
+                           "distribution.",
+            "default": "",
+        },
+    }
+
+    def use_origin_access_identity(self):
+        return not self.get_variables()["WebsiteEndpoint"]
+
+    def validate_variables(self):
+        variables = self.get_variables()
+        if self.use_origin_access_identity() and \
+                not variables["BucketDomainName"]:
+            raise ValueError("One of BucketDomainName or WebsiteEndpoint is "
+                             "required.")
+
+        if variables["Aliases"] and not variables["AcmCertificateArn"]:
+            raise ValueError("AcmCertificateArn is required when Aliases "
+                             "are given.")
+
+        if not (variables["MinTTL"] <= variables["DefaultTTL"] <=
+                variables["MaxTTL"]):
+            raise ValueError("DefaultTTL must be between MinTTL and MaxTTL.")
+
+    def create_origin_access_identity(self):
+        t = self.template
+        variables = self.get_variables()
+
+        if not self.use_origin_access_identity():
+            return
+
+        t.add_resource(
+            cloudfront.CloudFrontOriginAccessIdentity(
+                ORIGIN_ACCESS_IDENTITY,
+                CloudFrontOriginAccessIdentityConfig=(
+                    cloudfront.CloudFrontOriginAccessIdentityConfig(
+                        Comment=Sub("${AWS::StackName} origin access")
+                    )
+                )
+            )
+        )
+        t.add_resource(
+            s3.BucketPolicy(
+                BUCKET_POLICY,
+                Bucket=variables["BucketName"],
+                PolicyDocument=cloudfront_origin_access_bucket_policy(
+                    variables["BucketName"],
+                    GetAtt(ORIGIN_ACCESS_IDENTITY, "S3CanonicalUserId"),
+                ),
+            )
+        )
+        t.add_output(
+            Output("OriginAccessIdentity", Value=Ref(ORIGIN_ACCESS_IDENTITY))
+        )
+
+    def create_cache_policy(self):
+        t = self.template
+        variables = self.get_variables()
+        compress = variables["Compress"]
+
+        t.add_resource(
+            cloudfront.CachePolicy(
+                CACHE_POLICY,
+                CachePolicyConfig=cloudfront.CachePolicyConfig(
+                    Name=Sub("${AWS::StackName}-cache"),
+                    DefaultTTL=variables["DefaultTTL"],
+                    MinTTL=variables["MinTTL"],
+                    MaxTTL=variables["MaxTTL"],
+                    ParametersInCacheKeyAndForwardedToOrigin=(
+                        cloudfront.ParametersInCacheKeyAndForwardedToOrigin(
+                            CookiesConfig=cloudfront.CacheCookiesConfig(
+                                CookieBehavior="none"
+                            ),
+                            EnableAcceptEncodingGzip=compress,
+                            EnableAcceptEncodingBrotli=compress,
+                            HeadersConfig=cloudfront.CacheHeadersConfig(
+                                HeaderBehavior="none"
+                            ),
+                            QueryStringsConfig=(
+                                cloudfront.CacheQueryStringsConfig(
+                                    QueryStringBehavior="none"
+                                )
+                            ),
+                        )
+                    ),
+                )
+            )
+        )
+        t.add_output(Output("CachePolicyId", Value=Ref(CACHE_POLICY)))
+
+    def get_origin(self):
+        variables = self.get_variables()
+        origin_path = variables["OriginPath"] or Ref("AWS::NoValue")
+
+        if self.use_origin_access_identity():
+            return cloudfront.Origin(
+                Id=ORIGIN_ID,
+                DomainName=variables["BucketDomainName"],
+                OriginPath=origin_path,
+                S3OriginConfig=cloudfront.S3OriginConfig(
+                    OriginAccessIdentity=Join(
+                        "",
+                        ["origin-access-identity/cloudfront/",
+                         Ref(ORIGIN_ACCESS_IDENTITY)]
+                    )
+                ),
+            )
+
+        # S3 website endpoints only support HTTP.
+        return cloudfront.Origin(
+            Id=ORIGIN_ID,
+            DomainName=Join(".", [variables["BucketName"],
+                                  variables["WebsiteEndpoint"]]),
+            OriginPath=origin_path,
+            CustomOriginConfig=cloudfront.CustomOriginConfig(
+                OriginProtocolPolicy="http-only",
+            ),
+        )
+
+    def get_viewer_certificate(self):
+        variables = self.get_variables()
+
+        if not variables["AcmCertificateArn"]:
+            return cloudfront.ViewerCertificate(
+                CloudFrontDefaultCertificate=True,
+            )
+
+        return cloudfront.ViewerCertificate(
+            AcmCertificateArn=variables["AcmCertificateArn"],
+            MinimumProtocolVersion=variables["MinimumProtocolVersion"],
+            SslSupportMethod="sni-only",
+        )
+
+    def create_distribution(self):
+        t = self.template
+        variables = self.get_variables()
+
+        error_responses = [
+            cloudfront.CustomErrorResponse.from_dict(None, response)
+            for response in variables["CustomErrorResponses"]
+        ]
+
+        t.add_resource(
+            cloudfront.Distribution(
+                DISTRIBUTION,
+                DistributionConfig=cloudfront.DistributionConfig(
+                    Aliases=variables["Aliases"] or Ref("AWS::NoValue"),
+                    Comment=Ref("AWS::StackName"),
+                    CustomErrorResponses=(
+                        error_responses or Ref("AWS::NoValue")
+                    ),
+                    DefaultCacheBehavior=cloudfront.DefaultCacheBehavior(
+                        AllowedMethods=["GET", "HEAD", "OPTIONS"],
+                        CachedMethods=["GET", "HEAD"],
+                        CachePolicyId=Ref(CACHE_POLICY),
+                        Compress=variables["Compress"],
+                        TargetOriginId=ORIGIN_ID,
+                        ViewerProtocolPolicy="redirect-to-https",
+                    ),
+                    DefaultRootObject=variables["DefaultRootObject"],
+                    Enabled=True,
+                    HttpVersion=variables["HttpVersion"],
+                    IPV6Enabled=variables["IPV6Enabled"],
+                    Origins=[self.get_origin()],
+                    PriceClass=variables["PriceClass"],
+                    ViewerCertificate=self.get_viewer_certificate(),
+                    WebACLId=variables["WebACLId"] or Ref("AWS::NoValue"),
+                ),
+            )
+        )
+        t.add_output(Output("DistributionId", Value=Ref(DISTRIBUTION)))
+        t.add_output(
+            Output(
+                "DistributionDomainName",
+                Value=GetAtt(DISTRIBUTION, "DomainName")
+            )
+        )
+
+    def create_alias_records(self):
+        t = self.template
+        variables = self.get_variables()
+
+        if not (variables["HostedZoneId"] and variables["Aliases"]):
+            return
+
+        record_types = ["A"]
+        if variables["IPV6Enabled"]:
+            record_types.append("AAAA")
+
+        record_sets = []
+        for alias in variables["Aliases"]:
+            for record_type in record_types:
+                record_sets.append(
+                    route53.RecordSet(
+                        Name=alias,
+                        Type=record_type,
+                        AliasTarget=route53.AliasTarget(
+                            HostedZoneId=CLOUDFRONT_ZONE_ID,
+                            DNSName=GetAtt(DISTRIBUTION, "DomainName"),
+                        ),
+                    )
+                )
+
+        t.add_resource(
+            route53.RecordSetGroup(
+                ALIAS_RECORDS,
+                HostedZoneId=variables["HostedZoneId"],
+                RecordSets=record_sets,
+            )
+        )
+
+    def create_template(self):
+        self.validate_variables()
+        self.create_origin_access_identity()
+        self.create_cache_policy()
+        self.create_distribution()
+        self.create_alias_records()
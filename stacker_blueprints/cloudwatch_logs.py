@@ -1,7 +1,23 @@
 from stacker.blueprints.base import Blueprint
 from stacker.blueprints.variables.types import TroposphereType
 
-from troposphere import logs, Output, Ref
+from troposphere import (
+    cloudwatch,
+    iam,
+    logs,
+    AWSProperty,
+    GetAtt,
+    Output,
+    Ref,
+    Sub,
+)
+
+from awacs.aws import Allow, AWSPrincipal, Policy, Statement
+import awacs.firehose
+import awacs.kinesis
+import awacs.logs
+
+from .policies import make_simple_assume_policy
 
 
 LOG_RETENTION_VALUES = [
@@ -10,6 +26,45 @@ LOG_RETENTION_VALUES = [
 ]
 LOG_RETENTION_STRINGS = [str(x) for x in LOG_RETENTION_VALUES]
 
+# Resource name constants
+SUBSCRIPTION_ROLE = "SubscriptionRole"
+DESTINATION = "Destination"
+
+DISTRIBUTIONS = ["ByLogStream", "Random"]
+
+# reference:
+#   https://docs.aws.amazon.com/AmazonCloudWatch/latest/logs/MonitoringPolicyExamples.html  # noqa
+MAX_METRIC_FILTER_DIMENSIONS = 3
+ALARM_DEFAULTS = {
+    "ComparisonOperator": "GreaterThanThreshold",
+    "EvaluationPeriods": 1,
+    "Period": 60,
+    "Statistic": "Sum",
+    "TreatMissingData": "notBreaching",
+}
+
+
+class MetricFilterDimension(AWSProperty):
+    props = {
+        'Key': (basestring, True),
+        'Value': (basestring, True),
+    }
+
+
+class MetricTransformation(logs.MetricTransformation):
+    props = dict(
+        logs.MetricTransformation.props,
+        Dimensions=([MetricFilterDimension], False),
+        Unit=(basestring, False),
+    )
+
+
+class SubscriptionFilter(logs.SubscriptionFilter):
+    props = dict(
+        logs.SubscriptionFilter.props,
+        Distribution=(basestring, False),
+    )
+
 
 def validate_cloudwatch_log_retention(value):
     if value not in LOG_RETENTION_VALUES:
@@ -22,20 +77,271 @@ def validate_cloudwatch_log_retention(value):
     return value
 
 
+def is_field_reference(value):
+    """Returns True if a value is a field of a log event, ie: $.latency"""
+    return isinstance(value, str) and value.startswith("$")
+
+
+def validate_metric_filter(title, spec):
+    """Validates the compact spec of a MetricFilters metric filter.
+
+    Raises:
+        ValueError: If the spec is missing a MetricName, LogGroupName or
+            MetricNamespace, has too many dimensions, dimensions that aren't
+            fields of the log event, or both Dimensions & a DefaultValue.
+    """
+    for key in ("LogGroupName", "MetricName", "MetricNamespace"):
+        if not spec.get(key):
+            raise ValueError("Metric filter %s requires a %s." % (title, key))
+
+    dimensions = spec.get("Dimensions", {})
+    if len(dimensions) > MAX_METRIC_FILTER_DIMENSIONS:
+        raise ValueError("Metric filter %s can have at most %d Dimensions." %
+                         (title, MAX_METRIC_FILTER_DIMENSIONS))
+    for name, value in dimensions.items():
+        if not is_field_reference(value):
+            raise ValueError("Dimension %s of metric filter %s must be a "
+                             "field of the log event, ie: $.%s" %
+                             (name, title, name))
+    if dimensions and "DefaultValue" in spec:
+        raise ValueError("Metric filter %s can't have both Dimensions and a "
+                         "DefaultValue." % title)
+
+
+def metric_transformation(spec):
+    """Returns the MetricTransformation of a metric filter spec.
+
+    MetricValue defaults to 1, to count the matching log events. A field of
+    the log event, such as $.latency, can be given instead.
+    """
+    transformation = MetricTransformation(
+        MetricName=spec["MetricName"],
+        MetricNamespace=spec["MetricNamespace"],
+        MetricValue=str(spec.get("MetricValue", "1")),
+    )
+    if "DefaultValue" in spec:
+        transformation.DefaultValue = float(spec["DefaultValue"])
+    if spec.get("Dimensions"):
+        transformation.Dimensions = [
+            MetricFilterDimension(Key=name, Value=value)
+            for name, value in sorted(spec["Dimensions"].items())
+        ]
+    if spec.get("Unit"):
+        transformation.Unit = spec["Unit"]
+    return transformation
+
+
+def metric_alarm(title, spec, alarm_actions):
+    """Returns an alarm on the metric of a metric filter spec.
+
+    The alarm spec contains the attributes of a
+    :class:`troposphere.cloudwatch.Alarm`, with Threshold being required.
+    Dimensions are a dictionary of dimension names to values, and must have
+    the same names as the metric filter's Dimensions, as the metric is only
+    published with all of them.
+    """
+    alarm = dict(ALARM_DEFAULTS)
+    alarm.update(spec["Alarm"])
+    if "Threshold" not in alarm:
+        raise ValueError("The alarm of metric filter %s requires a "
+                         "Threshold." % title)
+
+    filter_dimensions = sorted(spec.get("Dimensions", {}))
+    alarm_dimensions = sorted(alarm.get("Dimensions", {}))
+    if alarm_dimensions != filter_dimensions:
+        raise ValueError("The alarm of metric filter %s must have the "
+                         "Dimensions: %s." %
+                         (title, ", ".join(filter_dimensions) or "none"))
+
+    alarm["Threshold"] = str(alarm["Threshold"])
+    alarm["MetricName"] = spec["MetricName"]
+    alarm["Namespace"] = spec["MetricNamespace"]
+    if alarm_actions:
+        alarm.setdefault("AlarmActions", alarm_actions)
+    if "Dimensions" in alarm:
+        alarm["Dimensions"] = [
+            cloudwatch.MetricDimension(Name=name, Value=value)
+            for name, value in sorted(alarm["Dimensions"].items())
+        ]
+    if "Unit" not in alarm and spec.get("Unit"):
+        alarm["Unit"] = spec["Unit"]
+    return cloudwatch.Alarm(title + "Alarm", **alarm)
+
+
+def stream_service(stream_arn):
+    """Returns the service (kinesis or firehose) of a stream ARN."""
+    service = stream_arn.split(":")[2] if stream_arn.count(":") >= 5 else ""
+    if service not in ("kinesis", "firehose"):
+        raise ValueError("%s is not the ARN of a Kinesis stream or Firehose "
+                         "delivery stream." % stream_arn)
+    return service
+
+
+def subscription_role_statements(stream_arn):
+    """Allows CloudWatch Logs to put records into a stream."""
+    if stream_service(stream_arn) == "kinesis":
+        actions = [awacs.kinesis.PutRecord, awacs.kinesis.PutRecords]
+    else:
+        actions = [awacs.firehose.PutRecord, awacs.firehose.PutRecordBatch]
+    return [
+        Statement(
+            Effect=Allow,
+            Action=actions,
+            Resource=[stream_arn],
+        )
+    ]
+
+
+def destination_policy(destination_name, account_ids):
+    """Allows other accounts to subscribe log groups to a destination."""
+    return Policy(
+        Version="2012-10-17",
+        Statement=[
+            Statement(
+                Effect=Allow,
+                Principal=AWSPrincipal(account_ids),
+                Action=[awacs.logs.PutSubscriptionFilter],
+                Resource=[
+                    "arn:aws:logs:${AWS::Region}:${AWS::AccountId}:"
+                    "destination:" + destination_name
+                ],
+            )
+        ]
+    )
+
+
 class SubscriptionFilters(Blueprint):
+    """Subscribes log groups to a destination.
+
+    If StreamArn is given, a role allowing CloudWatch Logs to write to the
+    Kinesis stream (or Firehose delivery stream) is created, and used by any
+    filter without a DestinationArn. Filters on Kinesis streams distribute
+    log events randomly across shards by default, rather than by log
+    stream, so that a busy log stream doesn't overload a single shard.
+
+    If DestinationAccounts are given, a logs.Destination is also created,
+    which other accounts can subscribe their log groups to.
+    """
 
     VARIABLES = {
         "SubscriptionFilters": {
-            "type": TroposphereType(logs.SubscriptionFilter, many=True),
-            "description": "Subscription filters to create.",
-        }
+            "type": TroposphereType(SubscriptionFilter, many=True,
+                                    optional=True, validate=False),
+            "description": "Subscription filters to create. DestinationArn "
+                           "and RoleArn can be omitted when StreamArn is "
+                           "given.",
+            "default": {},
+        },
+        "StreamArn": {
+            "type": str,
+            "description": "The ARN of a Kinesis stream or Firehose delivery "
+                           "stream to send log events to.",
+            "default": "",
+        },
+        "Distribution": {
+            "type": str,
+            "description": "How log events are distributed across the "
+                           "shards of a Kinesis StreamArn.",
+            "default": "Random",
+            "allowed_values": DISTRIBUTIONS,
+        },
+        "DestinationName": {
+            "type": str,
+            "description": "The name of the logs.Destination created for "
+                           "DestinationAccounts.",
+            "default": "",
+        },
+        "DestinationAccounts": {
+            "type": list,
+            "description": "A list of account IDs allowed to subscribe log "
+                           "groups to the StreamArn, through a "
+                           "logs.Destination. Requires StreamArn and "
+                           "DestinationName.",
+            "default": [],
+        },
     }
 
-    def create_template(self):
+    def validate_variables(self):
+        variables = self.get_variables()
+        if variables["StreamArn"]:
+            stream_service(variables["StreamArn"])
+
+        if variables["DestinationAccounts"]:
+            if not variables["StreamArn"]:
+                raise ValueError("StreamArn is required when "
+                                 "DestinationAccounts are given.")
+            if not variables["DestinationName"]:
+                raise ValueError("DestinationName is required when "
+                                 "DestinationAccounts are given.")
+
+    def create_subscription_role(self):
+        t = self.template
+        stream_arn = self.get_variables()["StreamArn"]
+
+        if not stream_arn:
+            return
+
+        t.add_resource(
+            iam.Role(
+                SUBSCRIPTION_ROLE,
+                AssumeRolePolicyDocument=make_simple_assume_policy(
+                    "logs.amazonaws.com"
+                ),
+                Policies=[
+                    iam.Policy(
+                        PolicyName="put-records",
+                        PolicyDocument=Policy(
+                            Statement=subscription_role_statements(
+                                stream_arn
+                            )
+                        ),
+                    )
+                ],
+            )
+        )
+        t.add_output(
+            Output("SubscriptionRoleArn",
+                   Value=GetAtt(SUBSCRIPTION_ROLE, "Arn"))
+        )
+
+    def create_destination(self):
+        t = self.template
+        variables = self.get_variables()
+
+        if not variables["DestinationAccounts"]:
+            return
+
+        destination_name = variables["DestinationName"]
+        t.add_resource(
+            logs.Destination(
+                DESTINATION,
+                DestinationName=destination_name,
+                DestinationPolicy=Sub(
+                    destination_policy(
+                        destination_name, variables["DestinationAccounts"]
+                    ).to_json(indent=None)
+                ),
+                RoleArn=GetAtt(SUBSCRIPTION_ROLE, "Arn"),
+                TargetArn=variables["StreamArn"],
+            )
+        )
+        t.add_output(
+            Output("DestinationArn", Value=GetAtt(DESTINATION, "Arn"))
+        )
+
+    def create_subscription_filters(self):
         t = self.template
         variables = self.get_variables()
+        stream_arn = variables["StreamArn"]
+
+        for _filter in variables["SubscriptionFilters"] or []:
+            if stream_arn and "DestinationArn" not in _filter.properties:
+                _filter.DestinationArn = stream_arn
+                _filter.RoleArn = GetAtt(SUBSCRIPTION_ROLE, "Arn")
+                if stream_service(stream_arn) == "kinesis" and \
+                        "Distribution" not in _filter.properties:
+                    _filter.Distribution = variables["Distribution"]
 
-        for _filter in variables["SubscriptionFilters"]:
             t.add_resource(_filter)
             t.add_output(
                 Output(
@@ -43,3 +349,98 @@ class SubscriptionFilters(Blueprint):
                     Value=Ref(_filter)
                 )
             )
+
+    def create_template(self):
+        self.validate_variables()
+        self.create_subscription_role()
+        self.create_destination()
+        self.create_subscription_filters()
+
+
+class MetricFilters(Blueprint):
+    """Creates metrics (and optionally alarms) from log events.
+
+    Each metric filter is a compact spec, ie::
+
+        Latency:
+          LogGroupName: /app/web
+          FilterPattern: '{ $.latency = * }'
+          MetricName: Latency
+          MetricValue: $.latency
+          Unit: Milliseconds
+          Dimensions:
+            Route: $.route
+          Alarm:
+            Statistic: Average
+            Threshold: 500
+            Dimensions:
+              Route: /checkout
+
+    LogGroupName and MetricNamespace default to the variables of the same
+    name.
+    """
+
+    VARIABLES = {
+        "MetricFilters": {
+            "type": dict,
+            "description": "A dictionary of titles to metric filter specs. "
+                           "Valid keys are: LogGroupName, FilterPattern, "
+                           "MetricName, MetricNamespace, MetricValue "
+                           "(defaults to 1, or a field such as $.latency), "
+                           "DefaultValue, Unit, Dimensions (a dictionary of "
+                           "dimension names to fields, at most 3) and Alarm "
+                           "(the attributes of a "
+                           "troposphere.cloudwatch.Alarm).",
+        },
+        "LogGroupName": {
+            "type": str,
+            "description": "The log group of metric filters that don't "
+                           "specify one.",
+            "default": "",
+        },
+        "MetricNamespace": {
+            "type": str,
+            "description": "The namespace of metric filters that don't "
+                           "specify one.",
+            "default": "",
+        },
+        "AlarmActions": {
+            "type": list,
+            "description": "The actions (ie: SNS topic ARNs) of alarms that "
+                           "don't specify any.",
+            "default": [],
+        },
+    }
+
+    def get_metric_filter_spec(self, title, spec):
+        variables = self.get_variables()
+        spec = dict(spec)
+        spec.setdefault("LogGroupName", variables["LogGroupName"])
+        spec.setdefault("MetricNamespace", variables["MetricNamespace"])
+        validate_metric_filter(title, spec)
+        return spec
+
+    def create_template(self):
+        t = self.template
+        variables = self.get_variables()
+
+        for title, spec in sorted(variables["MetricFilters"].items()):
+            spec = self.get_metric_filter_spec(title, spec)
+
+            _filter = t.add_resource(
+                logs.MetricFilter(
+                    title,
+                    FilterPattern=spec.get("FilterPattern", ""),
+                    LogGroupName=spec["LogGroupName"],
+                    MetricTransformations=[metric_transformation(spec)],
+                )
+            )
+            t.add_output(Output("%sName" % title, Value=Ref(_filter)))
+
+            if spec.get("Alarm"):
+                alarm = t.add_resource(
+                    metric_alarm(title, spec, variables["AlarmActions"])
+                )
+                t.add_output(
+                    Output("%sArn" % alarm.title, Value=GetAtt(alarm, "Arn"))
+                )
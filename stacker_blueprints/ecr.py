@@ -1,6 +1,125 @@
+import json
+
 from stacker.blueprints.base import Blueprint
+from stacker.util import cf_safe_name
+
+from troposphere import (
+    AWSObject,
+    AWSProperty,
+    AccountId,
+    Not,
+    Region,
+    ecr,
+)
+
+from .util import check_properties
+
+LIFECYCLE_POLICY_KEYS = [
+    "ExpireUntaggedDays",
+    "KeepTaggedImages",
+    "TagPatterns",
+]
+
+
+class RepositoryFilter(AWSProperty):
+    props = {
+        "Filter": (basestring, True),
+        "FilterType": (basestring, True),
+    }
+
+
+class ReplicationRule(ecr.ReplicationRule):
+    props = dict(
+        ecr.ReplicationRule.props,
+        RepositoryFilters=([RepositoryFilter], False),
+    )
+
+
+class ReplicationConfigurationProperty(AWSProperty):
+    props = {
+        "Rules": ([ReplicationRule], True),
+    }
+
+
+# troposphere 2.7.1 models AWS::ECR::ReplicationConfiguration with the
+# wrong type and property names, and has no AWS::ECR::PullThroughCacheRule.
+class ReplicationConfiguration(AWSObject):
+    resource_type = "AWS::ECR::ReplicationConfiguration"
+
+    props = {
+        "ReplicationConfiguration": (ReplicationConfigurationProperty, True),
+    }
+
+
+class PullThroughCacheRule(AWSObject):
+    resource_type = "AWS::ECR::PullThroughCacheRule"
+
+    props = {
+        "EcrRepositoryPrefix": (basestring, False),
+        "UpstreamRegistryUrl": (basestring, False),
+    }
+
+
+def lifecycle_policy_rules(policy):
+    """Returns the rules of a repository lifecycle policy.
+
+    Args:
+        policy (dict): With ExpireUntaggedDays (the number of days after
+            which untagged images are expired), KeepTaggedImages (the number
+            of most recent tagged images to keep) and TagPatterns (the tags
+            KeepTaggedImages applies to, defaults to all tags).
+
+    Returns:
+        list: The rules, in order of priority.
+    """
+    check_properties(policy, LIFECYCLE_POLICY_KEYS, "LifecyclePolicy")
+    rules = []
 
-from troposphere import ecr
+    expire_untagged_days = policy.get("ExpireUntaggedDays")
+    if expire_untagged_days is not None:
+        if expire_untagged_days < 1:
+            raise ValueError("ExpireUntaggedDays must be at least 1.")
+        rules.append({
+            "description": "Expire untagged images after %d days." %
+                           expire_untagged_days,
+            "selection": {
+                "tagStatus": "untagged",
+                "countType": "sinceImagePushed",
+                "countUnit": "days",
+                "countNumber": expire_untagged_days,
+            },
+        })
+
+    keep_tagged_images = policy.get("KeepTaggedImages")
+    if keep_tagged_images is not None:
+        if keep_tagged_images < 1:
+            raise ValueError("KeepTaggedImages must be at least 1.")
+        rules.append({
+            "description": "Keep the last %d tagged images." %
+                           keep_tagged_images,
+            "selection": {
+                "tagStatus": "tagged",
+                "tagPatternList": policy.get("TagPatterns", ["*"]),
+                "countType": "imageCountMoreThan",
+                "countNumber": keep_tagged_images,
+            },
+        })
+
+    for priority, rule in enumerate(rules, 1):
+        rule["rulePriority"] = priority
+        rule["action"] = {"type": "expire"}
+    return rules
+
+
+def lifecycle_policy(policy):
+    """Returns the LifecyclePolicy of a repository, or None if the policy
+    has no rules."""
+    rules = lifecycle_policy_rules(policy)
+    if not rules:
+        return None
+    return ecr.LifecyclePolicy(
+        LifecyclePolicyText=json.dumps({"rules": rules}, sort_keys=True),
+    )
 
 
 class Repositories(Blueprint):
@@ -9,17 +128,122 @@ class Repositories(Blueprint):
         "Repositories": {
             "type": list,
             "description": "A list of repository names to create."
-        }
+        },
+        "LifecyclePolicy": {
+            "type": dict,
+            "description": "A lifecycle policy applied to the repositories, "
+                           "to stop them filling up with stale images. Valid "
+                           "keys are: ExpireUntaggedDays (the number of days "
+                           "after which untagged images are expired), "
+                           "KeepTaggedImages (the number of most recent "
+                           "tagged images to keep) and TagPatterns (the "
+                           "tags KeepTaggedImages applies to, defaults to "
+                           "all tags).",
+            "default": {},
+        },
+        "ReplicationRegions": {
+            "type": list,
+            "description": "A list of regions to replicate images to, so "
+                           "they can be pulled locally. Replication is "
+                           "configured for the whole registry, so only one "
+                           "stack per account should set this. Can't "
+                           "include the stack's own region.",
+            "default": [],
+        },
+        "ReplicationRepositoryPrefixes": {
+            "type": list,
+            "description": "A list of repository name prefixes to limit "
+                           "ReplicationRegions to. Omit to replicate all "
+                           "repositories.",
+            "default": [],
+        },
+        "PullThroughCacheRules": {
+            "type": dict,
+            "description": "A dictionary of repository prefixes to the URL "
+                           "of an upstream registry, ie: public.ecr.aws, to "
+                           "cache images from.",
+            "default": {},
+        },
     }
 
-    def create_template(self):
+    def create_repositories(self):
         t = self.template
         variables = self.get_variables()
+        policy = lifecycle_policy(variables["LifecyclePolicy"])
 
         for repo in variables["Repositories"]:
+            repository = ecr.Repository(
+                "%sRepository" % repo,
+                RepositoryName=repo,
+            )
+            if policy:
+                repository.LifecyclePolicy = policy
+            t.add_resource(repository)
+
+    def create_replication_configuration(self):
+        t = self.template
+        variables = self.get_variables()
+
+        regions = variables["ReplicationRegions"]
+        if not regions:
+            return
+        if len(set(regions)) != len(regions):
+            raise ValueError("ReplicationRegions must be unique.")
+
+        # The stack's region isn't known until it's deployed, so use a rule
+        # to stop CloudFormation replicating the registry to itself.
+        t.add_rule(
+            "ReplicationRegionsRule",
+            {
+                "Assertions": [
+                    {
+                        "Assert": Not({"Fn::Contains": [regions, Region]}),
+                        "AssertDescription": "ReplicationRegions can't "
+                                             "include the stack's region.",
+                    },
+                ],
+            }
+        )
+
+        rule = ReplicationRule(
+            Destinations=[
+                ecr.ReplicationDestination(
+                    Region=region,
+                    RegistryId=AccountId,
+                )
+                for region in regions
+            ],
+        )
+        if variables["ReplicationRepositoryPrefixes"]:
+            rule.RepositoryFilters = [
+                RepositoryFilter(Filter=prefix, FilterType="PREFIX_MATCH")
+                for prefix in variables["ReplicationRepositoryPrefixes"]
+            ]
+
+        t.add_resource(
+            ReplicationConfiguration(
+                "ReplicationConfiguration",
+                ReplicationConfiguration=ReplicationConfigurationProperty(
+                    Rules=[rule],
+                ),
+            )
+        )
+
+    def create_pull_through_cache_rules(self):
+        t = self.template
+        variables = self.get_variables()
+
+        rules = variables["PullThroughCacheRules"]
+        for prefix, upstream_registry_url in sorted(rules.items()):
             t.add_resource(
-                ecr.Repository(
-                    "%sRepository" % repo,
-                    RepositoryName=repo,
+                PullThroughCacheRule(
+                    "%sPullThroughCacheRule" % cf_safe_name(prefix),
+                    EcrRepositoryPrefix=prefix,
+                    UpstreamRegistryUrl=upstream_registry_url,
                 )
             )
+
+    def create_template(self):
+        self.create_repositories()
+        self.create_replication_configuration()
+        self.create_pull_through_cache_rules()
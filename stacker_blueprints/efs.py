@@ -1,5 +1,5 @@
 from troposphere import ec2, efs
-from troposphere import Join, Output, Ref, Tags
+from troposphere import AWSProperty, GetAtt, Join, Output, Ref, Tags
 
 from stacker.blueprints.base import Blueprint
 from stacker.blueprints.variables.types import TroposphereType
@@ -7,6 +7,41 @@ from stacker.exceptions import ValidatorError
 
 from stacker_blueprints.util import merge_tags
 
+THROUGHPUT_MODES = ['bursting', 'provisioned', 'elastic']
+MIN_PROVISIONED_THROUGHPUT = 1.0
+MAX_PROVISIONED_THROUGHPUT = 3414.0
+TRANSITION_TO_IA_VALUES = [
+    'AFTER_1_DAY', 'AFTER_7_DAYS', 'AFTER_14_DAYS', 'AFTER_30_DAYS',
+    'AFTER_60_DAYS', 'AFTER_90_DAYS', 'AFTER_180_DAYS', 'AFTER_270_DAYS',
+    'AFTER_365_DAYS'
+]
+TRANSITION_TO_PRIMARY_VALUES = ['AFTER_1_ACCESS']
+
+
+def throughput_mode_validator(mode):
+    if mode not in THROUGHPUT_MODES:
+        raise ValueError('ThroughputMode must be one of: {}'.format(
+            ', '.join(THROUGHPUT_MODES)))
+    return mode
+
+
+# troposphere 2.7.1 doesn't support the elastic ThroughputMode, and its
+# LifecyclePolicy requires TransitionToIA, with no
+# TransitionToPrimaryStorageClass.
+class LifecyclePolicy(AWSProperty):
+    props = {
+        'TransitionToIA': (basestring, False),
+        'TransitionToPrimaryStorageClass': (basestring, False),
+    }
+
+
+class FileSystem(efs.FileSystem):
+    props = dict(
+        efs.FileSystem.props,
+        LifecyclePolicies=([LifecyclePolicy], False),
+        ThroughputMode=(throughput_mode_validator, False),
+    )
+
 
 class ElasticFileSystem(Blueprint):
     VARIABLES = {
@@ -19,6 +54,40 @@ class ElasticFileSystem(Blueprint):
             'description': 'The performance mode of the file system',
             'default': 'generalPurpose'
         },
+        'ThroughputMode': {
+            'type': str,
+            'description': 'The throughput mode of the file system. One of: '
+                           '{}. bursting throughput scales with the amount '
+                           'of data stored and spends burst credits, '
+                           'provisioned uses ProvisionedThroughputInMibps '
+                           'and elastic scales with the workload.'.format(
+                               ', '.join(THROUGHPUT_MODES)),
+            'default': 'bursting',
+            'allowed_values': THROUGHPUT_MODES
+        },
+        'ProvisionedThroughputInMibps': {
+            'type': float,
+            'description': 'The throughput, in MiB/s, to provision for the '
+                           'file system. Required (and only valid) when '
+                           'ThroughputMode is provisioned.',
+            'default': 0.0
+        },
+        'TransitionToIA': {
+            'type': str,
+            'description': 'Move files not accessed in this long to the '
+                           'Infrequent Access storage class, ie: '
+                           'AFTER_30_DAYS. Omit to never move files.',
+            'default': '',
+            'allowed_values': [''] + TRANSITION_TO_IA_VALUES
+        },
+        'TransitionToPrimaryStorageClass': {
+            'type': str,
+            'description': 'Move files back out of Infrequent Access when '
+                           'they are accessed. Set to AFTER_1_ACCESS to '
+                           'enable.',
+            'default': '',
+            'allowed_values': [''] + TRANSITION_TO_PRIMARY_VALUES
+        },
         'Tags': {
             'type': dict,
             'description': 'Tags to associate with the created resources',
@@ -57,6 +126,18 @@ class ElasticFileSystem(Blueprint):
             'description': "List of existing SecurityGroup IDs to be asigned "
                            "to this filesystem's MountTargets",
             'default': []
+        },
+        'AccessPoints': {
+            'type': TroposphereType(efs.AccessPoint, many=True,
+                                    optional=True, validate=False),
+            'description': "Dictionary of titles to AccessPoint definitions "
+                           "to be created for this filesystem, ie: one per "
+                           "consumer. The FileSystemId property will be "
+                           "filled automatically, so it should not be "
+                           "included. The ID and ARN of each access point "
+                           "are exported as the <title>Id and <title>Arn "
+                           "outputs.",
+            'default': {}
         }
     }
 
@@ -91,11 +172,33 @@ class ElasticFileSystem(Blueprint):
                 'IpAddresses', validator, v['IpAddresses'],
                 'The number of IpAddresses must match the number of Subnets')
 
+    def validate_efs_throughput(self):
+        validator = '{}.{}'.format(type(self).__name__,
+                                   'validate_efs_throughput')
+        v = self.get_variables()
+
+        throughput = v['ProvisionedThroughputInMibps']
+        if v['ThroughputMode'] == 'provisioned':
+            if not (MIN_PROVISIONED_THROUGHPUT <= throughput <=
+                    MAX_PROVISIONED_THROUGHPUT):
+                raise ValidatorError(
+                    'ProvisionedThroughputInMibps', validator, throughput,
+                    'ProvisionedThroughputInMibps must be between {} and {} '
+                    'in provisioned ThroughputMode'.format(
+                        MIN_PROVISIONED_THROUGHPUT,
+                        MAX_PROVISIONED_THROUGHPUT))
+        elif throughput:
+            raise ValidatorError(
+                'ProvisionedThroughputInMibps', validator, throughput,
+                'ProvisionedThroughputInMibps can only be set in provisioned '
+                'ThroughputMode')
+
     def resolve_variables(self, provided_variables):
         super(ElasticFileSystem, self).resolve_variables(provided_variables)
 
         self.validate_efs_security_groups()
         self.validate_efs_subnets()
+        self.validate_efs_throughput()
 
     def prepare_efs_security_groups(self):
         t = self.template
@@ -121,10 +224,31 @@ class ElasticFileSystem(Blueprint):
         t = self.template
         v = self.get_variables()
 
-        fs = t.add_resource(efs.FileSystem(
+        fs = FileSystem(
             'EfsFileSystem',
             FileSystemTags=Tags(v['Tags']),
-            PerformanceMode=v['PerformanceMode']))
+            PerformanceMode=v['PerformanceMode'])
+
+        if v['ThroughputMode'] != 'bursting':
+            fs.ThroughputMode = v['ThroughputMode']
+        if v['ThroughputMode'] == 'provisioned':
+            fs.ProvisionedThroughputInMibps = float(
+                v['ProvisionedThroughputInMibps'])
+
+        # Each policy can only contain a single transition
+        lifecycle_policies = []
+        if v['TransitionToIA']:
+            lifecycle_policies.append(
+                LifecyclePolicy(TransitionToIA=v['TransitionToIA']))
+        if v['TransitionToPrimaryStorageClass']:
+            lifecycle_policies.append(
+                LifecyclePolicy(
+                    TransitionToPrimaryStorageClass=v[
+                        'TransitionToPrimaryStorageClass']))
+        if lifecycle_policies:
+            fs.LifecyclePolicies = lifecycle_policies
+
+        fs = t.add_resource(fs)
 
         t.add_output(Output(
             'EfsFileSystemId',
@@ -158,6 +282,24 @@ class ElasticFileSystem(Blueprint):
             'EfsMountTargetIds',
             Value=Join(',', list(map(Ref, mount_targets)))))
 
+    def create_efs_access_points(self, fs):
+        t = self.template
+        v = self.get_variables()
+
+        for ap in v['AccessPoints'] or []:
+            ap.FileSystemId = Ref(fs)
+            ap.AccessPointTags = merge_tags(
+                v['Tags'], getattr(ap, 'AccessPointTags', {}))
+
+            ap = t.add_resource(ap)
+            t.add_output(Output(
+                '{}Id'.format(ap.title),
+                Value=Ref(ap)))
+            t.add_output(Output(
+                '{}Arn'.format(ap.title),
+                Value=GetAtt(ap, 'Arn')))
+
     def create_template(self):
         fs = self.create_efs_filesystem()
         self.create_efs_mount_targets(fs)
+        self.create_efs_access_points(fs)
@@ -15,10 +15,43 @@ SUBNET_GROUP = "SubnetGroup"
 SECURITY_GROUP = "SecurityGroup"
 REPLICATION_GROUP = "ReplicationGroup"
 DNS_RECORD = "ReplicationGroupDnsRecord"
+READER_DNS_RECORD = "ReplicationGroupReaderDnsRecord"
 PARAMETER_GROUP = "ParameterGroup"
 
 NOVALUE = Ref("AWS::NoValue")
 
+# Workload specific parameter presets. These are applied before
+# ClusterParameters, so any parameter can still be overridden.
+PARAMETER_PRESETS = {
+    # A cache that can always be rebuilt - evict the least recently used
+    # keys when full, and do evictions/expires/deletes and defragmentation
+    # in the background rather than blocking the main thread.
+    "cache": {
+        "maxmemory-policy": "allkeys-lru",
+        "lazyfree-lazy-eviction": "yes",
+        "lazyfree-lazy-expire": "yes",
+        "lazyfree-lazy-server-del": "yes",
+        "activedefrag": "yes",
+    },
+    # A queue must never silently drop data - return errors on writes when
+    # full instead.
+    "queue": {
+        "maxmemory-policy": "noeviction",
+    },
+}
+
+# lazyfree-* & activedefrag were added in redis 4.0
+LEGACY_PARAMETER_GROUP_FAMILIES = ["redis2.6", "redis2.8", "redis3.2"]
+
+
+def validate_parameter_preset(value):
+    if value and value not in PARAMETER_PRESETS:
+        raise ValueError(
+            "ParameterPreset must be one of: %s" % (
+                ", ".join(sorted(PARAMETER_PRESETS)))
+        )
+    return value
+
 
 class BaseReplicationGroup(Blueprint):
     """Base Blueprint for all Elasticache ReplicationGroup blueprints.
@@ -33,6 +66,17 @@ class BaseReplicationGroup(Blueprint):
             "type": dict,
             "default": {},
         },
+        "ParameterPreset": {
+            "type": str,
+            "description": "An optional workload preset of parameters to "
+                           "apply to the parameter group. Any parameters in "
+                           "ClusterParameters override the preset. Valid "
+                           "values: cache (allkeys-lru eviction, lazyfree "
+                           "& activedefrag - requires redis 4.0+), queue "
+                           "(noeviction).",
+            "default": "",
+            "validator": validate_parameter_preset,
+        },
         "VpcId": {
             "type": str,
             "description": "Vpc Id to place the Cluster in"
@@ -134,6 +178,13 @@ class BaseReplicationGroup(Blueprint):
             "description": "Internal domain name, if you have one.",
             "default": "",
         },
+        "InternalReaderHostname": {
+            "type": str,
+            "description": "Internal domain name for the reader endpoint, "
+                           "which balances connections across the "
+                           "replicas, if you want one.",
+            "default": "",
+        },
     }
 
     def engine(self):
@@ -180,10 +231,25 @@ class BaseReplicationGroup(Blueprint):
 
         return variables
 
+    def get_cluster_parameters(self):
+        variables = self.get_variables()
+        preset = variables["ParameterPreset"]
+        params = {}
+        if preset:
+            family = variables["ParameterGroupFamily"]
+            if preset == "cache" and family in LEGACY_PARAMETER_GROUP_FAMILIES:
+                raise ValueError(
+                    "ParameterPreset cache requires redis 4.0 or later, "
+                    "got ParameterGroupFamily %s." % family
+                )
+            params.update(PARAMETER_PRESETS[preset])
+        params.update(variables["ClusterParameters"])
+        return params
+
     def create_parameter_group(self):
         t = self.template
         variables = self.get_variables()
-        params = variables["ClusterParameters"]
+        params = self.get_cluster_parameters()
         t.add_resource(
             ParameterGroup(
                 PARAMETER_GROUP,
@@ -253,12 +319,21 @@ class BaseReplicationGroup(Blueprint):
     def get_secondary_addresses(self):
         return GetAtt(REPLICATION_GROUP, "ReadEndPoint.Addresses.List")
 
+    def get_reader_address(self):
+        return GetAtt(REPLICATION_GROUP, "ReaderEndPoint.Address")
+
     def should_create_internal_cname(self):
         variables = self.get_variables()
         return all([variables["InternalZoneId"],
                     variables["InternalZoneName"],
                     variables["InternalHostname"]])
 
+    def should_create_internal_reader_cname(self):
+        variables = self.get_variables()
+        return all([variables["InternalZoneId"],
+                    variables["InternalZoneName"],
+                    variables["InternalReaderHostname"]])
+
     def create_dns_records(self):
         t = self.template
         variables = self.get_variables()
@@ -276,12 +351,29 @@ class BaseReplicationGroup(Blueprint):
                     TTL="120",
                     ResourceRecords=[primary_endpoint]))
 
+        if self.should_create_internal_reader_cname():
+            t.add_resource(
+                RecordSetType(
+                    READER_DNS_RECORD,
+                    HostedZoneId=variables["InternalZoneId"],
+                    Comment="ReplicationGroup Reader CNAME Record",
+                    Name=Join(".", [variables["InternalReaderHostname"],
+                              variables["InternalZoneName"]]),
+                    Type="CNAME",
+                    TTL="120",
+                    ResourceRecords=[self.get_reader_address()]))
+
     def create_cluster_outputs(self):
         t = self.template
         t.add_output(Output("PrimaryAddress",
                             Value=self.get_primary_address()))
         t.add_output(Output("ReadAddresses",
                             Value=Join(",", self.get_secondary_addresses())))
+        t.add_output(Output("ReaderAddress",
+                            Value=self.get_reader_address()))
+        t.add_output(Output("ReaderPort",
+                            Value=GetAtt(REPLICATION_GROUP,
+                                         "ReaderEndPoint.Port")))
 
         t.add_output(Output("ClusterPort",
                             Value=GetAtt(REPLICATION_GROUP,
@@ -292,6 +384,11 @@ class BaseReplicationGroup(Blueprint):
                 Output(
                     "PrimaryCname",
                     Value=Ref(DNS_RECORD)))
+        if self.should_create_internal_reader_cname():
+            t.add_output(
+                Output(
+                    "ReaderCname",
+                    Value=Ref(READER_DNS_RECORD)))
 
     def create_template(self):
         self.create_parameter_group()
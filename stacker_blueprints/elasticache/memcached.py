@@ -0,0 +1,228 @@
+from troposphere import (
+    Ref, Output, GetAtt, Join
+)
+
+from troposphere.elasticache import (
+    CacheCluster, ParameterGroup
+)
+
+from troposphere.route53 import RecordSetType
+
+from . import base
+
+# Resource name constants
+CACHE_CLUSTER = "CacheCluster"
+DNS_RECORD = "CacheClusterDnsRecord"
+
+NOVALUE = base.NOVALUE
+
+AZ_MODES = ["single-az", "cross-az"]
+MAX_CACHE_NODES = 60
+# Variables of BaseReplicationGroup that memcached doesn't support.
+REDIS_ONLY_VARIABLES = [
+    "ParameterPreset",
+    "AutomaticFailoverEnabled",
+    "NumCacheClusters",
+    "PreferredCacheClusterAZs",
+    "SnapshotArns",
+    "SnapshotRetentionLimit",
+    "SnapshotWindow",
+    "InternalReaderHostname",
+]
+
+
+def validate_az_mode(value):
+    if value not in AZ_MODES:
+        raise ValueError("AZMode must be one of: %s" % ", ".join(AZ_MODES))
+    return value
+
+
+def validate_num_cache_nodes(value):
+    if not (1 <= value <= MAX_CACHE_NODES):
+        raise ValueError(
+            "NumCacheNodes must be between 1 and %d." % MAX_CACHE_NODES
+        )
+    return value
+
+
+def parameter_group_family(engine_version):
+    """Returns the memcached parameter group family for an engine version.
+
+    ie: 1.6.17 -> memcached1.6
+    """
+    return "memcached%s" % ".".join(engine_version.split(".")[:2])
+
+
+class Cluster(base.BaseReplicationGroup):
+    """Blueprint for a memcached CacheCluster.
+
+    Memcached doesn't support ReplicationGroups, so this creates a single
+    CacheCluster with NumCacheNodes nodes instead. Clients should use the
+    configuration endpoint (ConfigurationAddress output) with auto-discovery
+    to find the nodes in the cluster.
+    """
+
+    ALLOWED_ENGINES = ["memcached"]
+
+    VARIABLES = dict(
+        (name, definition)
+        for name, definition in base.BaseReplicationGroup.VARIABLES.items()
+        if name not in REDIS_ONLY_VARIABLES
+    )
+    VARIABLES.update({
+        "AutoMinorVersionUpgrade": {
+            "type": bool,
+            "description": "Set to 'true' to allow minor version upgrades "
+                           "during maintenance windows.",
+            "default": False,
+        },
+        "AZMode": {
+            "type": str,
+            "description": "Whether the nodes are created in a single AZ "
+                           "(single-az) or across multiple AZs (cross-az). "
+                           "cross-az requires NumCacheNodes to be at least "
+                           "2.",
+            "default": "cross-az",
+            "validator": validate_az_mode,
+        },
+        "NumCacheNodes": {
+            "type": int,
+            "description": "The number of cache nodes in the cluster.",
+            "default": 2,
+            "validator": validate_num_cache_nodes,
+        },
+        "PreferredAvailabilityZones": {
+            "type": list,
+            "description": "The AZs to create the cache nodes in. If "
+                           "given, must match the # of nodes in "
+                           "NumCacheNodes.",
+            "default": [],
+        },
+        "PreferredMaintenanceWindow": {
+            "type": str,
+            "description": "A (minimum 60 minute) window in "
+                           "DDD:HH:MM-DDD:HH:MM format in UTC for "
+                           "maintenance, such as minor version upgrades. "
+                           "Default: Sunday 3am-4am PST",
+            "default": "Sun:11:00-Sun:12:00"
+        },
+    })
+
+    def engine(self):
+        return "memcached"
+
+    def get_engine_versions(self):
+        return ["1.4.5", "1.4.14", "1.4.24", "1.4.33", "1.4.34", "1.5.10",
+                "1.5.16", "1.6.6", "1.6.12", "1.6.17", "1.6.22"]
+
+    def get_parameter_group_family(self):
+        return ["memcached1.4", "memcached1.5", "memcached1.6"]
+
+    def defined_variables(self):
+        variables = super(Cluster, self).defined_variables()
+        # The family is derived from EngineVersion if not given.
+        family = variables["ParameterGroupFamily"]
+        family["default"] = ""
+        family["allowed_values"] = [""] + family["allowed_values"]
+        family["description"] += " Defaults to the family of EngineVersion."
+        return variables
+
+    def validate_cache_nodes(self):
+        variables = self.get_variables()
+        node_count = variables["NumCacheNodes"]
+        azs = variables["PreferredAvailabilityZones"]
+
+        if variables["AZMode"] == "cross-az" and node_count < 2:
+            raise ValueError("NumCacheNodes must be at least 2 when AZMode "
+                             "is cross-az.")
+
+        if azs and len(azs) != node_count:
+            raise ValueError("The number of PreferredAvailabilityZones must "
+                             "match NumCacheNodes.")
+
+    def create_parameter_group(self):
+        t = self.template
+        variables = self.get_variables()
+        family = variables["ParameterGroupFamily"] or \
+            parameter_group_family(variables["EngineVersion"])
+        t.add_resource(
+            ParameterGroup(
+                base.PARAMETER_GROUP,
+                Description=self.name,
+                CacheParameterGroupFamily=family,
+                Properties=variables["ClusterParameters"],
+            )
+        )
+
+    def create_cache_cluster(self):
+        t = self.template
+        variables = self.get_variables()
+        self.validate_cache_nodes()
+
+        availability_zones = variables["PreferredAvailabilityZones"] or \
+            NOVALUE
+        notification_topic_arn = variables["NotificationTopicArn"] or \
+            NOVALUE
+        port = variables["Port"] or NOVALUE
+        maintenance_window = variables["PreferredMaintenanceWindow"] or \
+            NOVALUE
+
+        t.add_resource(
+            CacheCluster(
+                CACHE_CLUSTER,
+                AutoMinorVersionUpgrade=variables["AutoMinorVersionUpgrade"],
+                AZMode=variables["AZMode"],
+                CacheNodeType=variables["CacheNodeType"],
+                CacheParameterGroupName=Ref(base.PARAMETER_GROUP),
+                CacheSubnetGroupName=Ref(base.SUBNET_GROUP),
+                Engine=self.engine(),
+                EngineVersion=variables["EngineVersion"],
+                NotificationTopicArn=notification_topic_arn,
+                NumCacheNodes=variables["NumCacheNodes"],
+                Port=port,
+                PreferredAvailabilityZones=availability_zones,
+                PreferredMaintenanceWindow=maintenance_window,
+                VpcSecurityGroupIds=[Ref(base.SECURITY_GROUP), ],
+            )
+        )
+
+    def get_configuration_address(self):
+        return GetAtt(CACHE_CLUSTER, "ConfigurationEndpoint.Address")
+
+    def create_dns_records(self):
+        t = self.template
+        variables = self.get_variables()
+
+        if self.should_create_internal_cname():
+            t.add_resource(
+                RecordSetType(
+                    DNS_RECORD,
+                    HostedZoneId=variables["InternalZoneId"],
+                    Comment="CacheCluster CNAME Record",
+                    Name=Join(".", [variables["InternalHostname"],
+                              variables["InternalZoneName"]]),
+                    Type="CNAME",
+                    TTL="120",
+                    ResourceRecords=[self.get_configuration_address()]))
+
+    def create_cluster_outputs(self):
+        t = self.template
+        t.add_output(Output("ConfigurationAddress",
+                            Value=self.get_configuration_address()))
+        t.add_output(Output("ClusterPort",
+                            Value=GetAtt(CACHE_CLUSTER,
+                                         "ConfigurationEndpoint.Port")))
+        t.add_output(Output("ClusterId", Value=Ref(CACHE_CLUSTER)))
+        if self.should_create_internal_cname():
+            t.add_output(
+                Output(
+                    "ConfigurationCname",
+                    Value=Ref(DNS_RECORD)))
+
+    def create_template(self):
+        self.create_parameter_group()
+        self.create_subnet_group()
+        self.create_security_group()
+        self.create_cache_cluster()
+        self.create_dns_records()
+        self.create_cluster_outputs()
@@ -14,7 +14,11 @@ Example::
         InternalHostName: es
 
 """
+import logging
+import math
+
 import awacs.es
+import awacs.logs
 from awacs.aws import (
     Allow,
     Condition,
@@ -27,18 +31,416 @@ from awacs.aws import (
 )
 from stacker.blueprints.base import Blueprint
 from troposphere import (
+    ec2,
     elasticsearch,
     iam,
+    logs,
     route53,
+    AWSObject,
+    AWSProperty,
     GetAtt,
     Join,
     Output,
     Ref,
+    Sub,
+)
+from troposphere.cloudformation import CustomResource
+from troposphere.validators import boolean, positive_integer
+
+from .cloudwatch_logs import (
+    LOG_RETENTION_STRINGS,
+    validate_cloudwatch_log_retention,
 )
+from .util import check_properties
+
+logger = logging.getLogger(__name__)
 
 ES_DOMAIN = "ESDomain"
 DNS_RECORD = "ESDomainDNSRecord"
 POLICY_NAME = "ESDomainAccessPolicy"
+LOG_RESOURCE_POLICY = "ESDomainLogResourcePolicy"
+LOG_GROUP = "%sLogGroup"
+AUTO_TUNE = "ESDomainAutoTune"
+SECURITY_GROUP = "ESDomainSecurityGroup"
+HTTPS_PORT = 443
+
+NOVALUE = Ref("AWS::NoValue")
+
+LOG_TYPES = [
+    "SEARCH_SLOW_LOGS",
+    "INDEX_SLOW_LOGS",
+    "ES_APPLICATION_LOGS",
+    "AUDIT_LOGS",
+]
+LOG_GROUP_PREFIX = "/aws/aes/domains/${AWS::StackName}/"
+
+AUTO_TUNE_STATES = ["ENABLED", "DISABLED"]
+AUTO_TUNE_PROPERTIES = ["DesiredState", "RollbackOnDisable",
+                        "MaintenanceSchedules"]
+MAINTENANCE_SCHEDULE_PROPERTIES = ["StartAt", "DurationHours",
+                                   "CronExpressionForRecurrence"]
+
+TOPOLOGY_PROPERTIES = [
+    "InstanceType",
+    "InstanceCount",
+    "AvailabilityZones",
+    "DedicatedMasterCount",
+    "DedicatedMasterType",
+    "WarmCount",
+    "WarmType",
+    "ColdStorage",
+    "DataVolumeGiB",
+    "ShardCount",
+    "Replicas",
+    "MaxVolumeSizeGiB",
+]
+VALID_AVAILABILITY_ZONE_COUNTS = [1, 2, 3]
+# An odd number of masters is required to avoid split brain, and more than
+# 5 doesn't help.
+VALID_DEDICATED_MASTER_COUNTS = [0, 3, 5]
+MIN_WARM_COUNT = 2
+# Source data * (1 + replicas) * 1.45 covers indexing overhead, OS reserved
+# space & service overhead.
+# reference:
+#   https://docs.aws.amazon.com/opensearch-service/latest/developerguide/sizing-domains.html  # noqa
+STORAGE_OVERHEAD = 1.45
+DEFAULT_MAX_VOLUME_SIZE = 1024
+MAX_SHARD_SIZE = 50
+VOLUME_TYPES = ["standard", "gp2", "gp3", "io1"]
+# gp3 volumes get a 3000 IOPS & 125 MiB/s baseline. Both are scaled with
+# the volume size like gp2 (3 IOPS & 0.25 MiB/s per GiB), so larger volumes
+# don't lose performance when moving to gp3.
+GP3_BASELINE_IOPS = 3000
+GP3_IOPS_PER_GIB = 3
+GP3_MAX_IOPS = 16000
+GP3_BASELINE_THROUGHPUT = 125
+GP3_THROUGHPUT_PER_GIB = 0.25
+GP3_MAX_THROUGHPUT = 1000
+# The minimum Elasticsearch versions that support topology features. All
+# OpenSearch versions support them.
+ULTRAWARM_MIN_VERSION = (6, 8)
+COLD_STORAGE_MIN_VERSION = (7, 9)
+GP3_MIN_VERSION = (7, 10)
+
+
+def _round_up(value, multiple):
+    return int(math.ceil(float(value) / multiple) * multiple)
+
+
+def supports_version(elasticsearch_version, minimum):
+    """Checks if an ElasticsearchVersion is at least a minimum version.
+
+    Args:
+        elasticsearch_version (str): ie: 7.10 or OpenSearch_1.3
+        minimum (tuple): The minimum Elasticsearch version, ie: (7, 9)
+
+    Returns:
+        bool: True if the version is OpenSearch, or at least the minimum.
+    """
+    if elasticsearch_version.startswith("OpenSearch_"):
+        return True
+    try:
+        version = tuple(
+            int(part) for part in elasticsearch_version.split(".")[:2])
+    except ValueError:
+        return False
+    return version >= minimum
+
+
+def validate_volume_type(volume_type):
+    if volume_type not in VOLUME_TYPES:
+        raise ValueError("Elasticsearch Domain VolumeType must be one of: %s" %
+                         ", ".join(VOLUME_TYPES))
+    return volume_type
+
+
+class EBSOptions(elasticsearch.EBSOptions):
+    props = dict(
+        elasticsearch.EBSOptions.props,
+        Throughput=(positive_integer, False),
+        VolumeType=(validate_volume_type, False),
+    )
+
+
+class ColdStorageOptions(AWSProperty):
+    props = {
+        'Enabled': (boolean, True),
+    }
+
+
+class ElasticsearchClusterConfig(elasticsearch.ElasticsearchClusterConfig):
+    props = dict(
+        elasticsearch.ElasticsearchClusterConfig.props,
+        ColdStorageOptions=(ColdStorageOptions, False),
+    )
+
+
+class ElasticsearchDomain(elasticsearch.Domain):
+    props = dict(
+        elasticsearch.Domain.props,
+        EBSOptions=(EBSOptions, False),
+        ElasticsearchClusterConfig=(ElasticsearchClusterConfig, False),
+    )
+
+
+def validate_log_publishing(value):
+    for log_type in value:
+        if log_type not in LOG_TYPES:
+            raise ValueError(
+                "%s is not a valid log type. Must be one of: %s" % (
+                    log_type, ", ".join(LOG_TYPES))
+            )
+    return value
+
+
+def validate_auto_tune(value):
+    if not value:
+        return value
+
+    check_properties(value, AUTO_TUNE_PROPERTIES, "Elasticsearch AutoTune")
+    if value.get("DesiredState", "ENABLED") not in AUTO_TUNE_STATES:
+        raise ValueError(
+            "AutoTune DesiredState must be one of: %s" % (
+                ", ".join(AUTO_TUNE_STATES))
+        )
+
+    for schedule in value.get("MaintenanceSchedules", []):
+        check_properties(schedule, MAINTENANCE_SCHEDULE_PROPERTIES,
+                         "Elasticsearch AutoTune MaintenanceSchedule")
+        if "CronExpressionForRecurrence" not in schedule:
+            raise ValueError("AutoTune MaintenanceSchedules must specify a "
+                             "CronExpressionForRecurrence.")
+        if not (1 <= schedule.get("DurationHours", 0) <= 24):
+            raise ValueError("AutoTune MaintenanceSchedules DurationHours "
+                             "must be between 1 and 24.")
+    return value
+
+
+def log_group_title(log_type):
+    """ie: SEARCH_SLOW_LOGS -> SearchSlowLogsLogGroup"""
+    return LOG_GROUP % "".join(
+        word.capitalize() for word in log_type.split("_"))
+
+
+def es_log_resource_policy():
+    """Allows the ES service to write to the domain's log groups."""
+    log_groups_arn = (
+        "arn:aws:logs:${AWS::Region}:${AWS::AccountId}:log-group:" +
+        LOG_GROUP_PREFIX + "*"
+    )
+    return Policy(
+        Version="2012-10-17",
+        Statement=[
+            Statement(
+                Effect=Allow,
+                Principal=Principal("Service", ["es.amazonaws.com"]),
+                Action=[
+                    awacs.logs.CreateLogStream,
+                    awacs.logs.PutLogEvents,
+                ],
+                Resource=[log_groups_arn],
+            )
+        ]
+    )
+
+
+class LogResourcePolicy(AWSObject):
+    resource_type = "AWS::Logs::ResourcePolicy"
+
+    props = {
+        'PolicyDocument': (basestring, True),
+        'PolicyName': (basestring, True),
+    }
+
+
+class AutoTune(CustomResource):
+    """Auto-Tune options for an Elasticsearch domain.
+
+    AWS::Elasticsearch::Domain has no Auto-Tune support, so this is backed
+    by a Lambda custom resource which calls the ES UpdateElasticsearchDomain
+    API with the given AutoTuneOptions.
+    """
+    resource_type = "Custom::ESAutoTune"
+
+
+def validate_topology(topology):
+    if not topology:
+        return topology
+
+    check_properties(topology, TOPOLOGY_PROPERTIES, "Elasticsearch Topology")
+
+    if "InstanceType" not in topology:
+        raise ValueError("Topology must specify an InstanceType.")
+
+    az_count = topology.get("AvailabilityZones", 1)
+    if az_count not in VALID_AVAILABILITY_ZONE_COUNTS:
+        raise ValueError(
+            "AvailabilityZones must be one of: %s" % (
+                ", ".join(str(c) for c in VALID_AVAILABILITY_ZONE_COUNTS))
+        )
+
+    instance_count = topology.get("InstanceCount")
+    if instance_count is not None and instance_count % az_count:
+        raise ValueError(
+            "InstanceCount (%d) must be a multiple of AvailabilityZones "
+            "(%d) so data nodes are spread evenly." % (instance_count,
+                                                       az_count)
+        )
+
+    master_count = topology.get("DedicatedMasterCount", 0)
+    if master_count not in VALID_DEDICATED_MASTER_COUNTS:
+        raise ValueError(
+            "DedicatedMasterCount must be one of: %s" % (
+                ", ".join(str(c) for c in VALID_DEDICATED_MASTER_COUNTS))
+        )
+    if master_count and "DedicatedMasterType" not in topology:
+        raise ValueError("DedicatedMasterCount requires DedicatedMasterType.")
+
+    warm_count = topology.get("WarmCount", 0)
+    if warm_count:
+        if warm_count < MIN_WARM_COUNT:
+            raise ValueError(
+                "WarmCount must be at least %d." % MIN_WARM_COUNT
+            )
+        if "WarmType" not in topology:
+            raise ValueError("WarmCount requires WarmType.")
+        if not master_count:
+            raise ValueError("UltraWarm nodes require dedicated masters.")
+
+    if topology.get("ColdStorage") and not warm_count:
+        raise ValueError("ColdStorage requires UltraWarm nodes (WarmCount).")
+
+    if topology.get("ShardCount") and not topology.get("DataVolumeGiB"):
+        raise ValueError("ShardCount requires DataVolumeGiB.")
+
+    return topology
+
+
+def validate_topology_version(topology, elasticsearch_version):
+    """Checks that the ElasticsearchVersion supports a topology."""
+    if topology.get("WarmCount") and \
+            not supports_version(elasticsearch_version, ULTRAWARM_MIN_VERSION):
+        raise ValueError(
+            "UltraWarm nodes require Elasticsearch %d.%d or later, got %s." %
+            (ULTRAWARM_MIN_VERSION + (elasticsearch_version,))
+        )
+    if topology.get("ColdStorage") and \
+            not supports_version(elasticsearch_version,
+                                 COLD_STORAGE_MIN_VERSION):
+        raise ValueError(
+            "ColdStorage requires Elasticsearch %d.%d or later, got %s." %
+            (COLD_STORAGE_MIN_VERSION + (elasticsearch_version,))
+        )
+
+
+def ebs_volume_options(volume_size, elasticsearch_version):
+    """Returns the EBS options for a data node volume.
+
+    gp3 volumes are used when the ElasticsearchVersion supports them, with
+    their IOPS & throughput scaled with the volume size. Older versions get
+    gp2 volumes, whose performance scales with size on its own.
+    """
+    if not supports_version(elasticsearch_version, GP3_MIN_VERSION):
+        return {
+            "EBSEnabled": True,
+            "VolumeType": "gp2",
+            "VolumeSize": volume_size,
+        }
+
+    return {
+        "EBSEnabled": True,
+        "VolumeType": "gp3",
+        "VolumeSize": volume_size,
+        "Iops": min(GP3_MAX_IOPS,
+                    max(GP3_BASELINE_IOPS,
+                        volume_size * GP3_IOPS_PER_GIB)),
+        "Throughput": min(GP3_MAX_THROUGHPUT,
+                          max(GP3_BASELINE_THROUGHPUT,
+                              int(volume_size * GP3_THROUGHPUT_PER_GIB))),
+    }
+
+
+def build_cluster_topology(topology, elasticsearch_version):
+    """Builds the cluster config & EBS options from a topology.
+
+    Args:
+        topology (dict): A topology, as validated by
+            :func:`validate_topology`.
+        elasticsearch_version (str): The ElasticsearchVersion of the domain,
+            which decides the volume type.
+
+    Returns:
+        tuple: The ElasticsearchClusterConfig dict, and the EBSOptions dict
+            (empty if the topology has no DataVolumeGiB).
+    """
+    az_count = topology.get("AvailabilityZones", 1)
+    replicas = topology.get("Replicas", 1)
+    instance_count = topology.get("InstanceCount")
+    data_volume = topology.get("DataVolumeGiB", 0)
+    max_volume_size = topology.get("MaxVolumeSizeGiB",
+                                   DEFAULT_MAX_VOLUME_SIZE)
+
+    ebs_options = {}
+    node_count = instance_count or az_count
+    if data_volume:
+        required = data_volume * (1 + replicas) * STORAGE_OVERHEAD
+        needed_nodes = _round_up(required / max_volume_size, az_count)
+        if instance_count and instance_count < needed_nodes:
+            raise ValueError(
+                "InstanceCount (%d) is too small to hold %sGiB of data with "
+                "%d replicas - at least %d nodes are needed with "
+                "MaxVolumeSizeGiB %d." % (instance_count, data_volume,
+                                          replicas, needed_nodes,
+                                          max_volume_size)
+            )
+        node_count = max(node_count, needed_nodes)
+        volume_size = int(math.ceil(required / node_count))
+        ebs_options = ebs_volume_options(volume_size, elasticsearch_version)
+
+        shard_count = topology.get("ShardCount")
+        if shard_count:
+            shard_size = float(data_volume) / shard_count
+            if shard_size > MAX_SHARD_SIZE:
+                logger.warning("Primary shards will be %.1fGiB, which is "
+                               "over the recommended %dGiB. Consider "
+                               "raising ShardCount.", shard_size,
+                               MAX_SHARD_SIZE)
+            if shard_count * (1 + replicas) < node_count:
+                logger.warning("%d shards (including replicas) across %d "
+                               "data nodes will leave some nodes without "
+                               "shards while others run hot.",
+                               shard_count * (1 + replicas), node_count)
+
+    cluster_config = {
+        "InstanceType": topology["InstanceType"],
+        "InstanceCount": node_count,
+    }
+
+    if az_count > 1:
+        if not replicas:
+            logger.warning("Zone awareness is enabled without replicas, "
+                           "an AZ outage will make data unavailable.")
+        cluster_config["ZoneAwarenessEnabled"] = True
+        cluster_config["ZoneAwarenessConfig"] = {
+            "AvailabilityZoneCount": az_count,
+        }
+
+    master_count = topology.get("DedicatedMasterCount", 0)
+    if master_count:
+        cluster_config["DedicatedMasterEnabled"] = True
+        cluster_config["DedicatedMasterCount"] = master_count
+        cluster_config["DedicatedMasterType"] = topology["DedicatedMasterType"]
+
+    warm_count = topology.get("WarmCount", 0)
+    if warm_count:
+        cluster_config["WarmEnabled"] = True
+        cluster_config["WarmCount"] = warm_count
+        cluster_config["WarmType"] = topology["WarmType"]
+
+    if topology.get("ColdStorage"):
+        cluster_config["ColdStorageOptions"] = {"Enabled": True}
+
+    return cluster_config, ebs_options
 
 
 class Domain(Blueprint):
@@ -84,6 +486,24 @@ class Domain(Blueprint):
             "description": (
                 "The cluster configuration for the Amazon ES domain."
             )},
+        "Topology": {
+            "type": dict,
+            "default": {},
+            "description": (
+                "A production topology to build the "
+                "ElasticsearchClusterConfig & EBSOptions from. Valid keys: "
+                "InstanceType, InstanceCount, AvailabilityZones (1-3, data "
+                "nodes are spread evenly across them), DedicatedMasterCount "
+                "(0, 3 or 5), DedicatedMasterType, WarmCount & WarmType "
+                "(UltraWarm), ColdStorage, DataVolumeGiB, ShardCount, "
+                "Replicas (default: 1) and MaxVolumeSizeGiB (default: "
+                "1024). When DataVolumeGiB is given the data node count "
+                "and volumes are sized from it, using gp3 volumes on "
+                "Elasticsearch 7.10+ and OpenSearch. Any keys given in "
+                "ElasticsearchClusterConfig or EBSOptions override the "
+                "generated values."
+            ),
+            "validator": validate_topology},
         "ElasticsearchVersion": {
             "type": str,
             "default": "2.3",
@@ -102,14 +522,154 @@ class Domain(Blueprint):
                 "An arbitrary set of tags (key-value pairs) to associate with "
                 "the Amazon ES domain."
             )},
+        "LogPublishing": {
+            "type": list,
+            "default": [],
+            "description": (
+                "List of log types to publish to CloudWatch Logs. A log "
+                "group is created for each, along with a CloudWatch Logs "
+                "resource policy allowing the ES service to write to them "
+                "(note: there is a limit of 10 resource policies per "
+                "region). Valid types: %s. Slow log thresholds still have "
+                "to be set in each index's settings." % ", ".join(LOG_TYPES)
+            ),
+            "validator": validate_log_publishing},
+        "AdvancedSecurityOptions": {
+            "type": dict,
+            "default": {},
+            "description": (
+                "The fine-grained access control configuration for the "
+                "Amazon ES domain. Required to publish AUDIT_LOGS."
+            )},
+        "LogRetentionDays": {
+            "type": int,
+            "default": 0,
+            "description": (
+                "Time in days to retain the published logs. Accepted "
+                "values: %s. Default 0 - retain forever." % (
+                    ", ".join(LOG_RETENTION_STRINGS))
+            ),
+            "validator": validate_cloudwatch_log_retention},
+        "AutoTune": {
+            "type": dict,
+            "default": {},
+            "description": (
+                "Optional Auto-Tune options. Valid keys: DesiredState "
+                "(ENABLED or DISABLED, default: ENABLED), "
+                "RollbackOnDisable and MaintenanceSchedules, a list of "
+                "dictionaries with StartAt, DurationHours (1-24) & "
+                "CronExpressionForRecurrence, ie: "
+                "cron(0 3 ? * SUN *). Requires AutoTuneServiceToken."
+            ),
+            "validator": validate_auto_tune},
+        "AutoTuneServiceToken": {
+            "type": str,
+            "default": "",
+            "description": (
+                "The ARN of the Lambda function that backs the "
+                "Custom::ESAutoTune resource."
+            )},
         "TrustedNetworks": {
             "type": list,
             "description": (
-                "List of CIDR blocks allowed to connect to the ES cluster"
+                "List of CIDR blocks allowed to connect to the ES cluster. "
+                "In VPC mode these are allowed in the security group rather "
+                "than in the access policy."
             ),
             "default": []},
+        "VpcId": {
+            "type": str,
+            "default": "",
+            "description": (
+                "The VPC to place the domain in. If given along with "
+                "Subnets, the domain is only reachable from inside the VPC."
+            )},
+        "Subnets": {
+            "type": str,
+            "default": "",
+            "description": (
+                "A comma separated list of subnet ids to place the domain "
+                "in, one per availability zone used by the domain (ie: a "
+                "single subnet without zone awareness). Requires VpcId."
+            )},
+        "ExistingSecurityGroup": {
+            "type": str,
+            "default": "",
+            "description": (
+                "The ID of an existing security group to put the domain in "
+                "when in VPC mode. If not specified, one will be created "
+                "for you."
+            )},
     }
 
+    def is_vpc_domain(self):
+        variables = self.get_variables()
+        return bool(variables["VpcId"] and variables["Subnets"])
+
+    def get_subnets(self):
+        return self.get_variables()["Subnets"].split(",")
+
+    def create_security_group(self):
+        t = self.template
+        variables = self.get_variables()
+        self.security_group = variables["ExistingSecurityGroup"]
+        if not variables["ExistingSecurityGroup"]:
+            sg = t.add_resource(
+                ec2.SecurityGroup(
+                    SECURITY_GROUP,
+                    GroupDescription="%s ES domain security group" % (
+                        self.name),
+                    VpcId=variables["VpcId"],
+                    SecurityGroupIngress=[
+                        ec2.SecurityGroupRule(
+                            IpProtocol="tcp",
+                            FromPort=HTTPS_PORT,
+                            ToPort=HTTPS_PORT,
+                            CidrIp=trusted_network,
+                        )
+                        for trusted_network in variables["TrustedNetworks"]
+                    ],
+                )
+            )
+            self.security_group = Ref(sg)
+        t.add_output(Output("SecurityGroup", Value=self.security_group))
+
+    def get_availability_zone_count(self):
+        """Returns the number of AZs the domain's data nodes are spread
+        across, from the Topology or ElasticsearchClusterConfig."""
+        variables = self.get_variables()
+        az_count = variables["Topology"].get("AvailabilityZones", 1)
+
+        cluster_config = variables["ElasticsearchClusterConfig"]
+        if "ZoneAwarenessEnabled" not in cluster_config:
+            return az_count
+        if str(cluster_config["ZoneAwarenessEnabled"]).lower() != "true":
+            return 1
+        # Zone awareness defaults to 2 AZs when no count is given.
+        zone_awareness_config = cluster_config.get("ZoneAwarenessConfig", {})
+        return int(zone_awareness_config.get("AvailabilityZoneCount",
+                                             max(az_count, 2)))
+
+    def validate_vpc_options(self):
+        variables = self.get_variables()
+        if bool(variables["VpcId"]) != bool(variables["Subnets"]):
+            raise ValueError("VpcId and Subnets must be given together to "
+                             "place the domain in a VPC.")
+
+    def get_vpc_options(self):
+        subnets = self.get_subnets()
+        az_count = self.get_availability_zone_count()
+        if len(subnets) != az_count:
+            raise ValueError(
+                "The number of Subnets (%d) must match the number of "
+                "availability zones used by the domain (%d)." % (
+                    len(subnets), az_count)
+            )
+        return {
+            "SubnetIds": subnets,
+            "SecurityGroupIds": [self.security_group],
+        }
+
     def get_allowed_actions(self):
         return [
             awacs.es.Action("ESHttpGet"),
@@ -139,6 +699,88 @@ class Domain(Blueprint):
                 ))
             t.add_output(Output("CNAME", Value=Ref(DNS_RECORD)))
 
+    def create_log_groups(self):
+        t = self.template
+        variables = self.get_variables()
+        log_retention = variables["LogRetentionDays"] or NOVALUE
+
+        if "AUDIT_LOGS" in variables["LogPublishing"] and \
+                not variables["AdvancedSecurityOptions"].get("Enabled"):
+            raise ValueError("Publishing AUDIT_LOGS requires "
+                             "AdvancedSecurityOptions to be enabled.")
+
+        self.log_groups = {}
+        for log_type in variables["LogPublishing"]:
+            log_group = t.add_resource(
+                logs.LogGroup(
+                    log_group_title(log_type),
+                    LogGroupName=Sub(LOG_GROUP_PREFIX +
+                                     log_type.lower().replace("_", "-")),
+                    RetentionInDays=log_retention,
+                )
+            )
+            t.add_output(
+                Output("%sName" % log_group.title, Value=Ref(log_group))
+            )
+            self.log_groups[log_type] = log_group
+
+        if self.log_groups:
+            t.add_resource(
+                LogResourcePolicy(
+                    LOG_RESOURCE_POLICY,
+                    PolicyName=Sub("${AWS::StackName}-es-logs"),
+                    PolicyDocument=Sub(
+                        es_log_resource_policy().to_json(indent=None)),
+                )
+            )
+
+    def get_log_publishing_options(self):
+        options = {}
+        for log_type, log_group in self.log_groups.items():
+            options[log_type] = {
+                "CloudWatchLogsLogGroupArn": GetAtt(log_group, "Arn"),
+                "Enabled": True,
+            }
+        return options
+
+    def create_auto_tune(self):
+        t = self.template
+        variables = self.get_variables()
+        auto_tune = variables["AutoTune"]
+        if not auto_tune:
+            return
+
+        service_token = variables["AutoTuneServiceToken"]
+        if not service_token:
+            raise ValueError("AutoTune requires AutoTuneServiceToken to be "
+                             "set.")
+
+        schedules = []
+        for schedule in auto_tune.get("MaintenanceSchedules", []):
+            maintenance = {
+                "Duration": {
+                    "Value": schedule["DurationHours"],
+                    "Unit": "HOURS",
+                },
+                "CronExpressionForRecurrence": (
+                    schedule["CronExpressionForRecurrence"]),
+            }
+            if "StartAt" in schedule:
+                maintenance["StartAt"] = schedule["StartAt"]
+            schedules.append(maintenance)
+
+        t.add_resource(
+            AutoTune(
+                AUTO_TUNE,
+                ServiceToken=service_token,
+                DomainName=Ref(ES_DOMAIN),
+                DesiredState=auto_tune.get("DesiredState", "ENABLED"),
+                RollbackOnDisable=auto_tune.get("RollbackOnDisable",
+                                                "NO_ROLLBACK"),
+                MaintenanceSchedules=schedules,
+            )
+        )
+
     def create_domain(self):
         t = self.template
         variables = self.get_variables()
@@ -153,15 +795,38 @@ class Domain(Blueprint):
         # Add any optional keys to the params dict. ES didn't have great
         # support for passing empty values for these keys when this was
         # created.
-        optional_keys = ["AdvancedOptions", "DomainName", "EBSOptions",
-                         "SnapshotOptions", "Tags"]
+        optional_keys = ["AdvancedOptions", "AdvancedSecurityOptions",
+                         "DomainName", "EBSOptions",
+                         "ElasticsearchClusterConfig", "SnapshotOptions",
+                         "Tags"]
 
         for key in optional_keys:
             optional = variables[key]
             if optional:
                 params[key] = optional
 
-        domain = elasticsearch.Domain.from_dict(ES_DOMAIN, params)
+        if variables["Topology"]:
+            validate_topology_version(variables["Topology"],
+                                      variables["ElasticsearchVersion"])
+            cluster_config, ebs_options = build_cluster_topology(
+                variables["Topology"], variables["ElasticsearchVersion"])
+            cluster_config.update(variables["ElasticsearchClusterConfig"])
+            params["ElasticsearchClusterConfig"] = cluster_config
+            if ebs_options:
+                ebs_options.update(variables["EBSOptions"])
+                params["EBSOptions"] = ebs_options
+
+        if self.is_vpc_domain():
+            params["VPCOptions"] = self.get_vpc_options()
+
+        log_publishing_options = self.get_log_publishing_options()
+        if log_publishing_options:
+            params["LogPublishingOptions"] = log_publishing_options
+
+        domain = ElasticsearchDomain.from_dict(ES_DOMAIN, params)
+        if log_publishing_options:
+            # The service can't publish logs until the policy exists
+            domain.DependsOn = [LOG_RESOURCE_POLICY]
         t.add_resource(domain)
         t.add_output(Output("DomainArn", Value=GetAtt(ES_DOMAIN, "DomainArn")))
         t.add_output(Output("DomainEndpoint", Value=GetAtt(ES_DOMAIN,
@@ -187,20 +852,35 @@ class Domain(Blueprint):
         variables = self.get_variables()
 
         statements = []
-        for trusted_network in variables["TrustedNetworks"]:
-            condition = Condition(IpAddress({SourceIp: trusted_network}))
-            statements.append(
-                Statement(
-                    Effect=Allow,
-                    Action=self.get_allowed_actions(),
-                    Condition=condition,
-                    Principal=Principal(Everybody)))
+        if self.is_vpc_domain():
+            # Network access is controlled by the security group, and IP
+            # based conditions don't apply to VPC domains.
+            if variables["TrustedNetworks"]:
+                statements.append(
+                    Statement(
+                        Effect=Allow,
+                        Action=self.get_allowed_actions(),
+                        Principal=Principal(Everybody)))
+        else:
+            for trusted_network in variables["TrustedNetworks"]:
+                condition = Condition(IpAddress({SourceIp: trusted_network}))
+                statements.append(
+                    Statement(
+                        Effect=Allow,
+                        Action=self.get_allowed_actions(),
+                        Condition=condition,
+                        Principal=Principal(Everybody)))
 
         if statements:
             policy = Policy(Statement=statements)
         return policy
 
     def create_template(self):
+        self.validate_vpc_options()
+        if self.is_vpc_domain():
+            self.create_security_group()
+        self.create_log_groups()
         self.create_domain()
+        self.create_auto_tune()
         self.create_dns_record()
         self.create_roles_policy()
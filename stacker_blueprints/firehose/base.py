@@ -72,13 +72,35 @@ def s3_write_statements(bucket_name):
     ]
 
 
-def kms_key_statements(key_arn, bucket_arn, bucket_prefix):
+def kms_key_statements(key_arn, bucket_arn, bucket_prefix,
+                       bucket_key_enabled=False):
+    """Allows use of the KMS key to encrypt objects in the s3 bucket.
+
+    When the bucket uses S3 Bucket Keys the encryption context is the ARN of
+    the bucket, rather than the ARN of each object.
+    """
     s3_endpoint = Join(
         '',
         [
-            "s3.", REGION, "amazonaws.com"
+            "s3.", REGION, ".amazonaws.com"
         ]
     )
+    if bucket_key_enabled:
+        conditions = [
+            StringEquals({
+                "kms:ViaService": s3_endpoint,
+                "kms:EncryptionContext:aws:s3:arn": bucket_arn,
+            })
+        ]
+    else:
+        conditions = [
+            StringEquals("kms:ViaService", s3_endpoint),
+            StringLike(
+                "kms:EncryptionContext:aws:s3:arn",
+                Join('', [bucket_arn, bucket_prefix, "*"])
+            )
+        ]
+
     return [
         Statement(
             Effect=Allow,
@@ -87,18 +109,7 @@ def kms_key_statements(key_arn, bucket_arn, bucket_prefix):
                 awacs.kms.GenerateDataKey,
             ],
             Resource=[key_arn],
-            Condition=Condition(
-                [
-                    StringEquals(
-                        "kms:ViaService", s3_endpoint
-                    ),
-                    StringLike(
-                        "kms:EncryptionContext:aws:s3:arn",
-                        Join('', [bucket_arn, bucket_prefix, "*"])
-                    )
-                ]
-            )
-
+            Condition=Condition(conditions)
         )
     ]
 
@@ -122,6 +133,15 @@ class BaseDeliveryStream(Blueprint):
                            "the s3 bucket.",
             "default": "",
         },
+        "BucketKeyEnabled": {
+            "type": bool,
+            "description": "Set to 'true' if the s3 bucket has S3 Bucket "
+                           "Keys enabled for EncryptionKeyArn, ie: using the "
+                           "EncryptionKeyArn option of s3.Buckets. This "
+                           "greatly reduces the number of KMS requests made "
+                           "when writing objects.",
+            "default": False,
+        },
         "BufferingHints": {
             "type": dict,
             "description": "A dictionary with buffering hints for writing "
@@ -196,6 +216,7 @@ class BaseDeliveryStream(Blueprint):
         bucket_arn = self.s3_bucket_arn()
         s3_prefix = variables["S3Prefix"]
         key_arn = variables["EncryptionKeyArn"]
+        bucket_key_enabled = variables["BucketKeyEnabled"]
 
         statements = []
         statements.extend(s3_write_statements(bucket_name))
@@ -208,7 +229,7 @@ class BaseDeliveryStream(Blueprint):
         if key_arn:
             statements.extend(
                 kms_key_statements(
-                    key_arn, bucket_arn, s3_prefix
+                    key_arn, bucket_arn, s3_prefix, bucket_key_enabled
                 )
             )
 
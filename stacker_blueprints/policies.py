@@ -123,6 +123,46 @@ def read_write_s3_bucket_policy(buckets):
     return Policy(Statement=read_write_s3_bucket_policy_statements(buckets))
 
 
+def s3_replication_policy_statements(source_bucket, destination_bucket):
+    """ Allows S3 to replicate objects between two buckets. """
+    return [
+        Statement(
+            Effect=Allow,
+            Action=[
+                s3.GetReplicationConfiguration,
+                s3.ListBucket,
+            ],
+            Resource=[s3_arn(source_bucket)],
+        ),
+        Statement(
+            Effect=Allow,
+            Action=[
+                s3.Action("GetObjectVersionForReplication"),
+                s3.GetObjectVersionAcl,
+                s3.GetObjectVersionTagging,
+            ],
+            Resource=[s3_objects_arn(source_bucket)],
+        ),
+        Statement(
+            Effect=Allow,
+            Action=[
+                s3.ReplicateObject,
+                s3.ReplicateDelete,
+                s3.Action("ReplicateTags"),
+            ],
+            Resource=[s3_objects_arn(destination_bucket)],
+        ),
+    ]
+
+
+def s3_replication_policy(source_bucket, destination_bucket):
+    return Policy(
+        Statement=s3_replication_policy_statements(
+            source_bucket, destination_bucket
+        )
+    )
+
+
 def static_website_bucket_policy(bucket):
     """
     Attach this policy directly to an S3 bucket to make it a static website.
@@ -140,6 +180,23 @@ def static_website_bucket_policy(bucket):
     )
 
 
+def cloudfront_origin_access_bucket_policy(bucket, canonical_user_id):
+    """
+    Attach this policy directly to an S3 bucket to allow a CloudFront origin
+    access identity to read its objects, without making the bucket public.
+    """
+    return Policy(
+        Statement=[
+            Statement(
+                Effect=Allow,
+                Principal=Principal("CanonicalUser", canonical_user_id),
+                Action=[s3.GetObject],
+                Resource=[s3_objects_arn(bucket)],
+            )
+        ]
+    )
+
+
 def log_stream_arn(log_group_name, log_stream_name):
     return Join(
         '',
@@ -1,17 +1,24 @@
 from troposphere import (
-    GetAtt, Ref, ec2, Output, Tags
+    AWSProperty, GetAtt, Ref, ec2, rds, Output, Tags
 )
+from troposphere.cloudformation import CustomResource
 from troposphere.rds import (
     DBSubnetGroup,
     DBClusterParameterGroup,
-    DBCluster,
+    DBInstance,
 )
+from troposphere.validators import double
 from troposphere.route53 import RecordSetType
 
 from stacker.blueprints.base import Blueprint
 from stacker.blueprints.variables.types import CFNString
+from stacker.util import cf_safe_name
 
-from stacker_blueprints.rds.base import validate_backup_retention_period
+from stacker_blueprints.rds.base import (
+    validate_backup_retention_period,
+    validate_db_instance_identifier,
+)
+from stacker_blueprints.util import check_properties
 
 # Resource name constants
 SUBNET_GROUP = "SubnetGroup"
@@ -19,6 +26,150 @@ PARAMETER_GROUP = "ClusterParameterGroup"
 SECURITY_GROUP = "SecurityGroup"
 DBCLUSTER = "DBCluster"
 DNS_RECORD = "DBClusterMasterDnsRecord"
+SERVERLESS_INSTANCE = "ServerlessInstance%d"
+CUSTOM_ENDPOINT = "%sClusterEndpoint"
+CUSTOM_ENDPOINT_DNS_RECORD = "%sClusterEndpointDnsRecord"
+
+CUSTOM_ENDPOINT_TYPES = ["READER", "ANY"]
+CUSTOM_ENDPOINT_PROPERTIES = [
+    "EndpointType",
+    "StaticMembers",
+    "ExcludedMembers",
+    "InternalHostname",
+]
+
+SERVERLESS_INSTANCE_CLASS = "db.serverless"
+SERVERLESS_V2_MIN_CAPACITY = 0.5
+SERVERLESS_V2_MAX_CAPACITY = 128
+
+# Minimum engine versions that support Aurora Serverless v2, keyed by engine
+# and then by major version. Major versions newer than any listed here are
+# assumed to support it.
+# reference:
+#   https://docs.aws.amazon.com/AmazonRDS/latest/AuroraUserGuide/aurora-serverless-v2.requirements.html  # noqa
+SERVERLESS_V2_ENGINE_VERSIONS = {
+    "aurora-mysql": {3: (3, 2, 0)},
+    "aurora-postgresql": {13: (13, 6), 14: (14, 3)},
+}
+
+
+def _version_tuple(version):
+    return tuple(int(part) for part in version.split("."))
+
+
+def validate_serverless_v2_scaling(value):
+    if not value:
+        return value
+
+    for key in value:
+        if key not in ["MinCapacity", "MaxCapacity"]:
+            raise ValueError(
+                "%s is not a valid ServerlessV2Scaling key. Must be one "
+                "of: MinCapacity, MaxCapacity" % key
+            )
+
+    min_capacity = value.get("MinCapacity", SERVERLESS_V2_MIN_CAPACITY)
+    max_capacity = value.get("MaxCapacity", min_capacity)
+    for capacity in [min_capacity, max_capacity]:
+        if not (SERVERLESS_V2_MIN_CAPACITY <= capacity <=
+                SERVERLESS_V2_MAX_CAPACITY):
+            raise ValueError(
+                "Serverless v2 capacity must be between %s and %s ACUs." % (
+                    SERVERLESS_V2_MIN_CAPACITY, SERVERLESS_V2_MAX_CAPACITY)
+            )
+        if (capacity * 2) % 1:
+            raise ValueError(
+                "Serverless v2 capacity must be specified in 0.5 ACU "
+                "increments."
+            )
+    if min_capacity > max_capacity:
+        raise ValueError(
+            "Serverless v2 MinCapacity cannot be larger than MaxCapacity."
+        )
+    return value
+
+
+def validate_custom_endpoint(name, config):
+    check_properties(config, CUSTOM_ENDPOINT_PROPERTIES,
+                     "Aurora custom endpoint")
+    validate_db_instance_identifier(name, allow_empty=False)
+
+    endpoint_type = config.get("EndpointType", "READER")
+    if endpoint_type not in CUSTOM_ENDPOINT_TYPES:
+        raise ValueError(
+            "EndpointType for custom endpoint %s must be one of: %s" % (
+                name, ", ".join(CUSTOM_ENDPOINT_TYPES))
+        )
+
+    if config.get("StaticMembers") and config.get("ExcludedMembers"):
+        raise ValueError(
+            "Custom endpoint %s cannot specify both StaticMembers and "
+            "ExcludedMembers." % name
+        )
+    return config
+
+
+def validate_custom_endpoints(value):
+    for name, config in value.items():
+        validate_custom_endpoint(name, config)
+    return value
+
+
+class ServerlessV2ScalingConfiguration(AWSProperty):
+    props = {
+        'MaxCapacity': (double, True),
+        'MinCapacity': (double, True),
+    }
+
+
+class DBCluster(rds.DBCluster):
+    props = dict(
+        rds.DBCluster.props,
+        ServerlessV2ScalingConfiguration=(ServerlessV2ScalingConfiguration,
+                                          False),
+    )
+
+
+class DBClusterEndpoint(CustomResource):
+    """A custom Aurora cluster endpoint.
+
+    CloudFormation has no native resource for custom cluster endpoints, so
+    this is backed by a Lambda custom resource which calls the RDS
+    CreateDBClusterEndpoint, ModifyDBClusterEndpoint &
+    DeleteDBClusterEndpoint APIs with the given properties. The function
+    must return the endpoint address as the `Endpoint` attribute.
+    """
+    resource_type = "Custom::DBClusterEndpoint"
+
+
+def serverless_v2_supported(engine, engine_version):
+    """Checks if an engine & version combination supports Serverless v2.
+
+    Args:
+        engine (str): The Aurora engine (aurora-mysql or aurora-postgresql).
+        engine_version (str): The full engine version, ie:
+            8.0.mysql_aurora.3.02.0 or 14.3
+
+    Returns:
+        bool: True if the engine version supports Serverless v2.
+    """
+    minimums = SERVERLESS_V2_ENGINE_VERSIONS.get(engine)
+    if not minimums or not engine_version:
+        return False
+
+    if engine == "aurora-mysql":
+        # ie: 8.0.mysql_aurora.3.02.0 - the aurora version is what matters
+        engine_version = engine_version.split("mysql_aurora.")[-1]
+
+    try:
+        version = _version_tuple(engine_version)
+    except ValueError:
+        return False
+
+    major = version[0]
+    if major in minimums:
+        return version >= minimums[major]
+    return major > max(minimums)
 
 
 class Cluster(Blueprint):
@@ -117,6 +268,45 @@ class Cluster(Blueprint):
             "default": "",
             "description": "Internal domain name, if you have one."
         },
+        "ServerlessV2Scaling": {
+            "type": dict,
+            "description": "If set, enables Aurora Serverless v2 on the "
+                           "cluster. Valid keys are MinCapacity and "
+                           "MaxCapacity, in Aurora Capacity Units (ACUs) "
+                           "between 0.5 and 128, in 0.5 increments. "
+                           "Requires an engine version that supports "
+                           "Serverless v2.",
+            "default": {},
+            "validator": validate_serverless_v2_scaling,
+        },
+        "CustomEndpoints": {
+            "type": dict,
+            "description": "A dictionary of custom cluster endpoints to "
+                           "create, used to route different workloads to "
+                           "different instances in the cluster. The key is "
+                           "the endpoint identifier, the value a dictionary "
+                           "with the optional keys EndpointType (READER or "
+                           "ANY, default: READER), StaticMembers or "
+                           "ExcludedMembers (lists of instance identifiers) "
+                           "and InternalHostname (creates a CNAME in the "
+                           "internal zone). Requires "
+                           "CustomEndpointServiceToken.",
+            "default": {},
+            "validator": validate_custom_endpoints,
+        },
+        "CustomEndpointServiceToken": {
+            "type": str,
+            "description": "The ARN of the Lambda function that backs the "
+                           "Custom::DBClusterEndpoint resources.",
+            "default": "",
+        },
+        "ServerlessV2InstanceCount": {
+            "type": int,
+            "description": "The number of db.serverless instances to add to "
+                           "the cluster. Requires ServerlessV2Scaling to "
+                           "be set.",
+            "default": 0,
+        },
     }
 
     def engine(self):
@@ -199,6 +389,29 @@ class Cluster(Blueprint):
                 )
             )
 
+    def get_serverless_v2_scaling_configuration(self):
+        variables = self.get_variables()
+        scaling = variables["ServerlessV2Scaling"]
+        if not scaling:
+            if variables["ServerlessV2InstanceCount"]:
+                raise ValueError("ServerlessV2InstanceCount requires "
+                                 "ServerlessV2Scaling to be set.")
+            return None
+
+        engine = self.engine() or variables["Engine"]
+        engine_version = variables["EngineVersion"]
+        if not serverless_v2_supported(engine, engine_version):
+            raise ValueError(
+                "Engine %s version %s does not support Aurora Serverless "
+                "v2." % (engine, engine_version)
+            )
+
+        min_capacity = scaling.get("MinCapacity", SERVERLESS_V2_MIN_CAPACITY)
+        return ServerlessV2ScalingConfiguration(
+            MinCapacity=min_capacity,
+            MaxCapacity=scaling.get("MaxCapacity", min_capacity),
+        )
+
     def create_cluster(self):
         t = self.template
         variables = self.get_variables()
@@ -206,24 +419,90 @@ class Cluster(Blueprint):
         if variables["ClusterParameters"]:
             parameter_group = Ref(PARAMETER_GROUP)
 
-        t.add_resource(
-            DBCluster(
-                DBCLUSTER,
-                BackupRetentionPeriod=variables["BackupRetentionPeriod"],
-                DBClusterParameterGroupName=parameter_group,
-                DBSubnetGroupName=Ref(SUBNET_GROUP),
-                Engine=self.engine() or variables["Engine"],
-                EngineVersion=variables["EngineVersion"],
-                MasterUsername=variables["MasterUser"],
-                MasterUserPassword=Ref("MasterUserPassword"),
-                PreferredBackupWindow=variables["PreferredBackupWindow"],
-                PreferredMaintenanceWindow=variables[
-                    "PreferredMaintenanceWindow"],
-                Tags=self.get_tags(),
-                VpcSecurityGroupIds=[self.security_group, ]
-            )
+        cluster = DBCluster(
+            DBCLUSTER,
+            BackupRetentionPeriod=variables["BackupRetentionPeriod"],
+            DBClusterParameterGroupName=parameter_group,
+            DBSubnetGroupName=Ref(SUBNET_GROUP),
+            Engine=self.engine() or variables["Engine"],
+            EngineVersion=variables["EngineVersion"],
+            MasterUsername=variables["MasterUser"],
+            MasterUserPassword=Ref("MasterUserPassword"),
+            PreferredBackupWindow=variables["PreferredBackupWindow"],
+            PreferredMaintenanceWindow=variables[
+                "PreferredMaintenanceWindow"],
+            Tags=self.get_tags(),
+            VpcSecurityGroupIds=[self.security_group, ]
         )
 
+        scaling = self.get_serverless_v2_scaling_configuration()
+        if scaling:
+            cluster.ServerlessV2ScalingConfiguration = scaling
+        t.add_resource(cluster)
+
+    def create_serverless_instances(self):
+        t = self.template
+        variables = self.get_variables()
+
+        for i in range(variables["ServerlessV2InstanceCount"]):
+            instance = t.add_resource(
+                DBInstance(
+                    SERVERLESS_INSTANCE % (i + 1),
+                    DBClusterIdentifier=Ref(DBCLUSTER),
+                    DBInstanceClass=SERVERLESS_INSTANCE_CLASS,
+                    DBSubnetGroupName=Ref(SUBNET_GROUP),
+                    Engine=self.engine() or variables["Engine"],
+                    Tags=self.get_tags(),
+                )
+            )
+            t.add_output(Output(instance.title, Value=Ref(instance)))
+
+    def create_custom_endpoints(self):
+        t = self.template
+        variables = self.get_variables()
+        endpoints = variables["CustomEndpoints"]
+        if not endpoints:
+            return
+
+        service_token = variables["CustomEndpointServiceToken"]
+        if not service_token:
+            raise ValueError("CustomEndpoints requires "
+                             "CustomEndpointServiceToken to be set.")
+
+        for name, config in sorted(endpoints.items()):
+            title = cf_safe_name(name)
+            endpoint = DBClusterEndpoint(
+                CUSTOM_ENDPOINT % title,
+                ServiceToken=service_token,
+                DBClusterIdentifier=Ref(DBCLUSTER),
+                DBClusterEndpointIdentifier=name,
+                EndpointType=config.get("EndpointType", "READER"),
+            )
+            for key in ["StaticMembers", "ExcludedMembers"]:
+                if config.get(key):
+                    setattr(endpoint, key, config[key])
+            t.add_resource(endpoint)
+
+            address = GetAtt(endpoint, "Endpoint")
+            t.add_output(Output("%sEndpoint" % title, Value=address))
+
+            hostname = config.get("InternalHostname")
+            if hostname and variables["InternalZoneId"] and \
+                    variables["InternalZoneName"]:
+                record = t.add_resource(
+                    RecordSetType(
+                        CUSTOM_ENDPOINT_DNS_RECORD % title,
+                        HostedZoneId=variables["InternalZoneId"],
+                        Comment="RDS DB Custom Endpoint CNAME Record",
+                        Name="%s.%s" % (hostname,
+                                        variables["InternalZoneName"]),
+                        Type="CNAME",
+                        TTL="120",
+                        ResourceRecords=[address],
+                    )
+                )
+                t.add_output(Output("%sCname" % title, Value=Ref(record)))
+
     def create_dns_records(self):
         t = self.template
         variables = self.get_variables()
@@ -263,6 +542,8 @@ class Cluster(Blueprint):
         self.create_security_group()
         self.create_parameter_group()
         self.create_cluster()
+        self.create_serverless_instances()
+        self.create_custom_endpoints()
         self.create_dns_records()
         self.create_outputs()
 
@@ -1,5 +1,10 @@
+from awacs.aws import Allow, Policy, Statement
+import awacs.kms
+
 from stacker.blueprints.base import Blueprint
+from stacker.util import cf_safe_name
 from troposphere import (
+    AWSProperty,
     FindInMap,
     GetAtt,
     Output,
@@ -9,13 +14,17 @@ from troposphere import (
     s3,
     iam,
 )
+from troposphere.validators import integer
 
 from .policies import (
+    make_simple_assume_policy,
     s3_arn,
-    read_only_s3_bucket_policy,
-    read_write_s3_bucket_policy,
+    s3_replication_policy_statements,
+    read_only_s3_bucket_policy_statements,
+    read_write_s3_bucket_policy_statements,
     static_website_bucket_policy,
 )
+from .util import check_properties
 
 # reference:
 #   https://docs.aws.amazon.com/general/latest/gr/rande.html#s3_region
@@ -38,6 +47,518 @@ S3_WEBSITE_ENDPOINTS = {
 }
 
 
+# Stacker specific bucket options, which are compiled into the equivalent
+# s3.Bucket attributes.
+BUCKET_OPTIONS = [
+    "Accelerate",
+    "RequestMetrics",
+    "IntelligentTiering",
+    "Inventory",
+    "EncryptionKeyArn",
+    "Replication",
+    "Lifecycle",
+]
+INVENTORY_FORMATS = ["CSV", "ORC", "Parquet"]
+INVENTORY_FREQUENCIES = ["Daily", "Weekly"]
+INVENTORY_OPTIONAL_FIELDS = [
+    "Size",
+    "LastModifiedDate",
+    "StorageClass",
+    "IntelligentTieringAccessTier",
+]
+# reference:
+#   https://docs.aws.amazon.com/AmazonS3/latest/userguide/intelligent-tiering-managing.html  # noqa
+ARCHIVE_ACCESS_DAYS = (90, 730)
+# Lifecycle transitions must move objects down this waterfall.
+# reference:
+#   https://docs.aws.amazon.com/AmazonS3/latest/userguide/lifecycle-transition-general-considerations.html  # noqa
+LIFECYCLE_STORAGE_CLASSES = [
+    "STANDARD_IA",
+    "INTELLIGENT_TIERING",
+    "ONEZONE_IA",
+    "GLACIER_IR",
+    "GLACIER",
+    "DEEP_ARCHIVE",
+]
+# Objects must be stored in these classes for at least 30 days, both before
+# transitioning to them and before transitioning out of them.
+LIFECYCLE_MINIMUM_DAYS = {
+    "STANDARD_IA": 30,
+    "ONEZONE_IA": 30,
+}
+# Replication Time Control replicates 99.99% of objects within 15 minutes.
+REPLICATION_TIME_MINUTES = 15
+REPLICATION_KEYS = [
+    "DestinationBucket",
+    "Rules",
+    "StorageClass",
+    "ReplicationTime",
+    "ReplicaKmsKeyArn",
+    "DeleteMarkerReplication",
+]
+REPLICATION_RULE_KEYS = ["Prefix", "Tags"]
+DEEP_ARCHIVE_ACCESS_DAYS = (180, 730)
+
+
+class Tiering(AWSProperty):
+    props = {
+        'AccessTier': (basestring, True),
+        'Days': (integer, True),
+    }
+
+
+class IntelligentTieringConfiguration(AWSProperty):
+    props = {
+        'Id': (basestring, True),
+        'Prefix': (basestring, False),
+        'Status': (basestring, True),
+        'TagFilters': ([s3.TagFilter], False),
+        'Tierings': ([Tiering], True),
+    }
+
+
+class ReplicationConfigurationRules(s3.ReplicationConfigurationRules):
+    # Rules using a Filter (the V2 schema) don't have a Prefix.
+    props = dict(
+        s3.ReplicationConfigurationRules.props,
+        Prefix=(basestring, False),
+    )
+
+
+class ReplicationConfiguration(s3.ReplicationConfiguration):
+    props = dict(
+        s3.ReplicationConfiguration.props,
+        Rules=([ReplicationConfigurationRules], True),
+    )
+
+
+class Bucket(s3.Bucket):
+    props = dict(
+        s3.Bucket.props,
+        IntelligentTieringConfigurations=(
+            [IntelligentTieringConfiguration], False),
+        ReplicationConfiguration=(ReplicationConfiguration, False),
+    )
+
+
+def metrics_configurations(prefixes):
+    """Returns request MetricsConfigurations for a list of prefixes.
+
+    An empty prefix enables request metrics for the entire bucket. Prefixes
+    that only differ in punctuation (ie: logs/ and logs) get numbered Ids.
+    """
+    configs = []
+    ids = set()
+    for prefix in prefixes:
+        config = {"Id": "EntireBucket"}
+        if prefix:
+            config = {
+                "Id": cf_safe_name(prefix.replace("/", "-")),
+                "Prefix": prefix,
+            }
+
+        metric_id, count = config["Id"], 1
+        while metric_id in ids:
+            count += 1
+            metric_id = "%s%d" % (config["Id"], count)
+        config["Id"] = metric_id
+        ids.add(metric_id)
+        configs.append(config)
+    return configs
+
+
+def intelligent_tiering_configuration(config):
+    """Returns an IntelligentTieringConfiguration enabling the archive tiers.
+
+    Args:
+        config (dict): A dictionary with the optional keys Prefix,
+            ArchiveAccessDays & DeepArchiveAccessDays.
+    """
+    archive_days = config.get("ArchiveAccessDays")
+    deep_archive_days = config.get("DeepArchiveAccessDays")
+    if not (archive_days or deep_archive_days):
+        raise ValueError("IntelligentTiering requires ArchiveAccessDays "
+                         "and/or DeepArchiveAccessDays.")
+
+    tierings = []
+    if archive_days:
+        if not (ARCHIVE_ACCESS_DAYS[0] <= archive_days <=
+                ARCHIVE_ACCESS_DAYS[1]):
+            raise ValueError(
+                "ArchiveAccessDays must be between %d and %d." %
+                ARCHIVE_ACCESS_DAYS)
+        tierings.append({"AccessTier": "ARCHIVE_ACCESS",
+                         "Days": archive_days})
+    if deep_archive_days:
+        if not (DEEP_ARCHIVE_ACCESS_DAYS[0] <= deep_archive_days <=
+                DEEP_ARCHIVE_ACCESS_DAYS[1]):
+            raise ValueError(
+                "DeepArchiveAccessDays must be between %d and %d." %
+                DEEP_ARCHIVE_ACCESS_DAYS)
+        if archive_days and deep_archive_days <= archive_days:
+            raise ValueError("DeepArchiveAccessDays must be greater than "
+                             "ArchiveAccessDays.")
+        tierings.append({"AccessTier": "DEEP_ARCHIVE_ACCESS",
+                         "Days": deep_archive_days})
+
+    tiering = {
+        "Id": "IntelligentTiering",
+        "Status": "Enabled",
+        "Tierings": tierings,
+    }
+    if config.get("Prefix"):
+        tiering["Prefix"] = config["Prefix"]
+    return tiering
+
+
+def inventory_configuration(config):
+    """Returns an InventoryConfiguration.
+
+    Args:
+        config (dict): A dictionary with the keys DestinationBucket (a bucket
+            name or ARN) and the optional keys DestinationPrefix, Format,
+            Frequency, Prefix, IncludeVersions & OptionalFields.
+    """
+    destination_bucket = config["DestinationBucket"]
+    if not destination_bucket.startswith("arn:"):
+        destination_bucket = s3_arn(destination_bucket)
+
+    inventory_format = config.get("Format", "Parquet")
+    if inventory_format not in INVENTORY_FORMATS:
+        raise ValueError("Inventory Format must be one of: %s" %
+                         ", ".join(INVENTORY_FORMATS))
+
+    frequency = config.get("Frequency", "Daily")
+    if frequency not in INVENTORY_FREQUENCIES:
+        raise ValueError("Inventory Frequency must be one of: %s" %
+                         ", ".join(INVENTORY_FREQUENCIES))
+
+    destination = {
+        "BucketArn": destination_bucket,
+        "Format": inventory_format,
+    }
+    if config.get("DestinationPrefix"):
+        destination["Prefix"] = config["DestinationPrefix"]
+
+    inventory = {
+        "Id": "Inventory",
+        "Destination": destination,
+        "Enabled": True,
+        "IncludedObjectVersions": (
+            "All" if config.get("IncludeVersions") else "Current"),
+        "OptionalFields": config.get("OptionalFields",
+                                     INVENTORY_OPTIONAL_FIELDS),
+        "ScheduleFrequency": frequency,
+    }
+    if config.get("Prefix"):
+        inventory["Prefix"] = config["Prefix"]
+    return inventory
+
+
+def bucket_key_encryption(key_arn):
+    """Returns a BucketEncryption using SSE-KMS with S3 Bucket Keys.
+
+    Bucket Keys let S3 reuse a bucket level data key instead of calling KMS
+    for every object, which greatly reduces KMS requests (and throttling)
+    for high volume buckets.
+    """
+    return {
+        "ServerSideEncryptionConfiguration": [
+            {
+                "BucketKeyEnabled": True,
+                "ServerSideEncryptionByDefault": {
+                    "KMSMasterKeyID": key_arn,
+                    "SSEAlgorithm": "aws:kms",
+                },
+            },
+        ],
+    }
+
+
+def bucket_key_statements(key_arns, write=False):
+    """Returns statements allowing roles to use the keys of SSE-KMS buckets.
+
+    Reading objects needs kms:Decrypt, and writing them also needs
+    kms:GenerateDataKey.
+    """
+    if not key_arns:
+        return []
+    actions = [awacs.kms.Decrypt]
+    if write:
+        actions.append(awacs.kms.GenerateDataKey)
+    return [
+        Statement(
+            Effect=Allow,
+            Action=actions,
+            Resource=key_arns,
+        )
+    ]
+
+
+def replication_rule_filter(rule):
+    """Returns the ReplicationRuleFilter for a replication rule.
+
+    Args:
+        rule (dict): A dictionary with the optional keys Prefix & Tags (a
+            dictionary of tag keys & values objects must have).
+    """
+    prefix = rule.get("Prefix", "")
+    tag_filters = [
+        {"Key": key, "Value": value}
+        for key, value in sorted(rule.get("Tags", {}).items())
+    ]
+
+    if len(tag_filters) > 1 or (prefix and tag_filters):
+        rule_filter = {"And": {"TagFilters": tag_filters}}
+        if prefix:
+            rule_filter["And"]["Prefix"] = prefix
+        return rule_filter
+    if tag_filters:
+        return {"TagFilter": tag_filters[0]}
+    return {"Prefix": prefix}
+
+
+def replication_configuration(role_arn, config):
+    """Returns a ReplicationConfiguration.
+
+    Args:
+        role_arn (str): The ARN of the role S3 uses to replicate objects.
+        config (dict): A dictionary with the keys DestinationBucket (the name
+            of the bucket to replicate to) and the optional keys Rules (a
+            list of dictionaries with Prefix & Tags, defaults to the entire
+            bucket), StorageClass, ReplicationTime, ReplicaKmsKeyArn &
+            DeleteMarkerReplication.
+    """
+    check_properties(config, REPLICATION_KEYS, "Replication")
+    if not config.get("DestinationBucket"):
+        raise ValueError("Replication requires a DestinationBucket.")
+
+    destination = {"Bucket": s3_arn(config["DestinationBucket"])}
+    if config.get("StorageClass"):
+        destination["StorageClass"] = config["StorageClass"]
+    if config.get("ReplicationTime", True):
+        minutes = {"Minutes": REPLICATION_TIME_MINUTES}
+        destination["ReplicationTime"] = {"Status": "Enabled",
+                                          "Time": minutes}
+        destination["Metrics"] = {"Status": "Enabled",
+                                  "EventThreshold": minutes}
+    if config.get("ReplicaKmsKeyArn"):
+        destination["EncryptionConfiguration"] = {
+            "ReplicaKmsKeyID": config["ReplicaKmsKeyArn"],
+        }
+
+    delete_markers = "Enabled" if config.get("DeleteMarkerReplication") \
+        else "Disabled"
+
+    rules = []
+    for priority, rule in enumerate(config.get("Rules", [{}]), 1):
+        check_properties(rule, REPLICATION_RULE_KEYS, "Replication rule")
+        replication_rule = {
+            "Id": "Replication%d" % priority,
+            "DeleteMarkerReplication": {"Status": delete_markers},
+            "Destination": destination,
+            "Filter": replication_rule_filter(rule),
+            "Priority": priority,
+            "Status": "Enabled",
+        }
+        if config.get("ReplicaKmsKeyArn"):
+            replication_rule["SourceSelectionCriteria"] = {
+                "SseKmsEncryptedObjects": {"Status": "Enabled"},
+            }
+        rules.append(replication_rule)
+
+    return {"Role": role_arn, "Rules": rules}
+
+
+def validate_lifecycle_transitions(transitions, expire_after, name):
+    """Validates the ordering and minimum days of lifecycle transitions.
+
+    Args:
+        transitions (dict): The storage class to transition to, keyed to
+            the number of days after which to transition.
+        expire_after (int): The number of days after which to expire, or
+            None.
+        name (str): The name of the transitions, used in error messages.
+    """
+    for storage_class in transitions:
+        if storage_class not in LIFECYCLE_STORAGE_CLASSES:
+            raise ValueError("%s storage class must be one of: %s" % (
+                name, ", ".join(LIFECYCLE_STORAGE_CLASSES)))
+
+    previous_class, previous_days = None, 0
+    for storage_class in LIFECYCLE_STORAGE_CLASSES:
+        if storage_class not in transitions:
+            continue
+        days = transitions[storage_class]
+        minimum = max(LIFECYCLE_MINIMUM_DAYS.get(storage_class, 0),
+                      LIFECYCLE_MINIMUM_DAYS.get(previous_class, 0) +
+                      previous_days,
+                      previous_days + 1)
+        if days < minimum:
+            raise ValueError("%s to %s must be at least %d days." % (
+                name, storage_class, minimum))
+        previous_class, previous_days = storage_class, days
+
+    if expire_after is not None and expire_after <= previous_days:
+        raise ValueError("%s expiration must be after the last transition "
+                         "(%d days)." % (name, previous_days))
+
+
+LIFECYCLE_ACTION_KEYS = [
+    "Transitions",
+    "ExpireAfter",
+    "AbortIncompleteMultipartUploadAfter",
+    "NoncurrentTransitions",
+    "NoncurrentExpireAfter",
+]
+
+LIFECYCLE_RULE_KEYS = ["Id", "Prefix"] + LIFECYCLE_ACTION_KEYS
+
+
+def lifecycle_rule(rule):
+    """Returns a LifecycleRule from a compact lifecycle spec.
+
+    Args:
+        rule (dict): A dictionary with the optional keys Id, Prefix,
+            Transitions (storage class to number of days), ExpireAfter,
+            AbortIncompleteMultipartUploadAfter, NoncurrentTransitions &
+            NoncurrentExpireAfter.
+    """
+    check_properties(rule, LIFECYCLE_RULE_KEYS, "Lifecycle rule")
+    if not set(rule) & set(LIFECYCLE_ACTION_KEYS):
+        raise ValueError("Lifecycle rule %s needs at least one of: %s." %
+                         (rule.get("Id", rule.get("Prefix", "")),
+                          ", ".join(LIFECYCLE_ACTION_KEYS)))
+
+    prefix = rule.get("Prefix", "")
+    transitions = rule.get("Transitions", {})
+    expire_after = rule.get("ExpireAfter")
+    noncurrent_transitions = rule.get("NoncurrentTransitions", {})
+    noncurrent_expire_after = rule.get("NoncurrentExpireAfter")
+    abort_after = rule.get("AbortIncompleteMultipartUploadAfter")
+
+    validate_lifecycle_transitions(transitions, expire_after, "Transitions")
+    validate_lifecycle_transitions(noncurrent_transitions,
+                                   noncurrent_expire_after,
+                                   "NoncurrentTransitions")
+    for key in ["ExpireAfter", "NoncurrentExpireAfter",
+                "AbortIncompleteMultipartUploadAfter"]:
+        if rule.get(key) is not None and rule[key] < 1:
+            raise ValueError("%s must be at least 1 day." % key)
+
+    compiled = {
+        "Id": rule.get("Id", prefix or "EntireBucket"),
+        "Status": "Enabled",
+    }
+    if prefix:
+        compiled["Prefix"] = prefix
+    if transitions:
+        compiled["Transitions"] = [
+            {"StorageClass": storage_class,
+             "TransitionInDays": transitions[storage_class]}
+            for storage_class in LIFECYCLE_STORAGE_CLASSES
+            if storage_class in transitions
+        ]
+    if expire_after:
+        compiled["ExpirationInDays"] = expire_after
+    if noncurrent_transitions:
+        compiled["NoncurrentVersionTransitions"] = [
+            {"StorageClass": storage_class,
+             "TransitionInDays": noncurrent_transitions[storage_class]}
+            for storage_class in LIFECYCLE_STORAGE_CLASSES
+            if storage_class in noncurrent_transitions
+        ]
+    if noncurrent_expire_after:
+        compiled["NoncurrentVersionExpirationInDays"] = \
+            noncurrent_expire_after
+    if abort_after:
+        compiled["AbortIncompleteMultipartUpload"] = {
+            "DaysAfterInitiation": abort_after,
+        }
+    return compiled
+
+
+def lifecycle_rules(rules):
+    compiled = [lifecycle_rule(rule) for rule in rules]
+    ids = [rule["Id"] for rule in compiled]
+    if len(set(ids)) != len(ids):
+        raise ValueError("Lifecycle rules must have unique Ids (or "
+                         "Prefixes).")
+    return compiled
+
+
+def replication_role_title(title):
+    return title + "ReplicationRole"
+
+
+def compile_bucket_options(title, attrs):
+    """Compiles stacker bucket options into s3.Bucket attributes.
+
+    Returns:
+        dict: A copy of attrs with any of the BUCKET_OPTIONS replaced by
+            their s3.Bucket attributes.
+    """
+    attrs = dict(attrs)
+    options = dict(
+        (key, attrs.pop(key)) for key in BUCKET_OPTIONS if key in attrs
+    )
+
+    if options.get("EncryptionKeyArn"):
+        if "BucketEncryption" in attrs:
+            raise ValueError("EncryptionKeyArn cannot be used with "
+                             "BucketEncryption.")
+        attrs["BucketEncryption"] = bucket_key_encryption(
+            options["EncryptionKeyArn"])
+
+    if options.get("Replication"):
+        # S3 skips SSE-KMS objects unless the rules opt in to them, with a
+        # key to encrypt the replicas with.
+        if options.get("EncryptionKeyArn") and \
+                not options["Replication"].get("ReplicaKmsKeyArn"):
+            raise ValueError("Replication of a bucket with an "
+                             "EncryptionKeyArn requires a ReplicaKmsKeyArn.")
+        versioning = attrs.setdefault("VersioningConfiguration",
+                                      {"Status": "Enabled"})
+        if versioning.get("Status") != "Enabled":
+            raise ValueError("Replication requires VersioningConfiguration "
+                             "to be Enabled.")
+        attrs["ReplicationConfiguration"] = replication_configuration(
+            GetAtt(replication_role_title(title), "Arn"),
+            options["Replication"])
+
+    if options.get("Lifecycle"):
+        lifecycle = dict(attrs.get("LifecycleConfiguration", {}))
+        lifecycle["Rules"] = lifecycle.get("Rules", []) + \
+            lifecycle_rules(options["Lifecycle"])
+        attrs["LifecycleConfiguration"] = lifecycle
+
+    if options.get("Accelerate"):
+        attrs["AccelerateConfiguration"] = {"AccelerationStatus": "Enabled"}
+
+    if options.get("RequestMetrics"):
+        attrs["MetricsConfigurations"] = \
+            attrs.get("MetricsConfigurations", []) + \
+            metrics_configurations(options["RequestMetrics"])
+
+    if options.get("IntelligentTiering"):
+        attrs["IntelligentTieringConfigurations"] = \
+            attrs.get("IntelligentTieringConfigurations", []) + [
+                intelligent_tiering_configuration(
+                    options["IntelligentTiering"])]
+
+    if options.get("Inventory"):
+        attrs["InventoryConfigurations"] = \
+            attrs.get("InventoryConfigurations", []) + [
+                inventory_configuration(options["Inventory"])]
+
+    return attrs
+
+
+def is_accelerated(attrs):
+    config = attrs.get("AccelerateConfiguration", {})
+    return config.get("AccelerationStatus") == "Enabled"
+
+
 class Buckets(Blueprint):
     VARIABLES = {
         "Buckets": {
@@ -45,7 +566,33 @@ class Buckets(Blueprint):
             "description": "A dictionary of buckets to create. The key "
                            "being the CFN logical resource name, the "
                            "value being a dictionary of attributes for "
-                           "the troposphere s3.Bucket type.",
+                           "the troposphere s3.Bucket type. Also accepts "
+                           "the following options: Accelerate (bool, "
+                           "enables transfer acceleration), RequestMetrics "
+                           "(a list of prefixes to enable CloudWatch "
+                           "request metrics for, an empty prefix being the "
+                           "entire bucket), IntelligentTiering (a "
+                           "dictionary with Prefix, ArchiveAccessDays & "
+                           "DeepArchiveAccessDays), Inventory (a "
+                           "dictionary with DestinationBucket, "
+                           "DestinationPrefix, Format, Frequency, Prefix, "
+                           "IncludeVersions & OptionalFields - the "
+                           "destination bucket must allow S3 to write to "
+                           "it), EncryptionKeyArn (the ARN of a KMS key, "
+                           "ie: from kms.Key, to encrypt objects with using "
+                           "SSE-KMS and S3 Bucket Keys) and Replication (a "
+                           "dictionary with DestinationBucket, Rules, "
+                           "StorageClass, ReplicationTime, "
+                           "ReplicaKmsKeyArn & DeleteMarkerReplication - "
+                           "enables versioning, which the destination "
+                           "bucket must also have enabled). Lifecycle "
+                           "accepts a list of dictionaries with Id, Prefix, "
+                           "Transitions (a dictionary of storage class to "
+                           "days), ExpireAfter, "
+                           "AbortIncompleteMultipartUploadAfter, "
+                           "NoncurrentTransitions & NoncurrentExpireAfter, "
+                           "which are compiled into the bucket's "
+                           "LifecycleConfiguration.",
             "default": {}
         },
         "ReadWriteRoles": {
@@ -63,15 +610,66 @@ class Buckets(Blueprint):
 
     }
 
+    def create_replication_role(self, title, attrs):
+        t = self.template
+        replication = attrs["Replication"]
+        source_key_arn = attrs.get("EncryptionKeyArn")
+        replica_key_arn = replication.get("ReplicaKmsKeyArn")
+
+        statements = s3_replication_policy_statements(
+            Ref(title), replication["DestinationBucket"])
+        if replica_key_arn:
+            statements.append(
+                Statement(
+                    Effect=Allow,
+                    Action=[awacs.kms.Encrypt],
+                    Resource=[replica_key_arn],
+                )
+            )
+        if source_key_arn:
+            statements.append(
+                Statement(
+                    Effect=Allow,
+                    Action=[awacs.kms.Decrypt],
+                    Resource=[source_key_arn],
+                )
+            )
+
+        role = t.add_resource(
+            iam.Role(
+                replication_role_title(title),
+                AssumeRolePolicyDocument=make_simple_assume_policy(
+                    "s3.amazonaws.com"
+                ),
+                Policies=[
+                    iam.Policy(
+                        PolicyName="replication",
+                        PolicyDocument=Policy(Statement=statements),
+                    )
+                ],
+            )
+        )
+        t.add_output(
+            Output(title + "ReplicationRoleArn", Value=GetAtt(role, "Arn"))
+        )
+
     def create_template(self):
         t = self.template
         variables = self.get_variables()
 
         bucket_ids = []
+        key_arns = []
 
         for title, attrs in variables["Buckets"].items():
             bucket_id = Ref(title)
-            t.add_resource(s3.Bucket.from_dict(title, attrs))
+            key_arn = attrs.get("EncryptionKeyArn")
+            if key_arn and key_arn not in key_arns:
+                key_arns.append(key_arn)
+            compiled = compile_bucket_options(title, attrs)
+            if attrs.get("Replication"):
+                self.create_replication_role(title, attrs)
+            attrs = compiled
+            t.add_resource(Bucket.from_dict(title, attrs))
             t.add_output(Output(title + "BucketId", Value=bucket_id))
             t.add_output(Output(title + "BucketArn", Value=s3_arn(bucket_id)))
             t.add_output(
@@ -80,6 +678,16 @@ class Buckets(Blueprint):
                     Value=GetAtt(title, "DomainName")
                 )
             )
+            if is_accelerated(attrs):
+                t.add_output(
+                    Output(
+                        title + "AccelerateEndpoint",
+                        Value=Sub(
+                            "${Bucket}.s3-accelerate.amazonaws.com",
+                            Bucket=bucket_id
+                        )
+                    )
+                )
             if "WebsiteConfiguration" in attrs:
                 t.add_mapping("WebsiteEndpoints", S3_WEBSITE_ENDPOINTS)
 
@@ -113,8 +721,10 @@ class Buckets(Blueprint):
                 iam.PolicyType(
                     "ReadWritePolicy",
                     PolicyName=Sub("${AWS::StackName}ReadWritePolicy"),
-                    PolicyDocument=read_write_s3_bucket_policy(
-                        bucket_ids
+                    PolicyDocument=Policy(
+                        Statement=read_write_s3_bucket_policy_statements(
+                            bucket_ids
+                        ) + bucket_key_statements(key_arns, write=True)
                     ),
                     Roles=read_write_roles,
                 )
@@ -126,8 +736,10 @@ class Buckets(Blueprint):
                 iam.PolicyType(
                     "ReadPolicy",
                     PolicyName=Sub("${AWS::StackName}ReadPolicy"),
-                    PolicyDocument=read_only_s3_bucket_policy(
-                        bucket_ids
+                    PolicyDocument=Policy(
+                        Statement=read_only_s3_bucket_policy_statements(
+                            bucket_ids
+                        ) + bucket_key_statements(key_arns)
                     ),
                     Roles=read_only_roles,
                 )
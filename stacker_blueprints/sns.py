@@ -8,6 +8,8 @@ from troposphere import (
     Output,
 )
 
+from stacker.util import cf_safe_name
+
 from . import util
 
 import awacs
@@ -22,32 +24,105 @@ from awacs.aws import (
 )
 
 
-def queue_policy(sns_arn, sqs_arns):
-    stmts = []
-    for arn in sqs_arns:
-        stmts.append(
-            Statement(
-                Effect="Allow",
-                Principal=Principal("*"),
-                Action=[awacs.sqs.SendMessage],
-                Resource=[arn],
-                Condition=Condition(
-                    ArnEquals({"aws:SourceArn": sns_arn})
-                )
-            )
+# Protocols which support raw message delivery.
+RAW_MESSAGE_DELIVERY_PROTOCOLS = ["sqs", "http", "https", "firehose"]
+
+
+def validate_subscription(subscription):
+    sns_subscription_properties = [
+        "Endpoint",
+        "Protocol",
+        "FilterPolicy",
+        "RawMessageDelivery",
+        "DeadLetterQueueArn",
+        "DeliveryPolicy",
+    ]
+
+    util.check_properties(subscription, sns_subscription_properties,
+                          "SNS Subscription")
+
+    for key in ["Endpoint", "Protocol"]:
+        if key not in subscription:
+            raise ValueError("SNS Subscription requires %s." % key)
+
+    if subscription.get("RawMessageDelivery") and \
+            subscription["Protocol"] not in RAW_MESSAGE_DELIVERY_PROTOCOLS:
+        raise ValueError(
+            "RawMessageDelivery is only supported by the %s protocols." %
+            ", ".join(RAW_MESSAGE_DELIVERY_PROTOCOLS))
+
+    if not isinstance(subscription.get("FilterPolicy", {}), dict):
+        raise ValueError("FilterPolicy must be a dictionary.")
+
+    return subscription
+
+
+def queue_policy_statement(sqs_arn, sns_arns):
+    """
+    Allows all of the given topics to send messages to a single queue.
+    """
+    if len(sns_arns) == 1:
+        sns_arns = sns_arns[0]
+
+    return Statement(
+        Effect="Allow",
+        Principal=Principal("*"),
+        Action=[awacs.sqs.SendMessage],
+        Resource=[sqs_arn],
+        Condition=Condition(
+            ArnEquals({"aws:SourceArn": sns_arns})
         )
+    )
+
+
+def subscribed_queues_policy(queue_topics):
+    """
+    Builds a policy allowing each queue (from a list of (queue ARN, topic
+    ARNs) pairs) to receive messages from its topics.
+    """
+    return Policy(
+        Statement=[
+            queue_policy_statement(sqs_arn, sns_arns)
+            for sqs_arn, sns_arns in queue_topics
+        ]
+    )
+
+
+def queue_policy_title(sqs_arn):
+    """
+    Returns a title for the policy of a queue shared by several topics.
+
+    The region & account are included, as queues with the same name can be
+    subscribed from different regions or accounts.
+    """
+    _, _, _, region, account_id, name = sqs_arn.split(":")
+    return cf_safe_name("%s-%s-%s" % (region, account_id, name)) + \
+        "SubPolicy"
+
 
-    return Policy(Statement=stmts)
+def queue_url(sqs_arn):
+    """
+    Converts the ARN of an SQS queue into its URL, which is needed by
+    queue policies.
+    """
+    _, _, service, region, account_id, name = sqs_arn.split(":")
+    return "https://%s.%s.amazonaws.com/%s/%s" % (
+        service, region, account_id, name
+    )
 
 
 def validate_topic(topic):
     sns_topic_properties = [
         "DisplayName",
         "Subscription",
+        "Subscriptions",
     ]
 
     util.check_properties(topic, sns_topic_properties, "SNS")
 
+    for subscription in topic.get("Subscriptions", []):
+        validate_subscription(subscription)
+
     return topic
 
 
@@ -67,47 +142,104 @@ class Topics(Blueprint):
     VARIABLES = {
         "Topics": {
             "type": dict,
-            "description": "Dictionary of SNS Topic definitions",
+            "description": "Dictionary of SNS Topic definitions. Besides "
+                           "the inline Subscription list, each topic "
+                           "accepts a Subscriptions list which creates "
+                           "separate subscription resources. These accept "
+                           "Endpoint, Protocol, FilterPolicy, "
+                           "RawMessageDelivery, DeadLetterQueueArn & "
+                           "DeliveryPolicy.",
             "validator": validate_topics,
         }
     }
 
     def create_template(self):
         variables = self.get_variables()
+        self.queue_topics = {}
+        self.topic_queues = {}
+
+        for topic_name in sorted(variables["Topics"]):
+            self.create_topic(topic_name, variables["Topics"][topic_name])
 
-        for topic_name, topic_config in variables["Topics"].iteritems():
-            self.create_topic(topic_name, topic_config)
+        self.create_sqs_policies()
 
-    def create_sqs_policy(self, topic_name, topic_arn, topic_subs):
+    def add_sqs_subscriptions(self, topic_name, topic_arn, topic_subs):
         """
-        This method creates the SQS policy needed for an SNS subscription. It
-        also takes the ARN of the SQS queue and converts it to the URL needed
-        for the subscription, as that takes a URL rather than the ARN.
+        Records the SQS queues subscribed to a topic, so that the queue
+        policies can be created once all topics are created.
+        """
+        queues = self.topic_queues.setdefault(topic_name, [])
+        for sub in topic_subs:
+            if sub["Endpoint"] not in queues:
+                queues.append(sub["Endpoint"])
+            topic_arns = self.queue_topics.setdefault(sub["Endpoint"], [])
+            if topic_arn not in topic_arns:
+                topic_arns.append(topic_arn)
+
+    def create_sqs_policies(self):
+        """
+        Creates the SQS policies allowing topics to send messages to their
+        subscribed queues. A queue can only have a single policy, so a
+        queue subscribed to several topics gets its own policy allowing all
+        of them. Every other queue is covered by its topic's
+        <Topic>SubPolicy.
         """
         t = self.template
 
-        arn_endpoints = []
-        url_endpoints = []
-        for sub in topic_subs:
-            arn_endpoints.append(sub["Endpoint"])
-            split_endpoint = sub["Endpoint"].split(":")
-            queue_url = "https://%s.%s.amazonaws.com/%s/%s" % (
-                split_endpoint[2],  # literally "sqs"
-                split_endpoint[3],  # AWS region
-                split_endpoint[4],  # AWS ID
-                split_endpoint[5],  # Queue name
+        for topic_name in sorted(self.topic_queues):
+            queues = [
+                queue_arn for queue_arn in self.topic_queues[topic_name]
+                if len(self.queue_topics[queue_arn]) == 1
+            ]
+            if not queues:
+                continue
+            t.add_resource(
+                sqs.QueuePolicy(
+                    topic_name + "SubPolicy",
+                    PolicyDocument=subscribed_queues_policy(
+                        (queue_arn, self.queue_topics[queue_arn])
+                        for queue_arn in queues
+                    ),
+                    Queues=[queue_url(queue_arn) for queue_arn in queues],
+                )
             )
-            url_endpoints.append(queue_url)
 
-        policy_doc = queue_policy(topic_arn, arn_endpoints)
+        for queue_arn in sorted(self.queue_topics):
+            topic_arns = self.queue_topics[queue_arn]
+            if len(topic_arns) == 1:
+                continue
+            t.add_resource(
+                sqs.QueuePolicy(
+                    queue_policy_title(queue_arn),
+                    PolicyDocument=subscribed_queues_policy(
+                        [(queue_arn, topic_arns)]
+                    ),
+                    Queues=[queue_url(queue_arn)],
+                )
+            )
 
-        t.add_resource(
-            sqs.QueuePolicy(
-                topic_name + "SubPolicy",
-                PolicyDocument=policy_doc,
-                Queues=url_endpoints,
+    def create_subscriptions(self, topic_name, topic_arn, subscriptions):
+        """
+        Creates separate subscription resources, which unlike the inline
+        subscriptions of a topic support filter policies, raw message
+        delivery & dead-letter queues.
+        """
+        t = self.template
+
+        for i, config in enumerate(subscriptions, 1):
+            config = dict(config)
+            dead_letter_queue_arn = config.pop("DeadLetterQueueArn", None)
+            if dead_letter_queue_arn:
+                config["RedrivePolicy"] = {
+                    "deadLetterTargetArn": dead_letter_queue_arn,
+                }
+            config["TopicArn"] = topic_arn
+
+            title = "%sSubscription%d" % (topic_name, i)
+            t.add_resource(
+                sns.SubscriptionResource.from_dict(title, config)
             )
-        )
+            t.add_output(Output(title + "Arn", Value=Ref(title)))
 
     def create_topic(self, topic_name, topic_config):
         """
@@ -116,6 +248,9 @@ class Topics(Blueprint):
         topic_subs = []
         t = self.template
 
+        topic_config = dict(topic_config)
+        subscriptions = topic_config.pop("Subscriptions", [])
+
         if "Subscription" in topic_config:
             topic_subs = topic_config["Subscription"]
 
@@ -133,6 +268,13 @@ class Topics(Blueprint):
         )
         t.add_output(Output(topic_name + "Arn", Value=topic_arn))
 
-        sqs_subs = [sub for sub in topic_subs if sub["Protocol"] == "sqs"]
-        if sqs_subs:
-            self.create_sqs_policy(topic_name, topic_arn, sqs_subs)
+        self.create_subscriptions(topic_name, topic_arn, subscriptions)
+
+        sqs_subs = [sub for sub in topic_subs + subscriptions
+                    if sub["Protocol"] == "sqs"]
+        # SNS also needs to send messages to the dead-letter queues.
+        sqs_subs.extend(
+            {"Endpoint": sub["DeadLetterQueueArn"]}
+            for sub in subscriptions if sub.get("DeadLetterQueueArn")
+        )
+        self.add_sqs_subscriptions(topic_name, topic_arn, sqs_subs)
@@ -8,22 +8,175 @@ from troposphere import (
     Output,
 )
 
+from .util import check_properties
+
+# Long polling waits up to 20 seconds for messages, instead of returning
+# empty receives.
+MAX_RECEIVE_WAIT_SECONDS = 20
+MAX_VISIBILITY_TIMEOUT = 43200
+MAX_MESSAGE_RETENTION_PERIOD = 1209600
+# reference:
+#   https://docs.aws.amazon.com/lambda/latest/dg/with-sqs.html#events-sqs-queueconfig  # noqa
+VISIBILITY_TIMEOUT_MULTIPLIER = 6
+DEFAULT_MAX_RECEIVE_COUNT = 5
+PROFILE_KEYS = [
+    "LongPolling",
+    "ConsumerTimeout",
+    "HighThroughputFifo",
+    "DeadLetterQueue",
+]
+
+
+class Queue(sqs.Queue):
+    # Not available in troposphere 2.7.1.
+    props = dict(
+        sqs.Queue.props,
+        DeduplicationScope=(basestring, False),
+        FifoThroughputLimit=(basestring, False),
+    )
+
+
+def visibility_timeout(consumer_timeout):
+    """Returns a VisibilityTimeout long enough for a consumer to retry.
+
+    The visibility timeout is a multiple of the consumer's timeout, so that
+    messages aren't received again while a consumer is still processing (or
+    retrying) them.
+    """
+    if not (0 < consumer_timeout <= MAX_VISIBILITY_TIMEOUT):
+        raise ValueError("ConsumerTimeout must be between 1 and %d." %
+                         MAX_VISIBILITY_TIMEOUT)
+    return min(consumer_timeout * VISIBILITY_TIMEOUT_MULTIPLIER,
+               MAX_VISIBILITY_TIMEOUT)
+
+
+def dead_letter_queue_name(queue_name):
+    """Returns the name of the dead-letter queue for a named queue.
+
+    FIFO queues require FIFO dead-letter queues, which must also end with
+    .fifo.
+    """
+    if queue_name.endswith(".fifo"):
+        return queue_name[:-len(".fifo")] + "-dlq.fifo"
+    return queue_name + "-dlq"
+
 
 class Queues(Blueprint):
     """Manages the creation of SQS queues."""
 
     VARIABLES = {
         "Queues": {
-            "type": TroposphereType(sqs.Queue, many=True),
+            "type": TroposphereType(Queue, many=True),
             "description": "Dictionary of SQS queue definitions",
         },
+        "QueueProfiles": {
+            "type": dict,
+            "description": "A dictionary of queue titles (from Queues) to a "
+                           "profile of defaults to apply to them. Valid "
+                           "keys are: LongPolling (bool, default true - "
+                           "sets ReceiveMessageWaitTimeSeconds to 20), "
+                           "ConsumerTimeout (the number of seconds a "
+                           "consumer can take to process a message, used "
+                           "to set VisibilityTimeout), HighThroughputFifo "
+                           "(bool, for FIFO queues) and DeadLetterQueue "
+                           "(bool, or a dictionary with MaxReceiveCount & "
+                           "MessageRetentionPeriod - can't be used with a "
+                           "RedrivePolicy). Properties set on the queue "
+                           "itself take precedence.",
+            "default": {},
+        },
     }
 
+    def set_default(self, queue, name, value):
+        if name not in queue.properties:
+            setattr(queue, name, value)
+
+    def create_dead_letter_queue(self, queue, config):
+        if config is True:
+            config = {}
+
+        retention_period = config.get("MessageRetentionPeriod",
+                                      MAX_MESSAGE_RETENTION_PERIOD)
+        dead_letter_queue = Queue(
+            queue.title + "DeadLetterQueue",
+            MessageRetentionPeriod=retention_period,
+        )
+
+        # Dead-letter queues must be the same type as their source queue.
+        if queue.properties.get("FifoQueue"):
+            dead_letter_queue.FifoQueue = True
+        queue_name = queue.properties.get("QueueName")
+        if queue_name:
+            dead_letter_queue.QueueName = dead_letter_queue_name(queue_name)
+
+        max_receive_count = config.get("MaxReceiveCount",
+                                       DEFAULT_MAX_RECEIVE_COUNT)
+        self.set_default(
+            queue, "RedrivePolicy",
+            sqs.RedrivePolicy(
+                deadLetterTargetArn=GetAtt(dead_letter_queue, "Arn"),
+                maxReceiveCount=max_receive_count,
+            )
+        )
+        return dead_letter_queue
+
+    def apply_profile(self, queue, profile):
+        """Applies a profile's defaults to a queue.
+
+        Returns:
+            list: Any additional queues created for the profile.
+        """
+        queues = []
+        check_properties(profile, PROFILE_KEYS,
+                         "QueueProfiles[%s]" % queue.title)
+
+        if profile.get("LongPolling", True):
+            self.set_default(queue, "ReceiveMessageWaitTimeSeconds",
+                             MAX_RECEIVE_WAIT_SECONDS)
+
+        if profile.get("ConsumerTimeout"):
+            self.set_default(queue, "VisibilityTimeout",
+                             visibility_timeout(profile["ConsumerTimeout"]))
+
+        if profile.get("HighThroughputFifo"):
+            if not queue.properties.get("FifoQueue"):
+                raise ValueError("HighThroughputFifo requires %s to be a "
+                                 "FifoQueue." % queue.title)
+            self.set_default(queue, "DeduplicationScope", "messageGroup")
+            self.set_default(queue, "FifoThroughputLimit",
+                             "perMessageGroupId")
+
+        if profile.get("DeadLetterQueue"):
+            if "RedrivePolicy" in queue.properties:
+                raise ValueError("%s already has a RedrivePolicy, so its "
+                                 "profile can't create a DeadLetterQueue." %
+                                 queue.title)
+            queues.append(
+                self.create_dead_letter_queue(queue,
+                                              profile["DeadLetterQueue"])
+            )
+
+        return queues
+
     def create_template(self):
         t = self.template
         variables = self.get_variables()
+        profiles = variables["QueueProfiles"]
+
+        titles = [queue.title for queue in variables["Queues"]]
+        for title in profiles:
+            if title not in titles:
+                raise ValueError("QueueProfiles has a profile for %s, which "
+                                 "is not in Queues." % title)
 
+        queues = []
         for queue in variables["Queues"]:
+            if queue.title in profiles:
+                queues.extend(self.apply_profile(queue,
+                                                 profiles[queue.title]))
+            queues.append(queue)
+
+        for queue in queues:
             t.add_resource(queue)
             t.add_output(
                 Output(queue.title + "Arn", Value=GetAtt(queue, "Arn"))
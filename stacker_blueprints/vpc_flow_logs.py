@@ -1,4 +1,5 @@
 from troposphere import (
+    AWSProperty,
     GetAtt,
     Join,
     Output,
@@ -9,6 +10,7 @@ from troposphere import (
 )
 
 from troposphere.iam import Policy as TropoPolicy
+from troposphere.validators import boolean
 
 from stacker.blueprints.base import Blueprint
 
@@ -32,6 +34,27 @@ LOG_RETENTION_DEFAULT = 0
 CLOUDWATCH_ROLE_NAME = "Role"
 FLOW_LOG_GROUP_NAME = "LogGroup"
 FLOW_LOG_STREAM_NAME = "LogStream"
+LOG_DESTINATION_TYPES = ["cloud-watch-logs", "s3"]
+RESOURCE_TYPES = ["VPC", "Subnet", "NetworkInterface"]
+FILE_FORMATS = ["plain-text", "parquet"]
+# Flow logs are aggregated over 1 or 10 minutes before being published.
+MAX_AGGREGATION_INTERVALS = [60, 600]
+
+
+class DestinationOptions(AWSProperty):
+    props = {
+        "FileFormat": (basestring, True),
+        "HiveCompatiblePartitions": (boolean, True),
+        "PerHourPartition": (boolean, True),
+    }
+
+
+class FlowLog(ec2.FlowLog):
+    # Not available in troposphere 2.7.1.
+    props = dict(
+        ec2.FlowLog.props,
+        DestinationOptions=(DestinationOptions, False),
+    )
 
 
 def vpc_flow_log_cloudwatch_policy(log_group_arn):
@@ -70,7 +93,33 @@ def validate_traffic_type(traffic_type):
     return traffic_type
 
 
+def validate_max_aggregation_interval(interval):
+    if interval and interval not in MAX_AGGREGATION_INTERVALS:
+        raise ValueError(
+            "MaxAggregationInterval must be one of the following: %s" %
+            ", ".join(str(i) for i in MAX_AGGREGATION_INTERVALS)
+        )
+
+    return interval
+
+
+def flow_log_format(fields):
+    """Returns a LogFormat from a list of field names, ie: srcaddr"""
+    return " ".join(
+        field if field.startswith("${") else "${%s}" % field
+        for field in fields
+    )
+
+
 class FlowLogs(Blueprint):
+    """Enables flow logs for a VPC, or for subnets or network interfaces.
+
+    Flow logs are published to CloudWatch Logs by default. With the s3
+    LogDestinationType they are published to BucketArn instead, as hourly
+    partitioned parquet files by default, which are cheaper to store and
+    faster to query (ie: with Athena) at high volumes.
+    """
+
     VARIABLES = {
         "Retention": {
             "type": int,
@@ -84,7 +133,22 @@ class FlowLogs(Blueprint):
         "VpcId": {
             "type": str,
             "description": "ID of the VPC that flow logs will be enabled "
-                           "for.",
+                           "for. Required unless ResourceIds are given.",
+            "default": "",
+        },
+        "ResourceType": {
+            "type": str,
+            "description": "The type of the ResourceIds. Must be one of the "
+                           "following: %s" % "/".join(RESOURCE_TYPES),
+            "default": "VPC",
+            "allowed_values": RESOURCE_TYPES,
+        },
+        "ResourceIds": {
+            "type": list,
+            "description": "A list of IDs of resources of ResourceType that "
+                           "flow logs will be enabled for, instead of "
+                           "VpcId.",
+            "default": [],
         },
         "TrafficType": {
             "type": str,
@@ -93,9 +157,87 @@ class FlowLogs(Blueprint):
             "validator": validate_traffic_type,
             "default": "ALL",
         },
+        "LogDestinationType": {
+            "type": str,
+            "description": "Where to publish flow logs to. Must be one of "
+                           "the following: %s" % "/".join(
+                               LOG_DESTINATION_TYPES),
+            "default": "cloud-watch-logs",
+            "allowed_values": LOG_DESTINATION_TYPES,
+        },
+        "BucketArn": {
+            "type": str,
+            "description": "The ARN of the bucket (and optionally a folder, "
+                           "ie: arn:aws:s3:::bucket/flow-logs/) to publish "
+                           "flow logs to. Required for the s3 "
+                           "LogDestinationType.",
+            "default": "",
+        },
+        "FileFormat": {
+            "type": str,
+            "description": "The format of flow log files published to s3.",
+            "default": "parquet",
+            "allowed_values": FILE_FORMATS,
+        },
+        "HiveCompatiblePartitions": {
+            "type": bool,
+            "description": "Set to 'true' to use Hive-compatible prefixes "
+                           "for flow logs published to s3.",
+            "default": True,
+        },
+        "PerHourPartition": {
+            "type": bool,
+            "description": "Set to 'true' to partition flow logs published "
+                           "to s3 per hour, rather than per day.",
+            "default": True,
+        },
+        "LogFormat": {
+            "type": list,
+            "description": "A list of the fields to include in flow log "
+                           "records, ie: [srcaddr, dstaddr, bytes]. Omit to "
+                           "use the default format.",
+            "default": [],
+        },
+        "MaxAggregationInterval": {
+            "type": int,
+            "description": "The number of seconds flows are aggregated over "
+                           "before being published. Must be one of the "
+                           "following: %s. Default 0 - the flow log "
+                           "default (600)." % ", ".join(
+                               str(i) for i in MAX_AGGREGATION_INTERVALS),
+            "default": 0,
+            "validator": validate_max_aggregation_interval,
+        },
     }
 
-    def create_template(self):
+    def use_s3(self):
+        return self.get_variables()["LogDestinationType"] == "s3"
+
+    def validate_variables(self):
+        variables = self.get_variables()
+        if self.use_s3() and not variables["BucketArn"]:
+            raise ValueError("BucketArn is required for the s3 "
+                             "LogDestinationType.")
+
+        if not (variables["VpcId"] or variables["ResourceIds"]):
+            raise ValueError("One of VpcId or ResourceIds is required.")
+        if not variables["ResourceIds"] and \
+                variables["ResourceType"] != "VPC":
+            raise ValueError("ResourceIds are required for the %s "
+                             "ResourceType." % variables["ResourceType"])
+
+    def get_resource_ids(self):
+        variables = self.get_variables()
+        return variables["ResourceIds"] or [variables["VpcId"]]
+
+    def create_cloudwatch_logs_destination(self):
+        """Creates the log group flow logs are published to in CloudWatch
+        Logs, along with the role used to publish them.
+
+        Returns:
+            dict: The attributes of the ec2.FlowLog objects for the log
+                group.
+        """
         t = self.template
         variables = self.get_variables()
 
@@ -149,20 +291,59 @@ class FlowLogs(Blueprint):
             )
         )
 
-        self.log_stream = t.add_resource(
-            ec2.FlowLog(
-                FLOW_LOG_STREAM_NAME,
-                DeliverLogsPermissionArn=role_arn,
-                LogGroupName=Ref(FLOW_LOG_GROUP_NAME),
-                ResourceId=variables["VpcId"],
-                ResourceType="VPC",
+        return {
+            "DeliverLogsPermissionArn": role_arn,
+            "LogGroupName": Ref(FLOW_LOG_GROUP_NAME),
+        }
+
+    def create_flow_logs(self, destination):
+        t = self.template
+        variables = self.get_variables()
+
+        resource_ids = self.get_resource_ids()
+        for i, resource_id in enumerate(resource_ids):
+            title = FLOW_LOG_STREAM_NAME
+            if variables["ResourceIds"]:
+                title = "{}{}".format(FLOW_LOG_STREAM_NAME, i + 1)
+
+            flow_log = FlowLog(
+                title,
+                ResourceId=resource_id,
+                ResourceType=variables["ResourceType"],
                 TrafficType=variables["TrafficType"],
+                **destination
             )
-        )
+            if variables["MaxAggregationInterval"]:
+                flow_log.MaxAggregationInterval = \
+                    variables["MaxAggregationInterval"]
+            if variables["LogFormat"]:
+                flow_log.LogFormat = flow_log_format(variables["LogFormat"])
+            if self.use_s3():
+                flow_log.DestinationOptions = DestinationOptions(
+                    FileFormat=variables["FileFormat"],
+                    HiveCompatiblePartitions=(
+                        variables["HiveCompatiblePartitions"]
+                    ),
+                    PerHourPartition=variables["PerHourPartition"],
+                )
 
-        t.add_output(
-            Output(
-                "%sName" % FLOW_LOG_STREAM_NAME,
-                Value=Ref(self.log_stream)
+            flow_log = t.add_resource(flow_log)
+            t.add_output(
+                Output(
+                    "%sName" % flow_log.title,
+                    Value=Ref(flow_log)
+                )
             )
-        )
+
+    def create_template(self):
+        self.validate_variables()
+
+        if self.use_s3():
+            destination = {
+                "LogDestination": self.get_variables()["BucketArn"],
+                "LogDestinationType": "s3",
+            }
+        else:
+            destination = self.create_cloudwatch_logs_destination()
+
+        self.create_flow_logs(destination)
@@ -2,7 +2,10 @@ from stacker.context import Context
 from stacker.config import Config
 from stacker.variables import Variable
 
-from stacker_blueprints.asg import FlexibleAutoScalingGroup
+from stacker_blueprints.asg import (
+    FlexibleAutoScalingGroup,
+    QueueBacklogScalingPolicy,
+)
 from stacker.blueprints.testutil import BlueprintTestCase
 
 
@@ -56,3 +59,44 @@ class TestBlueprint(BlueprintTestCase):
         blueprint.resolve_variables(self.generate_variables())
         blueprint.create_template()
         self.assertRenderedBlueprint(blueprint)
+
+
+class TestQueueBacklogScalingPolicy(BlueprintTestCase):
+    def setUp(self):
+        self.ctx = Context(config=Config({"namespace": "test"}))
+
+    def test_create_template(self):
+        blueprint = QueueBacklogScalingPolicy(
+            "test_asg_queue_backlog_scaling_policy", self.ctx
+        )
+        blueprint.resolve_variables([
+            Variable("AutoScalingGroupName", "workers"),
+            Variable("QueueArn", "arn:aws:sqs:us-east-1:123456789012:jobs"),
+            Variable("AcceptableLatency", 60),
+            Variable("MessageProcessingTime", 2.0),
+        ])
+        blueprint.create_template()
+        self.assertRenderedBlueprint(blueprint)
+
+    def test_target_backlog_required(self):
+        blueprint = QueueBacklogScalingPolicy(
+            "test_asg_queue_backlog_scaling_policy", self.ctx
+        )
+        blueprint.resolve_variables([
+            Variable("AutoScalingGroupName", "workers"),
+            Variable("QueueArn", "arn:aws:sqs:us-east-1:123456789012:jobs"),
+        ])
+        with self.assertRaises(ValueError):
+            blueprint.create_template()
+
+    def test_invalid_queue_arn(self):
+        blueprint = QueueBacklogScalingPolicy(
+            "test_asg_queue_backlog_scaling_policy", self.ctx
+        )
+        blueprint.resolve_variables([
+            Variable("AutoScalingGroupName", "workers"),
+            Variable("QueueArn", "jobs"),
+            Variable("TargetBacklogPerInstance", 30.0),
+        ])
+        with self.assertRaises(ValueError):
+            blueprint.create_template()
@@ -0,0 +1,98 @@
+import unittest
+
+from stacker.blueprints.testutil import BlueprintTestCase
+from stacker.context import Context
+from stacker.variables import Variable
+
+from stacker_blueprints.rds.aurora.base import Cluster
+
+
+CLUSTER_VARIABLES = {
+    "DatabaseName": "app",
+    "DBFamily": "aurora-postgresql14",
+    "Engine": "aurora-postgresql",
+    "EngineVersion": "14.3",
+    "MasterUser": "root",
+    "MasterUserPassword": "password",
+    "Subnets": "subnet-1,subnet-2",
+    "VpcId": "vpc-1",
+}
+
+
+class TestCluster(BlueprintTestCase):
+    def setUp(self):
+        self.ctx = Context({'namespace': 'test'})
+
+    def generate_variables(self, **kwargs):
+        variables = dict(CLUSTER_VARIABLES, **kwargs)
+        return [Variable(k, v) for k, v in variables.items()]
+
+    def test_create_template_serverless_v2(self):
+        blueprint = Cluster('test_aurora_cluster_serverless_v2', self.ctx)
+        blueprint.resolve_variables(
+            self.generate_variables(
+                ServerlessV2Scaling={"MinCapacity": 0.5, "MaxCapacity": 16},
+                ServerlessV2InstanceCount=2,
+            )
+        )
+        blueprint.create_template()
+        self.assertRenderedBlueprint(blueprint)
+
+    def test_serverless_v2_unsupported_engine_version(self):
+        blueprint = Cluster('test_aurora_cluster_serverless_v2_version',
+                            self.ctx)
+        blueprint.resolve_variables(
+            self.generate_variables(
+                EngineVersion="13.4",
+                ServerlessV2Scaling={"MinCapacity": 0.5, "MaxCapacity": 16},
+            )
+        )
+        with self.assertRaises(ValueError):
+            blueprint.create_template()
+
+    def test_serverless_v2_instances_require_scaling(self):
+        blueprint = Cluster('test_aurora_cluster_serverless_v2_instances',
+                            self.ctx)
+        blueprint.resolve_variables(
+            self.generate_variables(ServerlessV2InstanceCount=1)
+        )
+        with self.assertRaises(ValueError):
+            blueprint.create_template()
+
+    def test_create_template_custom_endpoints(self):
+        blueprint = Cluster('test_aurora_cluster_custom_endpoints', self.ctx)
+        blueprint.resolve_variables(
+            self.generate_variables(
+                InternalZoneId="Z1234",
+                InternalZoneName="internal.example.com",
+                CustomEndpointServiceToken="arn:aws:lambda:us-east-1:"
+                                           "012345678901:function:endpoints",
+                CustomEndpoints={
+                    "analytics": {
+                        "StaticMembers": ["app-3"],
+                        "InternalHostname": "analytics-db",
+                    },
+                    "app-readers": {
+                        "EndpointType": "ANY",
+                        "ExcludedMembers": ["app-3"],
+                    },
+                },
+            )
+        )
+        blueprint.create_template()
+        self.assertRenderedBlueprint(blueprint)
+
+    def test_custom_endpoints_require_service_token(self):
+        blueprint = Cluster('test_aurora_cluster_custom_endpoints_token',
+                            self.ctx)
+        blueprint.resolve_variables(
+            self.generate_variables(
+                CustomEndpoints={"analytics": {"StaticMembers": ["app-3"]}},
+            )
+        )
+        with self.assertRaises(ValueError):
+            blueprint.create_template()
+
+
+if __name__ == '__main__':
+    unittest.main()
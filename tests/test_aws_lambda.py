@@ -3,7 +3,8 @@ from types import MethodType
 from stacker.context import Context
 from stacker.config import Config
 from stacker.variables import Variable
-from stacker_blueprints.aws_lambda import Function, FunctionScheduler
+from stacker.exceptions import ValidatorError
+from stacker_blueprints.aws_lambda import Function, FunctionScheduler, Layer
 from stacker.blueprints.testutil import BlueprintTestCase
 
 from troposphere.awslambda import Code
@@ -136,6 +137,116 @@ class TestBlueprint(BlueprintTestCase):
         blueprint.create_template()
         self.assertRenderedBlueprint(blueprint)
 
+    def test_create_template_event_invoke_config(self):
+        blueprint = self.create_blueprint(
+            'test_aws_lambda_Function_event_invoke_config'
+        )
+        self.common_variables["EventInvokeConfig"] = {
+            "MaximumRetryAttempts": 0,
+            "MaximumEventAgeInSeconds": 3600,
+            "OnSuccess": "arn:aws:sns:us-east-1:12345:processed",
+            "OnFailure": "arn:aws:sqs:us-east-1:12345:failed",
+        }
+        blueprint.resolve_variables(self.generate_variables())
+        blueprint.create_template()
+        self.assertRenderedBlueprint(blueprint)
+
+    def test_invalid_event_invoke_config_destination(self):
+        blueprint = self.create_blueprint(
+            'test_aws_lambda_Function_event_invoke_config'
+        )
+        self.common_variables["EventInvokeConfig"] = {
+            "OnFailure": "arn:aws:s3:::failed",
+        }
+        with self.assertRaises(ValidatorError):
+            blueprint.resolve_variables(self.generate_variables())
+
+    def test_create_template_with_layers(self):
+        blueprint = self.create_blueprint(
+            'test_aws_lambda_Function_with_layers'
+        )
+        self.common_variables["Layers"] = [
+            "arn:aws:lambda:us-east-1:12345:layer:deps:3",
+        ]
+        blueprint.resolve_variables(self.generate_variables())
+        blueprint.create_template()
+        self.assertRenderedBlueprint(blueprint)
+
+    def test_too_many_layers(self):
+        blueprint = self.create_blueprint(
+            'test_aws_lambda_Function_with_layers'
+        )
+        self.common_variables["Layers"] = [
+            "arn:aws:lambda:us-east-1:12345:layer:deps%d:1" % i
+            for i in range(6)
+        ]
+        with self.assertRaises(ValidatorError):
+            blueprint.resolve_variables(self.generate_variables())
+
+    def test_create_template_arm64(self):
+        blueprint = self.create_blueprint(
+            'test_aws_lambda_Function_arm64'
+        )
+        self.common_variables["Architectures"] = ["arm64"]
+        self.common_variables["EphemeralStorage"] = 2048
+        self.common_variables["Layers"] = [
+            {
+                "Arn": "arn:aws:lambda:us-east-1:12345:layer:deps:3",
+                "CompatibleArchitectures": "x86_64,arm64",
+            },
+        ]
+        blueprint.resolve_variables(self.generate_variables())
+        blueprint.create_template()
+        self.assertRenderedBlueprint(blueprint)
+
+    def test_create_template_default_architecture(self):
+        blueprint = self.create_blueprint('test_aws_lambda_Function')
+        self.common_variables["Architectures"] = ["x86_64"]
+        blueprint.resolve_variables(self.generate_variables())
+        blueprint.create_template()
+        self.assertRenderedBlueprint(blueprint)
+
+    def test_layer_incompatible_architecture(self):
+        blueprint = self.create_blueprint(
+            'test_aws_lambda_Function_with_layers'
+        )
+        self.common_variables["Architectures"] = ["arm64"]
+        self.common_variables["Layers"] = [
+            {
+                "Arn": "arn:aws:lambda:us-east-1:12345:layer:deps:3",
+                "CompatibleArchitectures": "x86_64",
+            },
+        ]
+        blueprint.resolve_variables(self.generate_variables())
+        with self.assertRaises(ValueError):
+            blueprint.create_template()
+
+    def test_invalid_memory_size(self):
+        blueprint = self.create_blueprint('test_aws_lambda_Function')
+        self.common_variables["MemorySize"] = 64
+        with self.assertRaises(ValidatorError):
+            blueprint.resolve_variables(self.generate_variables())
+
+
+class TestLayer(BlueprintTestCase):
+    def setUp(self):
+        self.ctx = Context(config=Config({'namespace': 'test'}))
+
+    def test_create_template(self):
+        blueprint = Layer('test_aws_lambda_Layer', self.ctx)
+        blueprint.resolve_variables(
+            [
+                Variable("Code", Code(S3Bucket="test_bucket",
+                                      S3Key="layer_key")),
+                Variable("LayerName", "deps"),
+                Variable("CompatibleRuntimes", ["python3.9"]),
+                Variable("CompatibleArchitectures", ["x86_64", "arm64"]),
+                Variable("Principals", ["12345", "67890"]),
+            ]
+        )
+        blueprint.create_template()
+        self.assertRenderedBlueprint(blueprint)
+
 
 class TestFunctionScheduler(BlueprintTestCase):
     def setUp(self):
@@ -168,3 +279,77 @@ class TestFunctionScheduler(BlueprintTestCase):
         )
         blueprint.create_template()
         self.assertRenderedBlueprint(blueprint)
+
+    def test_create_template_many_rules(self):
+        blueprint = FunctionScheduler(
+            'test_aws_lambda_FunctionScheduler_many_rules', self.ctx)
+        function_arn = "arn:aws:lambda:us-east-1:01234:function:my-Function"
+        targets = [
+            {
+                "Id": "target-%d" % i,
+                "Arn": function_arn,
+                "InputTransformer": {
+                    "InputPathsMap": {"time": "$.time"},
+                    "InputTemplate": '{"time": <time>, "target": %d}' % i,
+                },
+            }
+            for i in range(6)
+        ]
+        blueprint.resolve_variables(
+            [
+                Variable(
+                    "CloudwatchEventsRules",
+                    {
+                        "Hourly": {
+                            "Name": "hourly",
+                            "ScheduleExpression": "rate(1 hour)",
+                            "Targets": targets,
+                        },
+                        "Daily": {
+                            "ScheduleExpression": "rate(1 day)",
+                            "Targets": [
+                                {"Id": "daily", "Arn": function_arn},
+                            ],
+                        },
+                    }
+                )
+            ]
+        )
+        blueprint.create_template()
+        self.assertRenderedBlueprint(blueprint)
+
+    def test_undefined_input_transformer_placeholder(self):
+        blueprint = FunctionScheduler(
+            'test_aws_lambda_FunctionScheduler_placeholder', self.ctx)
+        blueprint.resolve_variables(
+            [
+                Variable(
+                    "CloudwatchEventsRule",
+                    {
+                        "MyTestFuncSchedule": {
+                            "ScheduleExpression": "rate(15 minutes)",
+                            "Targets": [
+                                {
+                                    "Id": "my-powerful-test-function",
+                                    "Arn": "arn:aws:lambda:us-east-1:01234:"
+                                           "function:my-Function-162L1234",
+                                    "InputTransformer": {
+                                        "InputPathsMap": {"time": "$.time"},
+                                        "InputTemplate": '"<detail>"',
+                                    },
+                                },
+                            ],
+                        }
+                    }
+                )
+            ]
+        )
+        with self.assertRaises(ValueError):
+            blueprint.create_template()
+
+    def test_no_rules(self):
+        blueprint = FunctionScheduler(
+            'test_aws_lambda_FunctionScheduler_no_rules', self.ctx)
+        blueprint.resolve_variables([])
+        with self.assertRaises(ValueError):
+            blueprint.create_template()
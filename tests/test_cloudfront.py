@@ -0,0 +1,48 @@
+from stacker.context import Context, Config
+from stacker.variables import Variable
+from stacker_blueprints.cloudfront import StaticWebsite
+from stacker.blueprints.testutil import BlueprintTestCase
+
+
+class TestStaticWebsite(BlueprintTestCase):
+    def setUp(self):
+        self.ctx = Context(config=Config({'namespace': 'test'}))
+
+    def test_cloudfront_origin_access(self):
+        blueprint = StaticWebsite('cloudfront_origin_access', self.ctx)
+        blueprint.resolve_variables([
+            Variable('BucketName', 'test-blog'),
+            Variable('BucketDomainName', 'test-blog.s3.amazonaws.com'),
+            Variable('Aliases', ['blog.example.com']),
+            Variable('AcmCertificateArn',
+                     'arn:aws:acm:us-east-1:123456789012:certificate/abc'),
+            Variable('HostedZoneId', 'Z123456'),
+            Variable('CustomErrorResponses', [{
+                'ErrorCode': 404,
+                'ResponseCode': 404,
+                'ResponsePagePath': '/404.html',
+            }]),
+        ])
+        blueprint.create_template()
+        self.assertRenderedBlueprint(blueprint)
+
+    def test_cloudfront_website_endpoint(self):
+        blueprint = StaticWebsite('cloudfront_website_endpoint', self.ctx)
+        blueprint.resolve_variables([
+            Variable('BucketName', 'test-blog'),
+            Variable('WebsiteEndpoint', 's3-website-us-east-1.amazonaws.com'),
+            Variable('HttpVersion', 'http2'),
+            Variable('IPV6Enabled', False),
+        ])
+        blueprint.create_template()
+        self.assertRenderedBlueprint(blueprint)
+
+    def test_cloudfront_aliases_require_certificate(self):
+        blueprint = StaticWebsite('cloudfront_origin_access', self.ctx)
+        blueprint.resolve_variables([
+            Variable('BucketName', 'test-blog'),
+            Variable('BucketDomainName', 'test-blog.s3.amazonaws.com'),
+            Variable('Aliases', ['blog.example.com']),
+        ])
+        with self.assertRaises(ValueError):
+            blueprint.create_template()
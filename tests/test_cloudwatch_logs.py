@@ -5,7 +5,10 @@ from stacker.context import Context
 from stacker.config import Config
 from stacker.variables import Variable
 
-from stacker_blueprints.cloudwatch_logs import SubscriptionFilters
+from stacker_blueprints.cloudwatch_logs import (
+    MetricFilters,
+    SubscriptionFilters,
+)
 
 from troposphere import GetAtt, Ref
 
@@ -42,6 +45,181 @@ class TestSubscriptionFilters(BlueprintTestCase):
         blueprint.create_template()
         self.assertRenderedBlueprint(blueprint)
 
+    def test_create_template_stream(self):
+        blueprint = SubscriptionFilters(
+            'test_cloudwatch_logs_subscription_filters_stream',
+            self.ctx
+        )
+
+        blueprint.resolve_variables(
+            [
+                Variable(
+                    "StreamArn",
+                    "arn:aws:firehose:us-east-1:012345678901:"
+                    "deliverystream/logs"
+                ),
+                Variable("DestinationName", "central-logs"),
+                Variable("DestinationAccounts", ["123456789012"]),
+                Variable(
+                    "SubscriptionFilters",
+                    {
+                        "Filter1": {
+                            "FilterPattern": "",
+                            "LogGroupName": Ref("LogGroup1"),
+                        },
+                    }
+                )
+            ]
+        )
+        blueprint.create_template()
+        self.assertRenderedBlueprint(blueprint)
+
+    def test_create_template_kinesis_stream(self):
+        blueprint = SubscriptionFilters(
+            'test_cloudwatch_logs_subscription_filters_kinesis',
+            self.ctx
+        )
+
+        blueprint.resolve_variables(
+            [
+                Variable(
+                    "StreamArn",
+                    "arn:aws:kinesis:us-east-1:012345678901:stream/logs"
+                ),
+                Variable(
+                    "SubscriptionFilters",
+                    {
+                        "Filter1": {
+                            "FilterPattern": "",
+                            "LogGroupName": Ref("LogGroup1"),
+                        },
+                        "Filter2": {
+                            "Distribution": "ByLogStream",
+                            "FilterPattern": "",
+                            "LogGroupName": Ref("LogGroup2"),
+                        },
+                    }
+                )
+            ]
+        )
+        blueprint.create_template()
+        self.assertRenderedBlueprint(blueprint)
+
+    def test_invalid_stream_arn(self):
+        blueprint = SubscriptionFilters(
+            'test_cloudwatch_logs_subscription_filters_invalid',
+            self.ctx
+        )
+
+        blueprint.resolve_variables(
+            [
+                Variable(
+                    "StreamArn",
+                    "arn:aws:lambda:us-east-1:012345678901:function:logs"
+                ),
+            ]
+        )
+        with self.assertRaises(ValueError):
+            blueprint.create_template()
+
+
+class TestMetricFilters(BlueprintTestCase):
+    def setUp(self):
+        self.ctx = Context(config=Config({'namespace': 'test'}))
+
+    def test_create_template(self):
+        blueprint = MetricFilters('test_cloudwatch_logs_metric_filters',
+                                  self.ctx)
+
+        blueprint.resolve_variables(
+            [
+                Variable("LogGroupName", "/app/web"),
+                Variable("MetricNamespace", "App"),
+                Variable("AlarmActions", ["arn:aws:sns:us-east-1:012345678901:"
+                                          "alerts"]),
+                Variable(
+                    "MetricFilters",
+                    {
+                        "Errors": {
+                            "FilterPattern": "ERROR",
+                            "MetricName": "Errors",
+                            "DefaultValue": 0,
+                            "Alarm": {
+                                "Threshold": 10,
+                                "EvaluationPeriods": 5,
+                            },
+                        },
+                        "Latency": {
+                            "FilterPattern": "{ $.latency = * }",
+                            "MetricName": "Latency",
+                            "MetricValue": "$.latency",
+                            "Unit": "Milliseconds",
+                            "Dimensions": {"Route": "$.route"},
+                            "Alarm": {
+                                "Statistic": "Average",
+                                "Threshold": 500,
+                                "Dimensions": {"Route": "/checkout"},
+                            },
+                        },
+                    }
+                )
+            ]
+        )
+        blueprint.create_template()
+        self.assertRenderedBlueprint(blueprint)
+
+    def test_alarm_dimensions_must_match(self):
+        for alarm_dimensions in [{}, {"Path": "/checkout"}]:
+            blueprint = MetricFilters(
+                'test_cloudwatch_logs_metric_filters_invalid', self.ctx)
+
+            blueprint.resolve_variables(
+                [
+                    Variable(
+                        "MetricFilters",
+                        {
+                            "Latency": {
+                                "LogGroupName": "/app/web",
+                                "MetricName": "Latency",
+                                "MetricNamespace": "App",
+                                "MetricValue": "$.latency",
+                                "Dimensions": {"Route": "$.route"},
+                                "Alarm": {
+                                    "Threshold": 500,
+                                    "Dimensions": alarm_dimensions,
+                                },
+                            },
+                        }
+                    )
+                ]
+            )
+            with self.assertRaises(ValueError):
+                blueprint.create_template()
+
+    def test_dimensions_with_default_value(self):
+        blueprint = MetricFilters(
+            'test_cloudwatch_logs_metric_filters_invalid', self.ctx)
+
+        blueprint.resolve_variables(
+            [
+                Variable(
+                    "MetricFilters",
+                    {
+                        "Latency": {
+                            "LogGroupName": "/app/web",
+                            "MetricName": "Latency",
+                            "MetricNamespace": "App",
+                            "MetricValue": "$.latency",
+                            "DefaultValue": 0,
+                            "Dimensions": {"Route": "$.route"},
+                        },
+                    }
+                )
+            ]
+        )
+        with self.assertRaises(ValueError):
+            blueprint.create_template()
+
 
 if __name__ == '__main__':
     unittest.main()
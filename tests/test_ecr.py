@@ -0,0 +1,111 @@
+import unittest
+
+from stacker.blueprints.testutil import BlueprintTestCase
+from stacker.context import Context
+from stacker.variables import Variable
+
+from stacker_blueprints.ecr import (
+    PullThroughCacheRule,
+    RepositoryFilter,
+    Repositories,
+    lifecycle_policy_rules,
+)
+
+
+class TestLifecyclePolicy(unittest.TestCase):
+    def test_rules(self):
+        rules = lifecycle_policy_rules({
+            "ExpireUntaggedDays": 7,
+            "KeepTaggedImages": 20,
+            "TagPatterns": ["release-*"],
+        })
+        self.assertEqual([rule["rulePriority"] for rule in rules], [1, 2])
+        self.assertEqual(rules[0]["selection"]["countNumber"], 7)
+        self.assertEqual(rules[1]["selection"]["tagPatternList"],
+                         ["release-*"])
+
+    def test_invalid_key(self):
+        with self.assertRaises(ValueError):
+            lifecycle_policy_rules({"ExpireUntaggedImages": 7})
+
+    def test_invalid_count(self):
+        with self.assertRaises(ValueError):
+            lifecycle_policy_rules({"KeepTaggedImages": 0})
+
+
+class TestResources(unittest.TestCase):
+    def test_unicode_properties(self):
+        rule = PullThroughCacheRule(
+            "EcrPublic",
+            EcrRepositoryPrefix=u"ecr-public",
+            UpstreamRegistryUrl=u"public.ecr.aws",
+        )
+        self.assertEqual(
+            rule.to_dict()["Properties"]["EcrRepositoryPrefix"], u"ecr-public")
+        repository_filter = RepositoryFilter(
+            Filter=u"api", FilterType=u"PREFIX_MATCH")
+        self.assertEqual(repository_filter.to_dict()["Filter"], u"api")
+
+
+class TestRepositories(BlueprintTestCase):
+    def setUp(self):
+        self.ctx = Context({'namespace': 'test'})
+
+    def test_create_template_lifecycle_policy(self):
+        blueprint = Repositories('test_ecr_repositories_lifecycle_policy',
+                                 self.ctx)
+        blueprint.resolve_variables(
+            [
+                Variable("Repositories", ["api", "worker"]),
+                Variable("LifecyclePolicy", {
+                    "ExpireUntaggedDays": 7,
+                    "KeepTaggedImages": 20,
+                }),
+            ]
+        )
+        blueprint.create_template()
+        self.assertRenderedBlueprint(blueprint)
+
+    def test_create_template_replication(self):
+        blueprint = Repositories('test_ecr_repositories_replication',
+                                 self.ctx)
+        blueprint.resolve_variables(
+            [
+                Variable("Repositories", ["api"]),
+                Variable("ReplicationRegions", ["us-west-2", "eu-west-1"]),
+                Variable("ReplicationRepositoryPrefixes", ["api"]),
+            ]
+        )
+        blueprint.create_template()
+        self.assertRenderedBlueprint(blueprint)
+
+    def test_duplicate_replication_regions(self):
+        blueprint = Repositories('test_ecr_repositories_replication',
+                                 self.ctx)
+        blueprint.resolve_variables(
+            [
+                Variable("Repositories", ["api"]),
+                Variable("ReplicationRegions", ["us-west-2", "us-west-2"]),
+            ]
+        )
+        with self.assertRaises(ValueError):
+            blueprint.create_template()
+
+    def test_create_template_pull_through_cache(self):
+        blueprint = Repositories('test_ecr_repositories_pull_through_cache',
+                                 self.ctx)
+        blueprint.resolve_variables(
+            [
+                Variable("Repositories", []),
+                Variable("PullThroughCacheRules", {
+                    "ecr-public": "public.ecr.aws",
+                    "quay": "quay.io",
+                }),
+            ]
+        )
+        blueprint.create_template()
+        self.assertRenderedBlueprint(blueprint)
+
+
+if __name__ == '__main__':
+    unittest.main()
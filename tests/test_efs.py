@@ -49,6 +49,71 @@ class TestElasticFileSystem(BlueprintTestCase):
         blueprint.create_template()
         self.assertRenderedBlueprint(blueprint)
 
+    def test_create_template_provisioned_access_points(self):
+        blueprint = ElasticFileSystem(
+            'test_efs_ElasticFileSystem_provisioned_access_points', self.ctx)
+        variables = EFS_VARIABLES.copy()
+        variables['ThroughputMode'] = 'provisioned'
+        variables['ProvisionedThroughputInMibps'] = 256.0
+        variables['TransitionToIA'] = 'AFTER_30_DAYS'
+        variables['AccessPoints'] = {
+            'BuildCacheAccessPoint': {
+                'PosixUser': {'Uid': '1000', 'Gid': '1000'},
+                'RootDirectory': {
+                    'Path': '/build-cache',
+                    'CreationInfo': {
+                        'OwnerUid': '1000',
+                        'OwnerGid': '1000',
+                        'Permissions': '0755'
+                    }
+                }
+            }
+        }
+        blueprint.resolve_variables(
+            [Variable(k, v) for k, v in variables.items()])
+        blueprint.create_template()
+        self.assertRenderedBlueprint(blueprint)
+
+    def test_create_template_elastic_lifecycle(self):
+        blueprint = ElasticFileSystem(
+            'test_efs_ElasticFileSystem_elastic_lifecycle', self.ctx)
+        variables = EFS_VARIABLES.copy()
+        variables['ThroughputMode'] = 'elastic'
+        variables['TransitionToIA'] = 'AFTER_30_DAYS'
+        variables['TransitionToPrimaryStorageClass'] = 'AFTER_1_ACCESS'
+        blueprint.resolve_variables(
+            [Variable(k, v) for k, v in variables.items()])
+        blueprint.create_template()
+        self.assertRenderedBlueprint(blueprint)
+
+    def test_create_template_transition_to_primary(self):
+        blueprint = ElasticFileSystem(
+            'test_efs_ElasticFileSystem_transition_to_primary', self.ctx)
+        variables = EFS_VARIABLES.copy()
+        variables['TransitionToPrimaryStorageClass'] = 'AFTER_1_ACCESS'
+        blueprint.resolve_variables(
+            [Variable(k, v) for k, v in variables.items()])
+        blueprint.create_template()
+        self.assertRenderedBlueprint(blueprint)
+
+    def test_validate_provisioned_throughput_missing(self):
+        blueprint = ElasticFileSystem('test_efs_ElasticFileSystem', self.ctx)
+        variables = EFS_VARIABLES.copy()
+        variables['ThroughputMode'] = 'provisioned'
+
+        with self.assertRaises(ValidatorError):
+            blueprint.resolve_variables(
+                [Variable(k, v) for k, v in variables.items()])
+
+    def test_validate_provisioned_throughput_not_provisioned(self):
+        blueprint = ElasticFileSystem('test_efs_ElasticFileSystem', self.ctx)
+        variables = EFS_VARIABLES.copy()
+        variables['ProvisionedThroughputInMibps'] = 256.0
+
+        with self.assertRaises(ValidatorError):
+            blueprint.resolve_variables(
+                [Variable(k, v) for k, v in variables.items()])
+
     def test_validate_security_group_count_empty(self):
         blueprint = ElasticFileSystem('test_efs_ElasticFileSystem', self.ctx)
         variables = EFS_VARIABLES.copy()
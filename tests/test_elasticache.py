@@ -0,0 +1,130 @@
+import unittest
+
+from stacker.blueprints.testutil import BlueprintTestCase
+from stacker.context import Context
+from stacker.variables import Variable
+
+from stacker_blueprints.elasticache.memcached import Cluster
+from stacker_blueprints.elasticache.redis import RedisReplicationGroup
+
+
+MEMCACHED_VARIABLES = {
+    "CacheNodeType": "cache.t3.micro",
+    "EngineVersion": "1.6.17",
+    "Subnets": "subnet-1,subnet-2",
+    "VpcId": "vpc-1",
+}
+
+REDIS_VARIABLES = {
+    "AutoMinorVersionUpgrade": True,
+    "CacheNodeType": "cache.t3.micro",
+    "EngineVersion": "5.0.4",
+    "ParameterGroupFamily": "redis5.0",
+    "Subnets": "subnet-1,subnet-2",
+    "VpcId": "vpc-1",
+}
+
+
+class TestMemcachedCluster(BlueprintTestCase):
+    def setUp(self):
+        self.ctx = Context({'namespace': 'test'})
+
+    def generate_variables(self, **kwargs):
+        variables = dict(MEMCACHED_VARIABLES, **kwargs)
+        return [Variable(k, v) for k, v in variables.items()]
+
+    def test_create_template(self):
+        blueprint = Cluster('test_elasticache_memcached_cluster', self.ctx)
+        blueprint.resolve_variables(
+            self.generate_variables(
+                NumCacheNodes=3,
+                InternalZoneId="Z1234",
+                InternalZoneName="internal.example.com",
+                InternalHostname="cache",
+            )
+        )
+        blueprint.create_template()
+        self.assertRenderedBlueprint(blueprint)
+
+    def test_redis_only_variables(self):
+        blueprint = Cluster('test_elasticache_memcached_cluster', self.ctx)
+        variables = blueprint.defined_variables()
+        for name in ["NumCacheClusters", "SnapshotWindow",
+                     "InternalReaderHostname"]:
+            self.assertNotIn(name, variables)
+
+    def test_cross_az_requires_two_nodes(self):
+        blueprint = Cluster('test_elasticache_memcached_cluster_cross_az',
+                            self.ctx)
+        blueprint.resolve_variables(
+            self.generate_variables(NumCacheNodes=1)
+        )
+        with self.assertRaises(ValueError):
+            blueprint.create_template()
+
+    def test_availability_zones_must_match_nodes(self):
+        blueprint = Cluster('test_elasticache_memcached_cluster_azs',
+                            self.ctx)
+        blueprint.resolve_variables(
+            self.generate_variables(
+                PreferredAvailabilityZones=["us-east-1a", "us-east-1b",
+                                            "us-east-1c"],
+            )
+        )
+        with self.assertRaises(ValueError):
+            blueprint.create_template()
+
+
+class TestRedisReplicationGroup(BlueprintTestCase):
+    def setUp(self):
+        self.ctx = Context({'namespace': 'test'})
+
+    def generate_variables(self, **kwargs):
+        variables = dict(REDIS_VARIABLES, **kwargs)
+        return [Variable(k, v) for k, v in variables.items()]
+
+    def test_create_template_cache_preset(self):
+        blueprint = RedisReplicationGroup(
+            'test_elasticache_redis_cache_preset', self.ctx)
+        blueprint.resolve_variables(
+            self.generate_variables(
+                ParameterPreset="cache",
+                ClusterParameters={"activedefrag": "no"},
+                InternalZoneId="Z1234",
+                InternalZoneName="internal.example.com",
+                InternalHostname="redis",
+                InternalReaderHostname="redis-reader",
+            )
+        )
+        blueprint.create_template()
+        self.assertRenderedBlueprint(blueprint)
+
+    def test_create_template_queue_preset(self):
+        blueprint = RedisReplicationGroup(
+            'test_elasticache_redis_queue_preset', self.ctx)
+        blueprint.resolve_variables(
+            self.generate_variables(
+                EngineVersion="3.2.10",
+                ParameterGroupFamily="redis3.2",
+                ParameterPreset="queue",
+            )
+        )
+        blueprint.create_template()
+        self.assertRenderedBlueprint(blueprint)
+
+    def test_cache_preset_legacy_family(self):
+        blueprint = RedisReplicationGroup(
+            'test_elasticache_redis_cache_preset_legacy', self.ctx)
+        blueprint.resolve_variables(
+            self.generate_variables(
+                EngineVersion="3.2.10",
+                ParameterGroupFamily="redis3.2",
+                ParameterPreset="cache",
+            )
+        )
+        with self.assertRaises(ValueError):
+            blueprint.create_template()
+
+
+if __name__ == '__main__':
+    unittest.main()
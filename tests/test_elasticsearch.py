@@ -0,0 +1,205 @@
+import unittest
+
+from stacker.blueprints.testutil import BlueprintTestCase
+from stacker.context import Context
+from stacker.variables import Variable
+
+from stacker_blueprints.elasticsearch import (
+    Domain,
+    build_cluster_topology,
+    validate_topology,
+)
+
+
+TOPOLOGY = {
+    "InstanceType": "r6g.large.elasticsearch",
+    "AvailabilityZones": 3,
+    "DedicatedMasterCount": 3,
+    "DedicatedMasterType": "m6g.large.elasticsearch",
+    "DataVolumeGiB": 1000,
+}
+
+
+class TestTopology(unittest.TestCase):
+    def test_sizing(self):
+        cluster_config, ebs_options = build_cluster_topology(TOPOLOGY, "7.10")
+        # 1000GiB * 2 copies * 1.45 overhead = 2900GiB, which needs 3
+        # nodes (rounded up to a multiple of the AZs) of at most 1024GiB.
+        self.assertEqual(cluster_config["InstanceCount"], 3)
+        self.assertEqual(ebs_options["VolumeSize"], 967)
+        self.assertEqual(ebs_options["VolumeType"], "gp3")
+        self.assertEqual(ebs_options["Iops"], 3000)
+        self.assertEqual(ebs_options["Throughput"], 241)
+
+    def test_sizing_large_volumes(self):
+        topology = dict(TOPOLOGY, DataVolumeGiB=6000, MaxVolumeSizeGiB=6144)
+        _, ebs_options = build_cluster_topology(topology, "OpenSearch_1.3")
+        self.assertEqual(ebs_options["VolumeSize"], 5800)
+        self.assertEqual(ebs_options["Iops"], 16000)
+        self.assertEqual(ebs_options["Throughput"], 1000)
+
+    def test_sizing_gp2_before_gp3_support(self):
+        _, ebs_options = build_cluster_topology(TOPOLOGY, "6.8")
+        self.assertEqual(ebs_options, {
+            "EBSEnabled": True,
+            "VolumeType": "gp2",
+            "VolumeSize": 967,
+        })
+
+    def test_instance_count_too_small(self):
+        topology = dict(TOPOLOGY, InstanceCount=3, DataVolumeGiB=3000)
+        with self.assertRaises(ValueError):
+            build_cluster_topology(topology, "7.10")
+
+    def test_validate_instance_count_spread(self):
+        with self.assertRaises(ValueError):
+            validate_topology(dict(TOPOLOGY, InstanceCount=4))
+
+    def test_validate_warm_requires_masters(self):
+        topology = dict(TOPOLOGY, DedicatedMasterCount=0, WarmCount=2,
+                        WarmType="ultrawarm1.medium.elasticsearch")
+        with self.assertRaises(ValueError):
+            validate_topology(topology)
+
+
+class TestDomain(BlueprintTestCase):
+    def setUp(self):
+        self.ctx = Context({'namespace': 'test'})
+
+    def test_create_template_topology(self):
+        blueprint = Domain('test_elasticsearch_domain_topology', self.ctx)
+        topology = dict(TOPOLOGY, WarmCount=2, ColdStorage=True,
+                        WarmType="ultrawarm1.medium.elasticsearch")
+        blueprint.resolve_variables(
+            [
+                Variable("Roles", ["app-role"]),
+                Variable("ElasticsearchVersion", "7.10"),
+                Variable("Topology", topology),
+            ]
+        )
+        blueprint.create_template()
+        self.assertRenderedBlueprint(blueprint)
+
+    def test_ultrawarm_unsupported_version(self):
+        blueprint = Domain('test_elasticsearch_domain_ultrawarm_version',
+                           self.ctx)
+        topology = dict(TOPOLOGY, WarmCount=2,
+                        WarmType="ultrawarm1.medium.elasticsearch")
+        blueprint.resolve_variables(
+            [
+                Variable("Roles", ["app-role"]),
+                Variable("Topology", topology),
+            ]
+        )
+        with self.assertRaises(ValueError):
+            blueprint.create_template()
+
+    def test_create_template_logs_auto_tune(self):
+        blueprint = Domain('test_elasticsearch_domain_logs_auto_tune',
+                           self.ctx)
+        blueprint.resolve_variables(
+            [
+                Variable("Roles", ["app-role"]),
+                Variable("ElasticsearchVersion", "7.10"),
+                Variable("LogPublishing", ["SEARCH_SLOW_LOGS", "AUDIT_LOGS"]),
+                Variable("LogRetentionDays", 14),
+                Variable(
+                    "AdvancedSecurityOptions",
+                    {
+                        "Enabled": True,
+                        "InternalUserDatabaseEnabled": True,
+                        "MasterUserOptions": {
+                            "MasterUserName": "admin",
+                            "MasterUserPassword": "password",
+                        },
+                    }
+                ),
+                Variable(
+                    "AutoTune",
+                    {
+                        "MaintenanceSchedules": [
+                            {
+                                "DurationHours": 2,
+                                "CronExpressionForRecurrence":
+                                    "cron(0 3 ? * SUN *)",
+                            },
+                        ],
+                    }
+                ),
+                Variable("AutoTuneServiceToken",
+                         "arn:aws:lambda:us-east-1:012345678901:"
+                         "function:auto-tune"),
+            ]
+        )
+        blueprint.create_template()
+        self.assertRenderedBlueprint(blueprint)
+
+    def test_audit_logs_require_advanced_security(self):
+        blueprint = Domain('test_elasticsearch_domain_audit_logs', self.ctx)
+        blueprint.resolve_variables(
+            [
+                Variable("Roles", ["app-role"]),
+                Variable("LogPublishing", ["AUDIT_LOGS"]),
+            ]
+        )
+        with self.assertRaises(ValueError):
+            blueprint.create_template()
+
+    def test_auto_tune_requires_service_token(self):
+        blueprint = Domain('test_elasticsearch_domain_auto_tune_token',
+                           self.ctx)
+        blueprint.resolve_variables(
+            [
+                Variable("Roles", ["app-role"]),
+                Variable("AutoTune", {"DesiredState": "ENABLED"}),
+            ]
+        )
+        with self.assertRaises(ValueError):
+            blueprint.create_template()
+
+    def test_create_template_vpc(self):
+        blueprint = Domain('test_elasticsearch_domain_vpc', self.ctx)
+        blueprint.resolve_variables(
+            [
+                Variable("Roles", ["app-role"]),
+                Variable("VpcId", "vpc-1"),
+                Variable("Subnets", "subnet-1,subnet-2"),
+                Variable("TrustedNetworks", ["10.0.0.0/8"]),
+                Variable(
+                    "ElasticsearchClusterConfig",
+                    {
+                        "InstanceCount": 2,
+                        "ZoneAwarenessEnabled": True,
+                    }
+                ),
+            ]
+        )
+        blueprint.create_template()
+        self.assertRenderedBlueprint(blueprint)
+
+    def test_vpc_subnets_without_zone_awareness(self):
+        blueprint = Domain('test_elasticsearch_domain_vpc_subnets', self.ctx)
+        blueprint.resolve_variables(
+            [
+                Variable("Roles", ["app-role"]),
+                Variable("VpcId", "vpc-1"),
+                Variable("Subnets", "subnet-1,subnet-2"),
+            ]
+        )
+        with self.assertRaises(ValueError):
+            blueprint.create_template()
+
+    def test_vpc_subnets_without_vpc_id(self):
+        blueprint = Domain('test_elasticsearch_domain_vpc_id', self.ctx)
+        blueprint.resolve_variables(
+            [
+                Variable("Roles", ["app-role"]),
+                Variable("Subnets", "subnet-1"),
+            ]
+        )
+        with self.assertRaises(ValueError):
+            blueprint.create_template()
+
+
+if __name__ == '__main__':
+    unittest.main()
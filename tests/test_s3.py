@@ -63,3 +63,248 @@ class TestBlueprint(BlueprintTestCase):
         blueprint.resolve_variables(v)
         blueprint.create_template()
         self.assertRenderedBlueprint(blueprint)
+
+    def test_s3_performance(self):
+        """Test acceleration, request metrics, tiering & inventory."""
+        ctx = Context(config=Config({'namespace': 'test'}))
+        blueprint = Buckets('s3_performance', ctx)
+
+        v = self.variables = [
+            Variable('Buckets', {
+                'Assets': {
+                    'Accelerate': True,
+                    'RequestMetrics': ['', 'uploads/', 'uploads'],
+                    'IntelligentTiering': {
+                        'Prefix': 'archive/',
+                        'ArchiveAccessDays': 90,
+                        'DeepArchiveAccessDays': 180,
+                    },
+                    'Inventory': {
+                        'DestinationBucket': 'inventory-bucket',
+                        'DestinationPrefix': 'assets',
+                        'Frequency': 'Weekly',
+                    },
+                },
+            }),
+        ]
+
+        blueprint.resolve_variables(v)
+        blueprint.create_template()
+        self.assertRenderedBlueprint(blueprint)
+
+    def test_s3_inventory_invalid_format(self):
+        ctx = Context(config=Config({'namespace': 'test'}))
+        blueprint = Buckets('s3_performance', ctx)
+
+        v = self.variables = [
+            Variable('Buckets', {
+                'Assets': {
+                    'Inventory': {
+                        'DestinationBucket': 'inventory-bucket',
+                        'Format': 'JSON',
+                    },
+                },
+            }),
+        ]
+
+        blueprint.resolve_variables(v)
+        with self.assertRaises(ValueError):
+            blueprint.create_template()
+
+    def test_s3_bucket_key(self):
+        """Test SSE-KMS encryption with S3 Bucket Keys."""
+        ctx = Context(config=Config({'namespace': 'test'}))
+        blueprint = Buckets('s3_bucket_key', ctx)
+
+        v = self.variables = [
+            Variable('Buckets', {
+                'Logs': {
+                    'EncryptionKeyArn': (
+                        'arn:aws:kms:us-east-1:123456789012:key/abc'
+                    ),
+                },
+                'Unencrypted': {},
+            }),
+            Variable('ReadRoles', ['Role1']),
+            Variable('ReadWriteRoles', ['Role2']),
+        ]
+
+        blueprint.resolve_variables(v)
+        blueprint.create_template()
+        self.assertRenderedBlueprint(blueprint)
+
+    def test_s3_replication(self):
+        """Test cross-region replication with RTC and KMS encryption."""
+        ctx = Context(config=Config({'namespace': 'test'}))
+        blueprint = Buckets('s3_replication', ctx)
+
+        v = self.variables = [
+            Variable('Buckets', {
+                'Data': {
+                    'EncryptionKeyArn': (
+                        'arn:aws:kms:us-east-1:012345678901:key/source'
+                    ),
+                    'Replication': {
+                        'DestinationBucket': 'data-us-west-2',
+                        'StorageClass': 'STANDARD_IA',
+                        'ReplicaKmsKeyArn': (
+                            'arn:aws:kms:us-west-2:012345678901:key/replica'
+                        ),
+                        'Rules': [
+                            {'Prefix': 'reports/',
+                             'Tags': {'replicate': 'true'}},
+                            {'Prefix': 'exports/'},
+                        ],
+                    },
+                },
+            }),
+        ]
+
+        blueprint.resolve_variables(v)
+        blueprint.create_template()
+        self.assertRenderedBlueprint(blueprint)
+
+    def test_s3_replication_requires_versioning(self):
+        ctx = Context(config=Config({'namespace': 'test'}))
+        blueprint = Buckets('s3_replication', ctx)
+
+        v = self.variables = [
+            Variable('Buckets', {
+                'Data': {
+                    'VersioningConfiguration': {'Status': 'Suspended'},
+                    'Replication': {
+                        'DestinationBucket': 'data-us-west-2',
+                    },
+                },
+            }),
+        ]
+
+        blueprint.resolve_variables(v)
+        with self.assertRaises(ValueError):
+            blueprint.create_template()
+
+    def test_s3_replication_requires_replica_key(self):
+        ctx = Context(config=Config({'namespace': 'test'}))
+        blueprint = Buckets('s3_replication', ctx)
+
+        v = self.variables = [
+            Variable('Buckets', {
+                'Data': {
+                    'EncryptionKeyArn': (
+                        'arn:aws:kms:us-east-1:012345678901:key/source'
+                    ),
+                    'Replication': {
+                        'DestinationBucket': 'data-us-west-2',
+                    },
+                },
+            }),
+        ]
+
+        blueprint.resolve_variables(v)
+        with self.assertRaises(ValueError):
+            blueprint.create_template()
+
+    def test_s3_replication_invalid_key(self):
+        ctx = Context(config=Config({'namespace': 'test'}))
+        blueprint = Buckets('s3_replication', ctx)
+
+        v = self.variables = [
+            Variable('Buckets', {
+                'Data': {
+                    'Replication': {
+                        'DestinationBucket': 'data-us-west-2',
+                        'ReplicaKmsKeyID': 'arn:aws:kms:us-west-2:'
+                                           '012345678901:key/replica',
+                    },
+                },
+            }),
+        ]
+
+        blueprint.resolve_variables(v)
+        with self.assertRaises(ValueError):
+            blueprint.create_template()
+
+    def test_s3_lifecycle(self):
+        """Test compiling lifecycle specs into lifecycle rules."""
+        ctx = Context(config=Config({'namespace': 'test'}))
+        blueprint = Buckets('s3_lifecycle', ctx)
+
+        v = self.variables = [
+            Variable('Buckets', {
+                'Logs': {
+                    'VersioningConfiguration': {'Status': 'Enabled'},
+                    'Lifecycle': [
+                        {
+                            'Prefix': 'elb/',
+                            'Transitions': {
+                                'GLACIER': 90,
+                                'STANDARD_IA': 30,
+                            },
+                            'ExpireAfter': 365,
+                            'AbortIncompleteMultipartUploadAfter': 7,
+                        },
+                        {
+                            'NoncurrentTransitions': {'STANDARD_IA': 30},
+                            'NoncurrentExpireAfter': 90,
+                        },
+                    ],
+                },
+            }),
+        ]
+
+        blueprint.resolve_variables(v)
+        blueprint.create_template()
+        self.assertRenderedBlueprint(blueprint)
+
+    def test_s3_lifecycle_invalid_key(self):
+        ctx = Context(config=Config({'namespace': 'test'}))
+        blueprint = Buckets('s3_lifecycle', ctx)
+
+        v = self.variables = [
+            Variable('Buckets', {
+                'Logs': {
+                    'Lifecycle': [{'Prefix': 'a/', 'ExpireAfterDays': 3}],
+                },
+            }),
+        ]
+
+        blueprint.resolve_variables(v)
+        with self.assertRaises(ValueError):
+            blueprint.create_template()
+
+    def test_s3_lifecycle_requires_action(self):
+        ctx = Context(config=Config({'namespace': 'test'}))
+        blueprint = Buckets('s3_lifecycle', ctx)
+
+        v = self.variables = [
+            Variable('Buckets', {
+                'Logs': {
+                    'Lifecycle': [{'Prefix': 'a/'}],
+                },
+            }),
+        ]
+
+        blueprint.resolve_variables(v)
+        with self.assertRaises(ValueError):
+            blueprint.create_template()
+
+    def test_s3_lifecycle_invalid_transitions(self):
+        ctx = Context(config=Config({'namespace': 'test'}))
+        blueprint = Buckets('s3_lifecycle', ctx)
+
+        v = self.variables = [
+            Variable('Buckets', {
+                'Logs': {
+                    'Lifecycle': [{
+                        'Transitions': {
+                            'STANDARD_IA': 30,
+                            'GLACIER': 45,
+                        },
+                    }],
+                },
+            }),
+        ]
+
+        blueprint.resolve_variables(v)
+        with self.assertRaises(ValueError):
+            blueprint.create_template()
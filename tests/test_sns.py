@@ -1,9 +1,12 @@
 import unittest
 from stacker.context import Context
 from stacker.variables import Variable
-from stacker_blueprints.sns import Topics
+from stacker_blueprints.sns import Topics, validate_subscription
 from stacker.blueprints.testutil import BlueprintTestCase
 
+QUEUE_ARN = 'arn:aws:sqs:us-east-1:123456788901:%s'
+
+
 class TestBlueprint(BlueprintTestCase):
     def setUp(self):
         self.variables = [
@@ -15,7 +18,7 @@ class TestBlueprint(BlueprintTestCase):
                     'DisplayName': 'ExampleTopic',
                     'Subscription': [
                         {
-                            'Endpoint': 'arn:aws:sqs:us-east-1:123456788901:example-queue',
+                            'Endpoint': QUEUE_ARN % 'example-queue',
                             'Protocol': 'sqs',
                         },
                         {
@@ -33,3 +36,76 @@ class TestBlueprint(BlueprintTestCase):
         blueprint.resolve_variables(self.variables)
         blueprint.create_template()
         self.assertRenderedBlueprint(blueprint)
+
+    def test_sns_subscriptions(self):
+        ctx = Context({'namespace': 'test', 'environment': 'test'})
+        blueprint = Topics('topics_subscriptions', ctx)
+        blueprint.resolve_variables([
+            Variable('Topics', {
+                'Orders': {
+                    'DisplayName': 'Orders',
+                    'Subscriptions': [
+                        {
+                            'Endpoint': QUEUE_ARN % 'shipping',
+                            'Protocol': 'sqs',
+                            'RawMessageDelivery': True,
+                            'FilterPolicy': {
+                                'event': ['order_placed'],
+                            },
+                            'DeadLetterQueueArn': QUEUE_ARN % 'orders-dlq',
+                        },
+                        {
+                            'Endpoint': QUEUE_ARN % 'billing',
+                            'Protocol': 'sqs',
+                            'FilterPolicy': {
+                                'event': ['order_placed', 'order_refunded'],
+                            },
+                            'DeadLetterQueueArn': QUEUE_ARN % 'orders-dlq',
+                        },
+                    ]
+                },
+                'Returns': {
+                    'DisplayName': 'Returns',
+                    'Subscription': [
+                        {
+                            'Endpoint': QUEUE_ARN % 'billing',
+                            'Protocol': 'sqs',
+                        },
+                    ]
+                },
+            }),
+        ])
+        blueprint.create_template()
+        self.assertRenderedBlueprint(blueprint)
+
+    def test_sns_shared_queues_across_regions(self):
+        ctx = Context({'namespace': 'test', 'environment': 'test'})
+        blueprint = Topics('topics_shared_queues', ctx)
+        east = QUEUE_ARN % 'jobs'
+        west = 'arn:aws:sqs:us-west-2:123456788901:jobs'
+        blueprint.resolve_variables([
+            Variable('Topics', {
+                'Builds': {
+                    'Subscription': [
+                        {'Endpoint': east, 'Protocol': 'sqs'},
+                        {'Endpoint': west, 'Protocol': 'sqs'},
+                    ]
+                },
+                'Deploys': {
+                    'Subscription': [
+                        {'Endpoint': east, 'Protocol': 'sqs'},
+                        {'Endpoint': west, 'Protocol': 'sqs'},
+                    ]
+                },
+            }),
+        ])
+        blueprint.create_template()
+        self.assertRenderedBlueprint(blueprint)
+
+    def test_sns_raw_message_delivery_protocol(self):
+        with self.assertRaises(ValueError):
+            validate_subscription({
+                'Endpoint': 'postmaster@example.com',
+                'Protocol': 'email',
+                'RawMessageDelivery': True,
+            })
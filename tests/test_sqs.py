@@ -32,3 +32,94 @@ class TestBlueprint(BlueprintTestCase):
         blueprint.resolve_variables(self.variables)
         blueprint.create_template()
         self.assertRenderedBlueprint(blueprint)
+
+    def test_sqs_profiles(self):
+        ctx = Context({'namespace': 'test', 'environment': 'test'})
+        blueprint = Queues('queues_profiles', ctx)
+        blueprint.resolve_variables([
+            Variable('Queues', {
+                'Jobs': {
+                    'VisibilityTimeout': 60,
+                },
+                'Events': {
+                    'FifoQueue': True,
+                    'QueueName': 'events.fifo',
+                },
+            }),
+            Variable('QueueProfiles', {
+                'Jobs': {
+                    'ConsumerTimeout': 30,
+                    'DeadLetterQueue': True,
+                },
+                'Events': {
+                    'ConsumerTimeout': 30,
+                    'DeadLetterQueue': {'MaxReceiveCount': 3},
+                },
+            }),
+        ])
+        blueprint.create_template()
+        self.assertRenderedBlueprint(blueprint)
+
+    def test_sqs_profiles_high_throughput(self):
+        ctx = Context({'namespace': 'test', 'environment': 'test'})
+        blueprint = Queues('queues_profiles_high_throughput', ctx)
+        blueprint.resolve_variables([
+            Variable('Queues', {
+                'Events': {
+                    'FifoQueue': True,
+                    'QueueName': 'events.fifo',
+                },
+            }),
+            Variable('QueueProfiles', {
+                'Events': {
+                    'HighThroughputFifo': True,
+                    'DeadLetterQueue': True,
+                },
+            }),
+        ])
+        blueprint.create_template()
+        self.assertRenderedBlueprint(blueprint)
+
+    def test_sqs_profiles_dead_letter_queue_with_redrive_policy(self):
+        ctx = Context({'namespace': 'test', 'environment': 'test'})
+        blueprint = Queues('queues_profiles', ctx)
+        blueprint.resolve_variables([
+            Variable('Queues', {
+                'Jobs': {
+                    'RedrivePolicy': {
+                        'deadLetterTargetArn':
+                            'arn:aws:sqs:us-east-1:123456789:dlq',
+                        'maxReceiveCount': 3,
+                    },
+                },
+            }),
+            Variable('QueueProfiles', {
+                'Jobs': {'DeadLetterQueue': True},
+            }),
+        ])
+        with self.assertRaises(ValueError):
+            blueprint.create_template()
+
+    def test_sqs_profiles_invalid_key(self):
+        ctx = Context({'namespace': 'test', 'environment': 'test'})
+        blueprint = Queues('queues_profiles', ctx)
+        blueprint.resolve_variables([
+            Variable('Queues', {'Jobs': {}}),
+            Variable('QueueProfiles', {
+                'Jobs': {'ConsumerTimeOut': 30},
+            }),
+        ])
+        with self.assertRaises(ValueError):
+            blueprint.create_template()
+
+    def test_sqs_profiles_high_throughput_requires_fifo(self):
+        ctx = Context({'namespace': 'test', 'environment': 'test'})
+        blueprint = Queues('queues_profiles', ctx)
+        blueprint.resolve_variables([
+            Variable('Queues', {'Jobs': {}}),
+            Variable('QueueProfiles', {
+                'Jobs': {'HighThroughputFifo': True},
+            }),
+        ])
+        with self.assertRaises(ValueError):
+            blueprint.create_template()
@@ -0,0 +1,77 @@
+import unittest
+
+from stacker.blueprints.testutil import BlueprintTestCase
+from stacker.context import Context
+from stacker.exceptions import ValidatorError
+from stacker.variables import Variable
+
+from stacker_blueprints.vpc_flow_logs import FlowLogs
+
+
+class TestFlowLogs(BlueprintTestCase):
+    def setUp(self):
+        self.ctx = Context({'namespace': 'test'})
+
+    def test_create_template_cloudwatch_logs(self):
+        blueprint = FlowLogs('test_vpc_flow_logs_cloudwatch_logs', self.ctx)
+        blueprint.resolve_variables(
+            [
+                Variable("Retention", 7),
+                Variable("ResourceType", "Subnet"),
+                Variable("ResourceIds", ["subnet-1", "subnet-2"]),
+                Variable("TrafficType", "REJECT"),
+                Variable("LogFormat", ["srcaddr", "dstaddr", "bytes"]),
+                Variable("MaxAggregationInterval", 60),
+            ]
+        )
+        blueprint.create_template()
+        self.assertRenderedBlueprint(blueprint)
+
+    def test_create_template_s3(self):
+        blueprint = FlowLogs('test_vpc_flow_logs_s3', self.ctx)
+        blueprint.resolve_variables(
+            [
+                Variable("VpcId", "vpc-1"),
+                Variable("LogDestinationType", "s3"),
+                Variable("BucketArn", "arn:aws:s3:::flow-logs/vpc-1/"),
+            ]
+        )
+        blueprint.create_template()
+        self.assertRenderedBlueprint(blueprint)
+
+    def test_s3_requires_bucket_arn(self):
+        blueprint = FlowLogs('test_vpc_flow_logs_s3_bucket', self.ctx)
+        blueprint.resolve_variables(
+            [
+                Variable("VpcId", "vpc-1"),
+                Variable("LogDestinationType", "s3"),
+            ]
+        )
+        with self.assertRaises(ValueError):
+            blueprint.create_template()
+
+    def test_resource_type_requires_resource_ids(self):
+        blueprint = FlowLogs('test_vpc_flow_logs_resource_ids', self.ctx)
+        blueprint.resolve_variables(
+            [
+                Variable("Retention", 7),
+                Variable("VpcId", "vpc-1"),
+                Variable("ResourceType", "Subnet"),
+            ]
+        )
+        with self.assertRaises(ValueError):
+            blueprint.create_template()
+
+    def test_invalid_max_aggregation_interval(self):
+        blueprint = FlowLogs('test_vpc_flow_logs_interval', self.ctx)
+        with self.assertRaises(ValidatorError):
+            blueprint.resolve_variables(
+                [
+                    Variable("VpcId", "vpc-1"),
+                    Variable("MaxAggregationInterval", 300),
+                ]
+            )
+
+
+if __name__ == '__main__':
+    unittest.main()